@@ -1,14 +1,15 @@
 import copy
+import hashlib
 import json
 import os
 from enum import Enum
+from typing import Any, Dict, List, Optional
 
-import yaml
-from jsonschema import validate
+from src.app_config_cache import AppConfigCache
 
 from src.app_logging import LOGGING_JSONSCHEMA
 from src.thing.thing_config import THINGS_JSONSCHEMA, THING_DEFAULTS_JSONSCHEMA
-from src.hue.hue_config import HUE_BRIDGE_JSONSCHEMA
+from src.hue.hue_config import HUE_BRIDGE_JSONSCHEMA, HUE_BRIDGES_JSONSCHEMA, HueBridgeConfKey
 from src.mqtt.mqtt_config import MQTT_JSONSCHEMA
 
 
@@ -22,10 +23,12 @@ class RunMode(Enum):
     EXPLORE = "explore bridge devices"
     JSON_SCHEMA = "show JSON schema"
     RUN_SERVICE = "start service"
+    SUPERVISOR = "start service with one worker process per bridge"
 
 
 class AppConfKey:
     HUE_BRIDGE = "hue_bridge"
+    HUE_BRIDGES = "hue_bridges"
     LOGGING = "logging"
     MQTT = "mqtt"
     THINGS = "things"
@@ -39,6 +42,7 @@ CONFIG_JSONSCHEMA = {
         AppConfKey.THINGS: THINGS_JSONSCHEMA,
         AppConfKey.THING_DEFAULTS: THING_DEFAULTS_JSONSCHEMA,
         AppConfKey.HUE_BRIDGE: HUE_BRIDGE_JSONSCHEMA,
+        AppConfKey.HUE_BRIDGES: HUE_BRIDGES_JSONSCHEMA,
         AppConfKey.LOGGING: LOGGING_JSONSCHEMA,
         AppConfKey.MQTT: MQTT_JSONSCHEMA,
 
@@ -52,32 +56,88 @@ CONFIG_JSONSCHEMA = {
         },
     },
     "additionalProperties": False,
-    "required": [AppConfKey.THINGS, AppConfKey.HUE_BRIDGE, AppConfKey.MQTT],
+    "required": [AppConfKey.THINGS, AppConfKey.MQTT],
+    "oneOf": [{"required": [AppConfKey.HUE_BRIDGE]}, {"required": [AppConfKey.HUE_BRIDGES]}],
 }
 
 
 class AppConfig:
 
-    def __init__(self, config_file, run_mode):
+    _validators: Dict[str, Any] = {}  # schema variant: compiled validator
+
+    def __init__(self, config_file, run_mode, cache_file: Optional[str] = None):
         self._config_data = {}
 
         self.check_config_file_access(config_file)
 
-        with open(config_file, 'r') as stream:
-            file_data = yaml.unsafe_load(stream)
+        with open(config_file, 'rb') as stream:
+            content = stream.read()
+
+        schema_variant = self.get_schema_variant(run_mode)
+        self._cache: Optional[AppConfigCache] = None
+        if cache_file:
+            self._cache = AppConfigCache(cache_file)
+            key = [hashlib.sha256(content).hexdigest(), os.stat(config_file).st_mtime_ns, schema_variant]
+            if self._cache.load(key):
+                self._config_data = self._cache.get(AppConfigCache.CONFIG)
+                return
+
+        file_data = self.load_yaml(content)
 
         self._config_data = {
             **{"database": {}, "logging": {}, "mqtt": {}},  # default
             **file_data
         }
 
-        schema = CONFIG_JSONSCHEMA
-        if run_mode == RunMode.EXPLORE:
-            schema = copy.deepcopy(schema)
-            schema["properties"][AppConfKey.MQTT] = {"type": "object"}
-            schema["required"].remove(AppConfKey.MQTT)
+        from jsonschema.exceptions import best_match  # same error selection as `jsonschema.validate`
+        error = best_match(self._get_validator(schema_variant).iter_errors(file_data))
+        if error is not None:
+            raise error
+
+        if self._cache:
+            self._cache.put(AppConfigCache.CONFIG, self._config_data)
+
+    @classmethod
+    def load_yaml(cls, content: bytes) -> Dict[str, Any]:
+        import yaml  # imported on demand: not needed for all run modes (startup time)
+
+        loader = getattr(yaml, "CUnsafeLoader", yaml.UnsafeLoader)  # libyaml based C loader, if available
+        try:
+            return yaml.load(content, Loader=loader)
+        except yaml.parser.ParserError as ex:
+            raise ConfigException(f"parsing error in config file:\n{ex}") from ex
+
+    @classmethod
+    def get_schema_variant(cls, run_mode: RunMode) -> str:
+        return "explore" if run_mode == RunMode.EXPLORE else "default"
 
-        validate(file_data, schema)
+    @classmethod
+    def _get_validator(cls, schema_variant: str):
+        """validators are compiled once per schema variant"""
+        validator = cls._validators.get(schema_variant)
+        if validator is None:
+            from jsonschema.validators import validator_for
+
+            schema = CONFIG_JSONSCHEMA
+            if schema_variant == "explore":
+                schema = copy.deepcopy(schema)
+                schema["properties"][AppConfKey.MQTT] = {"type": "object"}
+                schema["required"].remove(AppConfKey.MQTT)
+
+            validator_class = validator_for(schema)
+            validator_class.check_schema(schema)
+            validator = validator_class(schema)
+            cls._validators[schema_variant] = validator
+        return validator
+
+    @property
+    def cache(self) -> Optional[AppConfigCache]:
+        """config cache, which takes further normalized data (e.g. thing parameters)"""
+        return self._cache
+
+    def save_cache(self):
+        if self._cache:
+            self._cache.save()
 
     def get_things_config(self):
         return self._config_data[AppConfKey.THINGS]
@@ -85,8 +145,20 @@ class AppConfig:
     def get_thing_defaults_config(self):
         return self._config_data.get(AppConfKey.THING_DEFAULTS, {})
 
+    def get_hue_bridge_configs(self) -> List[Dict[str, Any]]:
+        bridge_configs = self._config_data.get(AppConfKey.HUE_BRIDGES)
+        if bridge_configs is None:
+            return [self._config_data[AppConfKey.HUE_BRIDGE]]
+
+        names = [c[HueBridgeConfKey.NAME] for c in bridge_configs]
+        duplicates = sorted({n for n in names if names.count(n) > 1})
+        if duplicates:
+            raise ConfigException(f"Hue bridge names have to be unique ({', '.join(duplicates)})!")
+        return bridge_configs
+
     def get_hue_bridge_config(self):
-        return self._config_data[AppConfKey.HUE_BRIDGE]
+        """the first bridge (CLI tools)"""
+        return self.get_hue_bridge_configs()[0]
 
     def get_logging_config(self):
         return self._config_data.get(AppConfKey.LOGGING, {})
@@ -95,10 +167,11 @@ class AppConfig:
         return self._config_data[AppConfKey.MQTT]
 
     @classmethod
-    def determine_run_mode(cls, create_app_key, discover, explore, json_schema) -> RunMode:
+    def determine_run_mode(cls, create_app_key, discover, explore, json_schema, supervisor=False) -> RunMode:
         special_command_count = (1 if json_schema else 0) + (1 if discover else 0) + (1 if explore else 0) + (1 if create_app_key else 0)
+        special_command_count += 1 if supervisor else 0
         if special_command_count > 1:
-            raise ConfigException("Use only one special mode command (create-user, discover, explore, json-schema)!")
+            raise ConfigException("Use only one special mode command (create-user, discover, explore, json-schema, supervisor)!")
 
         if create_app_key:
             return RunMode.CREATE_APP_KEY
@@ -108,6 +181,8 @@ class AppConfig:
             return RunMode.EXPLORE
         if json_schema:
             return RunMode.JSON_SCHEMA
+        if supervisor:
+            return RunMode.SUPERVISOR
 
         return RunMode.RUN_SERVICE
 
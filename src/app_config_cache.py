@@ -0,0 +1,70 @@
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+_logger = logging.getLogger(__name__)
+
+
+class AppConfigCache:
+    """
+    Validated and normalized config data of an unchanged config file, so parsing and validation can be skipped. Entries are
+    valid for one key (content hash, mtime and schema variant). The file may contain secrets, so it gets the same
+    permissions as the config file (600).
+    """
+
+    VERSION = 1
+
+    CONFIG = "config"
+    THING_PARAMS = "thing_params"
+
+    def __init__(self, cache_file: str):
+        self._cache_file = cache_file
+        self._key: Optional[List] = None
+        self._entries: Dict[str, Any] = {}
+        self._changed = False
+
+    def load(self, key: List) -> bool:
+        """:return: True, if the cache file matches the key"""
+        self._key = key
+        self._entries = {}
+        self._changed = False
+        try:
+            with open(self._cache_file, "r") as stream:
+                data = json.load(stream)
+            if data.get("version") == self.VERSION and data.get("key") == key:
+                self._entries = data["entries"]
+                return True
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, AttributeError) as ex:
+            _logger.warning("config cache (%s) ignored: %s", self._cache_file, ex)
+        return False
+
+    def get(self, name: str) -> Optional[Any]:
+        return self._entries.get(name)
+
+    def put(self, name: str, value: Any):
+        self._entries[name] = value
+        self._changed = True
+
+    def save(self):
+        """Writes changed entries (atomically)."""
+        if not self._changed or self._key is None:
+            return
+        try:
+            content = json.dumps({"version": self.VERSION, "key": self._key, "entries": self._entries}, separators=(",", ":"))
+        except (TypeError, ValueError) as ex:  # YAML may contain objects, which are not JSON serializable
+            _logger.warning("config not cached: %s", ex)
+            return
+
+        temp_file = self._cache_file + ".tmp"
+        try:
+            fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as stream:
+                stream.write(content)
+            os.replace(temp_file, self._cache_file)
+        except OSError as ex:
+            _logger.warning("couldn't write config cache (%s): %s", self._cache_file, ex)
+            return
+        self._changed = False
@@ -4,14 +4,28 @@ class HueBridgeDefaults:
 
     GROUP_DEBOUNCE_TIME = 300  # milliseconds
     FULL_RELOAD_TIME = 1800  # seconds
+    LIGHT_RATE_LIMIT = 10.0  # commands per second (Hue docs: ~10 light commands per second)
+    GROUP_RATE_LIMIT = 1.0  # commands per second (Hue docs: ~1 group command per second)
+    MAX_CONCURRENT_COMMANDS = 3  # the bridge denies more parallel requests with 429
+    LOCAL_GROUP_STATE = False
+    OFFLINE_DELAY = 5.0  # seconds
+    SNAPSHOT_INTERVAL = 300  # seconds
 
 
 class HueBridgeConfKey:
 
     HOST = "host"
     APP_KEY = "app_key"
+    NAME = "name"
     GROUP_DEBOUNCE_TIME = "group_debounce_time"
     FULL_RELOAD_TIME = "full_reload_time"
+    GROUP_RATE_LIMIT = "group_rate_limit"
+    LIGHT_RATE_LIMIT = "light_rate_limit"
+    LOCAL_GROUP_STATE = "local_group_state"
+    MAX_CONCURRENT_COMMANDS = "max_concurrent_commands"
+    OFFLINE_DELAY = "offline_delay"
+    SNAPSHOT_FILE = "snapshot_file"
+    SNAPSHOT_INTERVAL = "snapshot_interval"
 
 
 HUE_BRIDGE_JSONSCHEMA = {
@@ -21,6 +35,11 @@ HUE_BRIDGE_JSONSCHEMA = {
     "properties": {
         HueBridgeConfKey.HOST: {"type": "string", "minLength": 1, "description": "Host name or IP address"},
         HueBridgeConfKey.APP_KEY: {"type": "string", "minLength": 1, "description": "App key"},
+        HueBridgeConfKey.NAME: {
+            "type": "string",
+            "minLength": 1,
+            "description": "Bridge name, which is referenced by things (required in 'hue_bridges')"
+        },
         HueBridgeConfKey.FULL_RELOAD_TIME: {
             "type": "number",
             "minimum": 60,
@@ -35,5 +54,57 @@ HUE_BRIDGE_JSONSCHEMA = {
             "description": "Hue child lights trigger a group message after this time, Default is "
                            f"{HueBridgeDefaults.GROUP_DEBOUNCE_TIME} milliseconds."
         },
+        HueBridgeConfKey.LIGHT_RATE_LIMIT: {
+            "type": "number",
+            "exclusiveMinimum": 0,
+            "maximum": 100,
+            "description": f"Max. light commands per second, Default is {HueBridgeDefaults.LIGHT_RATE_LIMIT}."
+        },
+        HueBridgeConfKey.GROUP_RATE_LIMIT: {
+            "type": "number",
+            "exclusiveMinimum": 0,
+            "maximum": 100,
+            "description": f"Max. group commands per second, Default is {HueBridgeDefaults.GROUP_RATE_LIMIT}."
+        },
+        HueBridgeConfKey.LOCAL_GROUP_STATE: {
+            "type": "boolean",
+            "description": "Derive group on/off and brightness from the child lights as soon as a light changes, without "
+                           "waiting for the grouped light event and 'group_debounce_time'. Default is false."
+        },
+        HueBridgeConfKey.OFFLINE_DELAY: {
+            "type": "number",
+            "minimum": 0,
+            "maximum": 600,
+            "description": "Things are published as offline, when the Hue event stream is disconnected longer than this time. "
+                           f"Default is {HueBridgeDefaults.OFFLINE_DELAY} seconds."
+        },
+        HueBridgeConfKey.SNAPSHOT_FILE: {
+            "type": "string",
+            "minLength": 1,
+            "description": "Warm start: the last published states are stored in this file. After a restart, states which are "
+                           "still retained by the MQTT broker are not published again, missing retained states are published "
+                           "before the bridge answers. Default: off"
+        },
+        HueBridgeConfKey.SNAPSHOT_INTERVAL: {
+            "type": "number",
+            "minimum": 60,
+            "maximum": 86400,
+            "description": "Min. time between two snapshot writes (only changes are written; and on shutdown). Default is "
+                           f"{HueBridgeDefaults.SNAPSHOT_INTERVAL} seconds."
+        },
+        HueBridgeConfKey.MAX_CONCURRENT_COMMANDS: {
+            "type": "integer",
+            "minimum": 1,
+            "maximum": 10,
+            "description": f"Max. parallel requests to the bridge, Default is {HueBridgeDefaults.MAX_CONCURRENT_COMMANDS}."
+        },
     },
 }
+
+
+HUE_BRIDGES_JSONSCHEMA = {
+    "type": "array",
+    "minItems": 1,
+    "items": {**HUE_BRIDGE_JSONSCHEMA, "required": [*HUE_BRIDGE_JSONSCHEMA["required"], HueBridgeConfKey.NAME]},
+    "description": "Several Hue bridges, driven by one process and one MQTT connection. Things reference their bridge by name."
+}
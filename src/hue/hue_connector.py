@@ -1,27 +1,33 @@
-import datetime
+import asyncio
 import logging
+from asyncio import Task
 from collections import deque
-from typing import Optional, List, Dict, Set, Union, Deque
+from typing import Callable, Optional, List, Dict, Set, Union, Deque
 
+import aiohttp
 import aiohue
 import attr
-import rx
 from aiohue import HueBridgeV2
+from aiohue.util import update_dataclass
 from aiohue.v2 import EventType
+from aiohue.v2.models.device import Device
 from aiohue.v2.models.feature import OnFeature
 from aiohue.v2.models.grouped_light import GroupedLight
 from aiohue.v2.models.light import Light
 from aiohue.v2.models.room import Room
-from rx import operators as rx_ops
-from rx.core import Observer
-from rx.disposable import Disposable
 
 from src.app_config import ConfigException
 from src.hue.hue_command import HueCommand, HueCommandType, SwitchType
 from src.hue.hue_config import HueBridgeConfKey, HueBridgeDefaults
+from src.hue.hue_dispatcher import HueDispatcher
 from src.hue.hue_event_converter import HueEventConverter
+from src.hue.hue_group_state import GroupAggregate, LightContribution
+from src.hue.hue_topology import HueTopology
 from src.thing.thing import Thing
-from src.thing.thing_event import ThingEvent
+from src.thing.thing_event import ThingEvent, ThingStatus
+from src.thing.thing_snapshot import ThingSnapshot
+from src.utils.debouncer import Debouncer
+from src.utils.latency_tracer import LatencyTracer, Trace
 from src.utils.time_utils import TimeUtils
 
 _logger = logging.getLogger(__name__)
@@ -44,12 +50,16 @@ class HueConnectorBase:
 
         self._host = config[HueBridgeConfKey.HOST]
         self._app_key = config[HueBridgeConfKey.APP_KEY]
+        self._name = config.get(HueBridgeConfKey.NAME) or self._host
         self._things: Dict[str, Thing] = {}
 
-        self._group_children: Dict[str, List[str]] = {}
-        self._grouped_light_to_group: Dict[str, str] = {}
+        self._group_children: Dict[str, List[str]] = {}  # configured groups only
         self._hue_items: Dict[str, Union[Light, GroupedLight]] = {}
-        self._light_to_group: Dict[str, str] = {}
+        self._light_to_groups: Dict[str, Set[str]] = {}  # a light may be part of a room and several zones
+        self._light_contributions: Dict[str, LightContribution] = {}
+        self._grouped_light_fingerprints: Dict[str, tuple] = {}  # last processed state
+        self._group_aggregates: Dict[str, GroupAggregate] = {}  # configured groups only
+        self._topology = HueTopology()
 
         self._bridge: Optional[HueBridgeV2] = None
 
@@ -59,6 +69,10 @@ class HueConnectorBase:
                 raise ConfigException(f"Hue item '{thing.hue_id}' is already registered as thing '{thing.name}'!")
             self._things[thing.hue_id] = thing
 
+    @property
+    def name(self) -> str:
+        return self._name
+
     async def connect(self):
         await self._initialize_hue_bridge()
 
@@ -76,6 +90,7 @@ class HueConnectorBase:
         await self._bridge.initialize()
 
         self._bridge.subscribe(self._on_state_changed)
+        self._bridge.events.subscribe(self._on_connection_changed, (EventType.DISCONNECTED, EventType.RECONNECTED))
 
     async def close(self):
         if self._bridge:
@@ -97,17 +112,25 @@ class HueConnectorBase:
     def _on_state_changed(self, event_type: EventType, item):
         pass
 
+    def _on_connection_changed(self, event_type: EventType, _data=None):
+        """Hue event stream got disconnected/reconnected (aiohue reconnects on its own)"""
+        pass
+
     def _rebuild_caches(self):
         self._group_children = {}
-        self._grouped_light_to_group = {}
         self._hue_items = {}
-        self._light_to_group: Dict[str, str] = {}
+        self._light_to_groups = {}
+        self._light_contributions = {}
+        self._grouped_light_fingerprints = {}
+        self._group_aggregates = {}
 
         self._close_debounces()
 
+        self._topology.sync(self._bridge.devices, self._bridge.groups)
+
         # prepare cache first just in case
         for hue_light in self._bridge.lights:
-            self._hue_items[hue_light.id] = hue_light
+            self._cache_hue_item(hue_light)
         for hue_group in self._bridge.groups:
             self._hue_items[hue_group.id] = hue_group
 
@@ -120,13 +143,9 @@ class HueConnectorBase:
                     del self._things[hue_group.id]
                     continue
 
-                self._grouped_light_to_group[hue_group.grouped_light] = hue_group.id
-
-                hue_children_ids = self._find_lights_for_group(hue_group)
-                self._group_children[hue_group.id] = hue_children_ids
-
-                for hue_children_id in hue_children_ids:
-                    self._light_to_group[hue_children_id] = hue_group.id
+                self._update_group_membership(hue_group.id)
+                if not self._group_children[hue_group.id]:
+                    _logger.warning("No children found for '%s' ('%s')!", hue_group.metadata.name, hue_group.id)
 
                 self._register_group_debounce(hue_group)
 
@@ -161,6 +180,9 @@ class HueConnectorBase:
         if not thing:
             return None
 
+        if event_type == EventType.RESOURCE_DELETED:
+            return HueEventConverter.to_thing_event(event_type, item, thing.name)  # offline
+
         if isinstance(item, Room):
             group_item = item
             event_item = self._hue_items.get(group_item.grouped_light)
@@ -176,150 +198,254 @@ class HueConnectorBase:
 
         return thing_event
 
-    def _find_lights_for_group(self, hue_group: Room) -> List[str]:
-        """find all light ids for a group"""
-        device_children: Dict[str, Set[str]] = {}
-        cached_lights: Dict[str, Light] = {}
-
-        for hue_device in self._bridge.devices:
-            device_children[hue_device.id] = hue_device.lights
-        for hue_light in self._bridge.lights:
-            cached_lights[hue_light.id] = hue_light
-
-        hue_children_ids = []
-
-        if isinstance(hue_group, Room):
-            for child_resource in hue_group.children:
-                child_light_ids = list(device_children.get(child_resource.rid, set()))
-                for child_light_id in child_light_ids:
-                    hue_child = cached_lights.get(child_light_id)
-                    hue_children_ids.append(hue_child.id)
+    def _update_group_membership(self, group_id: str):
+        """(re)assign the lights of a configured group from the topology index"""
+        for light_id in self._group_children.get(group_id, []):
+            group_ids = self._light_to_groups.get(light_id)
+            if group_ids:
+                group_ids.discard(group_id)
+                if not group_ids:
+                    del self._light_to_groups[light_id]
+
+        hue_children_ids = list(self._topology.get_group_lights(group_id))
+        self._group_children[group_id] = hue_children_ids
+        aggregate = GroupAggregate()
+        for hue_children_id in hue_children_ids:
+            self._light_to_groups.setdefault(hue_children_id, set()).add(group_id)
+            aggregate.add(self._light_contributions.get(hue_children_id))
+        self._group_aggregates[group_id] = aggregate
+
+    def _apply_topology_event(self, event_type: EventType, item: Union[Device, Room]) -> Set[str]:
+        """
+        Updates the topology index with device/room/zone events.
+        :return: configured group ids, whose lights have changed
+        """
+        if isinstance(item, Device):
+            if event_type == EventType.RESOURCE_DELETED:
+                changed_group_ids = self._topology.remove_device(item.id)
+            else:
+                changed_group_ids = self._topology.update_device(item)
+        elif isinstance(item, Room):
+            if event_type == EventType.RESOURCE_DELETED:
+                changed_group_ids = self._topology.remove_group(item.id)
+            else:
+                changed_group_ids = self._topology.update_group(item)
+        else:
+            return set()
 
-        if not hue_children_ids:
-            _logger.warning("No children found for '%s' ('%s')!", hue_group.metadata.name, hue_group.id)
+        changed_group_ids = {g for g in changed_group_ids if g in self._group_children}
+        for group_id in changed_group_ids:
+            self._update_group_membership(group_id)
+            _logger.info("lights of group '%s' changed: %s", group_id, self._group_children[group_id])
 
-        return hue_children_ids
+        return changed_group_ids
 
     def _get_average_brightness_for_group(self, hue_group: Room) -> Optional[float]:
-        hue_children = self._get_lights_for_group(hue_group)
-
-        dimming_count = 0
-        children_count = 0
-        brightness_sum = 0
-
-        for hue_child in hue_children:
-            if isinstance(hue_child, Light):
-                children_count += 1
-                is_on = hue_child.on.on
-                if hue_child.dimming:
-                    dimming_count += 1
-                    brightness_sum += hue_child.dimming.brightness if is_on else 0
-                else:
-                    brightness_sum += 100.0 if is_on else 0
-
-        if dimming_count == 0:
-            return None
-
-        average = brightness_sum / children_count
-        return average
+        aggregate = self._group_aggregates.get(hue_group.id)
+        return aggregate.average_brightness if aggregate else None
+
+    def _cache_hue_item(self, item, deleted: bool = False) -> Set[str]:
+        """
+        Stores the item and keeps the group aggregates in sync.
+        :return: configured group ids, the light belongs to
+        """
+        if deleted:
+            self._hue_items.pop(item.id, None)
+            self._grouped_light_fingerprints.pop(item.id, None)
+        else:
+            self._hue_items[item.id] = item
+            if isinstance(item, GroupedLight):
+                self._grouped_light_fingerprints[item.id] = self._get_grouped_light_fingerprint(item)
+        if not isinstance(item, Light):
+            return set()
+
+        old_contribution = self._light_contributions.get(item.id)
+        if deleted:
+            new_contribution = None
+            self._light_contributions.pop(item.id, None)
+        else:
+            new_contribution = LightContribution.from_light(item)
+            self._light_contributions[item.id] = new_contribution
 
-    def _get_lights_for_group(self, hue_group: Room) -> List[Light]:
-        hue_children_ids = self._group_children.get(hue_group.id)
-        hue_children = []
-        for hue_child_id in hue_children_ids:
-            hue_child = self._hue_items.get(hue_child_id)
-            if hue_child:
-                hue_children.append(hue_child)
+        group_ids = self._light_to_groups.get(item.id, set())
+        if old_contribution != new_contribution:
+            for group_id in group_ids:
+                self._group_aggregates[group_id].replace(old_contribution, new_contribution)
+        return group_ids
 
-        return hue_children
+    @classmethod
+    def _get_grouped_light_fingerprint(cls, item: GroupedLight) -> tuple:
+        return (
+            item.on.on if item.on else None,
+            item.dimming.brightness if getattr(item, "dimming", None) else None,
+        )
 
 
 class HueConnector(HueConnectorBase):
 
+    BUCKET_LIGHTS = "lights"
+    BUCKET_GROUPS = "groups"
+
+    DISPATCH_WAIT_WARNING = 2.0  # seconds
+    RESYNC_DELAY_MIN = 1.0  # seconds; doubled with each failed attempt
+    RESYNC_DELAY_MAX = 60.0
+    COMMAND_TRACE_TIMEOUT = 10.0  # seconds; a later Hue event doesn't belong to the command anymore
+
     def __init__(self, config, things: List[Thing]):
         super().__init__(config, things)
 
         self._group_debounce_time = config.get(HueBridgeConfKey.GROUP_DEBOUNCE_TIME, HueBridgeDefaults.GROUP_DEBOUNCE_TIME) / 1000
         self._full_reload_time = config.get(HueBridgeConfKey.FULL_RELOAD_TIME, HueBridgeDefaults.FULL_RELOAD_TIME)
-
-        self._thing_commands: Deque[(Thing, HueCommand)] = deque()
-
-        self._group_observers: Dict[str, Optional[Observer]] = {}  # group id: observer
-        self._state_observers: Dict[str, Optional[Observer]] = {}  # thing id: observer
-        self._disposables: List[Disposable] = []
+        self._local_group_state = config.get(HueBridgeConfKey.LOCAL_GROUP_STATE, HueBridgeDefaults.LOCAL_GROUP_STATE)
+        self._offline_delay = config.get(HueBridgeConfKey.OFFLINE_DELAY, HueBridgeDefaults.OFFLINE_DELAY)
+
+        self._thing_commands: Deque[(Thing, HueCommand, Optional[Trace])] = deque()
+        self._dispatcher = HueDispatcher(
+            rate_limits={
+                self.BUCKET_LIGHTS: config.get(HueBridgeConfKey.LIGHT_RATE_LIMIT, HueBridgeDefaults.LIGHT_RATE_LIMIT),
+                self.BUCKET_GROUPS: config.get(HueBridgeConfKey.GROUP_RATE_LIMIT, HueBridgeDefaults.GROUP_RATE_LIMIT),
+            },
+            max_concurrency=config.get(HueBridgeConfKey.MAX_CONCURRENT_COMMANDS, HueBridgeDefaults.MAX_CONCURRENT_COMMANDS)
+        )
+        self._command_things: Dict[Thing, None] = {}  # things with pending commands; insertion ordered set
+        self._wakeup: Optional[Callable[[], None]] = None
+
+        self._debouncer = Debouncer()  # shared by all things and groups
+        self._debounced_groups: Set[str] = set()  # group ids
+        self._debounced_things: Dict[str, float] = {}  # thing id: debounce time
+
+        # latency traces: sent commands wait for their Hue event, events for their debounce release
+        self._command_traces: Dict[str, Trace] = {}  # thing id
+        self._event_traces: Dict[str, Trace] = {}  # thing id
+        self._trace_events = True
 
         self._next_refresh_time = self.get_next_refresh_time()
 
-    async def connect(self):
-        await super().connect()
+        # event stream gaps: things go offline after `offline_delay`, the reconnect triggers a resync
+        self._stream_connected = True
+        self._offline_handle: Optional[asyncio.TimerHandle] = None
+        self._things_offline = False  # offline published, so all things have to be republished
+        self._resync_task: Optional[Task] = None
 
-        self._next_refresh_time = self.get_next_refresh_time()
+        self._snapshot: Optional[ThingSnapshot] = None
+        snapshot_file = config.get(HueBridgeConfKey.SNAPSHOT_FILE)
+        if snapshot_file:
+            snapshot_interval = config.get(HueBridgeConfKey.SNAPSHOT_INTERVAL, HueBridgeDefaults.SNAPSHOT_INTERVAL)
+            self._snapshot = ThingSnapshot(snapshot_file, snapshot_interval)
+            self._restore_snapshot()
 
-    def _close_debounces(self):
-        for observable in self._group_observers.values():
-            observable.on_completed()
-        self._group_observers = {}
+        for thing in self._things.values():
+            thing.set_command_listener(self._on_thing_command)
 
-        for observable in self._state_observers.values():
-            observable.on_completed()
-        self._state_observers = {}
+    def set_wakeup(self, wakeup: Optional[Callable[[], None]]):
+        """wakeup gets called when there are commands to send"""
+        self._wakeup = wakeup
 
-        for disposable in self._disposables:
-            disposable.dispose()
-        self._disposables = []
+    def _on_thing_command(self, thing: Thing):
+        self._command_things[thing] = None
+        if self._wakeup:
+            self._wakeup()
 
-    def _register_state_debounce(self, thing: Thing):
-        thing_id = thing.hue_id
+    async def connect(self):
+        await super().connect()
 
-        def creating_observer_callback(observer, _):
-            self._state_observers[thing_id] = observer
+        self._next_refresh_time = self.get_next_refresh_time()
 
-        def feed_state_update(thing_event: ThingEvent):
-            thing_inner = self._things.get(thing_id)
-            if thing_inner:
-                thing_inner.process_state_change(thing_event)
-            else:
-                _logger.debug('No "debounced state update"" possible: thing id (%s) not found!', thing_id)
-            pass
+    async def close(self):
+        self._cancel_resync()
+        await self._dispatcher.close()
+        self._save_snapshot(force=True)
+        await super().close()
+
+    def _restore_snapshot(self):
+        """Restored states are confirmed by the broker or published by the MQTT proxy, before the bridge answers."""
+        restored = self._snapshot.load(self._things)
+        if restored:
+            _logger.info("warm start: %d states restored from snapshot (%s)", restored, self._snapshot.file_path)
+
+    def _save_snapshot(self, force: bool = False):
+        if self._snapshot and self._snapshot.save(self._things.values(), force=force):
+            _logger.debug("snapshot written (%s)", self._snapshot.file_path)
+
+    def _cancel_resync(self):
+        if self._offline_handle:
+            self._offline_handle.cancel()
+            self._offline_handle = None
+        if self._resync_task:
+            self._resync_task.cancel()
+            self._resync_task = None
+
+    @property
+    def dispatcher(self) -> HueDispatcher:
+        return self._dispatcher
+
+    def get_status(self) -> Dict[str, any]:
+        return {
+            "connected": self._bridge is not None and self._stream_connected,
+            "queue_depth": self._dispatcher.queue_depth,
+            "things": len(self._things),
+        }
 
-        observable = rx.create(creating_observer_callback)
+    def _rebuild_caches(self):
+        self._trace_events = False  # the initial states are no Hue events
+        try:
+            super()._rebuild_caches()
+        finally:
+            self._trace_events = True
 
-        disposable = observable.pipe(
-            rx_ops.debounce(thing.state_debounce_time)
-        ).subscribe(lambda thing_event: feed_state_update(thing_event))
+    def _close_debounces(self):
+        self._debouncer.clear()
+        self._debounced_groups = set()
+        self._debounced_things = {}
+        self._command_traces = {}
+        self._event_traces = {}
 
-        self._disposables.append(disposable)
+    def _register_state_debounce(self, thing: Thing):
+        self._debounced_things[thing.hue_id] = thing.state_debounce_time
 
     def _register_group_debounce(self, hue_group: Room):
-        group_id = hue_group.id
-
-        def creating_observer_callback(observer, _):
-            group_id_inner = group_id
-            self._group_observers[group_id_inner] = observer
-
-        def feed_group_update():
-            group_id_inner = group_id
-            hue_group_inner = self._hue_items.get(group_id_inner)
-            if hue_group_inner:
-                self._on_state_changed(EventType.RESOURCE_UPDATED, hue_group_inner)
-            else:
-                _logger.debug('No "debounced group update"" possible: group id (%s) not found! Just refreshing...?', group_id_inner)
-
-        observable = rx.create(creating_observer_callback)
-
-        disposable = observable.pipe(
-            rx_ops.debounce(self._group_debounce_time)
-        ).subscribe(lambda _: feed_group_update())
+        self._debounced_groups.add(hue_group.id)
+
+    def _feed_state_update(self, thing_event: ThingEvent):
+        thing = self._things.get(thing_event.id)
+        if thing:
+            trace = self._event_traces.pop(thing_event.id, None)
+            if trace is not None:
+                LatencyTracer.stamp(trace, LatencyTracer.DEBOUNCE_RELEASE)
+            thing.process_state_change(thing_event, trace)
+        else:
+            _logger.debug('No "debounced state update"" possible: thing id (%s) not found!', thing_event.id)
 
-        self._disposables.append(disposable)
+    def _feed_group_update(self, group_id: str):
+        hue_group = self._hue_items.get(group_id)
+        if hue_group:
+            self._on_state_changed(EventType.RESOURCE_UPDATED, hue_group)
+        else:
+            _logger.debug('No "debounced group update"" possible: group id (%s) not found! Just refreshing...?', group_id)
 
     def _trigger_group_debounce(self, group_id):
-        observer = self._group_observers.get(group_id)
-        if observer:
-            observer.on_next(group_id)
+        if group_id in self._debounced_groups:
+            self._debouncer.trigger(("group", group_id), self._group_debounce_time, self._feed_group_update, group_id)
         else:
             _logger.warning("'group debounce' failed, because group (%s) was not found!", group_id)
 
+    def _publish_local_group_state(self, group_id: str):
+        """derive the group state from the child lights at once, without waiting for the grouped light event"""
+        thing = self._things.get(group_id)
+        aggregate = self._group_aggregates.get(group_id)
+        debounce_time = self._debounced_things.get(group_id)
+        if not thing or not aggregate or debounce_time is None:
+            return
+
+        thing_event = ThingEvent(
+            status=ThingStatus.ON if aggregate.is_on else ThingStatus.OFF,
+            id=group_id,
+            name=thing.name,
+            type="group",
+            brightness=aggregate.average_brightness,
+        )
+        self._debouncer.trigger(("state", group_id), debounce_time, self._feed_state_update, thing_event)
+
     def _on_state_changed(self, event_type: EventType, item):
         if not item or not item.id:
             _logger.debug("skipped 'on_state_changed' because an invalid item.")
@@ -327,57 +453,223 @@ class HueConnector(HueConnectorBase):
 
         # _logger.debug("_on_state_changed - in: %s, %s", event_type, item)
 
-        self._hue_items[item.id] = item
+        if isinstance(item, (Device, Room)):
+            for group_id in self._apply_topology_event(event_type, item):
+                self._trigger_group_debounce(group_id)
+            if isinstance(item, Device):
+                return
+
+        group_ids = self._cache_hue_item(item, deleted=(event_type == EventType.RESOURCE_DELETED))
 
         if isinstance(item, GroupedLight):
-            group_id = self._grouped_light_to_group.get(item.id)
-            if group_id:
+            group_id = self._topology.get_group_for_grouped_light(item.id)
+            if group_id in self._group_children:
+                self._trace_hue_event(group_id)
                 self._trigger_group_debounce(group_id)
             return  # event is prepared and sent when group gets through
 
-        if isinstance(item, Light):
-            group_id = self._light_to_group.get(item.id)
-            if group_id:
+        for group_id in group_ids:
+            if self._local_group_state:
+                self._publish_local_group_state(group_id)
+            else:
                 self._trigger_group_debounce(group_id)
 
         thing_event = self._generate_thing_status(item, event_type)
         if not thing_event:
             return  # item is not configured
+        if isinstance(item, Light):
+            self._trace_hue_event(item.id)
 
         _logger.debug("_on_state_changed: %s, %s => %s", event_type, item, thing_event)
-        observer = self._state_observers.get(thing_event.id)
-        if observer:
-            observer.on_next(thing_event)
+        debounce_time = self._debounced_things.get(thing_event.id)
+        if debounce_time is not None:
+            self._debouncer.trigger(("state", thing_event.id), debounce_time, self._feed_state_update, thing_event)
+
+    def _trace_hue_event(self, thing_id: str):
+        """continues the trace of a sent command or starts an event trace (kept until the debounce release)"""
+        if not self._trace_events or thing_id not in self._debounced_things:
+            return
+        trace = self._command_traces.pop(thing_id, None)
+        if trace is not None and LatencyTracer.now() - trace.last_time < self.COMMAND_TRACE_TIMEOUT:
+            LatencyTracer.stamp(trace, LatencyTracer.HUE_EVENT)
+        elif thing_id not in self._event_traces:
+            trace = LatencyTracer.start(LatencyTracer.EVENT, thing_id, LatencyTracer.HUE_EVENT)
+            if trace is None:
+                return  # tracing is off
+        else:
+            return  # debounced: the first event is traced
+        self._event_traces[thing_id] = trace
+
+    def _on_connection_changed(self, event_type: EventType, _data=None):
+        self._stream_connected = event_type != EventType.DISCONNECTED
+        if event_type == EventType.DISCONNECTED:
+            _logger.warning("Hue event stream disconnected (%s)", self._name)
+            if self._offline_handle is None and not self._things_offline:
+                self._offline_handle = asyncio.get_running_loop().call_later(self._offline_delay, self._publish_things_offline)
+        elif event_type == EventType.RECONNECTED:
+            _logger.info("Hue event stream reconnected (%s)", self._name)
+            if self._offline_handle:
+                self._offline_handle.cancel()
+                self._offline_handle = None
+            if self._resync_task is None or self._resync_task.done():
+                self._resync_task = asyncio.create_task(self._resync())
+
+    def _publish_things_offline(self):
+        self._offline_handle = None
+        self._things_offline = True
+        _logger.warning("Hue event stream is disconnected for %.1fs => things are offline", self._offline_delay)
+        for thing in self._things.values():
+            debounce_time = self._debounced_things.get(thing.hue_id)
+            if debounce_time is not None:  # replaces pending states
+                thing_event = ThingEvent(status=ThingStatus.OFFLINE, id=thing.hue_id, name=thing.name)
+                self._debouncer.trigger(("state", thing.hue_id), debounce_time, self._feed_state_update, thing_event)
+
+    async def _resync(self):
+        """
+        Events, which were missed while the event stream was disconnected, get fetched afterwards: only the resource types
+        of the configured things (not the full state). Retried with backoff, as long as the bridge doesn't answer.
+        """
+        delay = self.RESYNC_DELAY_MIN
+        while True:
+            try:
+                changes = await self._resync_configured_items()
+                _logger.info("resync after event stream gap: %d changes", changes)
+                return
+            except (aiohue.errors.AiohueException, aiohttp.ClientError, asyncio.TimeoutError) as ex:
+                _logger.warning("resync failed (%s), next attempt in %.1fs", ex, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.RESYNC_DELAY_MAX)
+
+    async def _resync_configured_items(self) -> int:
+        """:return: count of changes"""
+        light_ids = set()
+        grouped_light_ids = set()
+        for thing_id in self._things:
+            item = self._hue_items.get(thing_id)
+            if isinstance(item, Light):
+                light_ids.add(thing_id)
+            elif isinstance(item, Room):
+                light_ids.update(self._group_children.get(thing_id, []))
+                grouped_light_ids.add(item.grouped_light)
+
+        fetched = []
+        for resource_type, item_ids in [("light", light_ids), ("grouped_light", grouped_light_ids)]:
+            if item_ids:
+                resources = await self._bridge.request("get", f"clip/v2/resource/{resource_type}")
+                fetched.extend(r for r in resources if r.get("id") in item_ids)
+
+        changes = 0
+        for resource in fetched:
+            item = self._hue_items.get(resource["id"])
+            if item is None:
+                continue  # deleted meanwhile; the next full reload cleans up
+            update_dataclass(item, resource)  # aiohue objects get updated in place, like by events
+            if self._things_offline or self._has_diverged(item):
+                self._on_state_changed(EventType.RESOURCE_UPDATED, item)
+                changes += 1
+
+        if self._things_offline:
+            self._things_offline = False
+            for thing_id in self._things:  # groups without changed lights and lights of not fetched types
+                item = self._hue_items.get(thing_id)
+                if isinstance(item, Room):
+                    self._on_state_changed(EventType.RESOURCE_UPDATED, item)
+
+        return changes
+
+    def _has_diverged(self, item: Union[Light, GroupedLight]) -> bool:
+        """:return: True, if the item state differs from the processed state"""
+        if self._hue_items.get(item.id) is not item:
+            return True
+        if isinstance(item, Light):
+            return LightContribution.from_light(item) != self._light_contributions.get(item.id)
+        if isinstance(item, GroupedLight):
+            return self._get_grouped_light_fingerprint(item) != self._grouped_light_fingerprints.get(item.id)
+        return False
 
     async def process_timer(self):
-        """placeholder for reconnects or other organisational stuff"""
-        if self._bridge and TimeUtils.now() > self._next_refresh_time:
+        """full reloads and other organisational stuff"""
+        self._dispatcher.raise_failure()
+        metrics = self._dispatcher.get_metrics(reset=True)
+        if metrics["wait_time_max"] > self.DISPATCH_WAIT_WARNING:
+            _logger.warning("Hue commands are near the bridge rate limit: %s", metrics)
+        elif metrics["sent"]:
+            _logger.debug("Hue command dispatching: %s", metrics)
+
+        if self._resync_task and self._resync_task.done():
+            resync_task, self._resync_task = self._resync_task, None
+            resync_task.result()  # raises unexpected errors
+
+        self._save_snapshot()
+
+        # while the event stream is disconnected, the bridge is not reachable; the reconnect triggers a resync
+        if self._bridge and self._stream_connected and TimeUtils.monotonic() > self._next_refresh_time:
             self._next_refresh_time = self.get_next_refresh_time()
-            _logger.info("full refresh")
+            changes = await self._fetch_full_state()
+            _logger.info("full refresh (%s): %d changes", self._name, changes)
+
+    async def _fetch_full_state(self) -> int:
+        """
+        aiohue diffs the fetched resources against its own and emits events for the changes (added, updated, deleted),
+        which are processed like live events; the debounce state is kept.
+        :return: count of events received meanwhile
+        """
+        event_count = 0
+
+        def count_event(_event_type: EventType, _item):
+            nonlocal event_count
+            event_count += 1
+
+        unsubscribe = self._bridge.subscribe(count_event)
+        try:
             await self._bridge.fetch_full_state()
-            self._rebuild_caches()
+        finally:
+            unsubscribe()
+        return event_count
 
     def fetch_commands(self) -> bool:
-        for device in self._things.values():
+        command_things, self._command_things = self._command_things, {}
+        for device in command_things:
+            if device.hue_id not in self._things:
+                continue  # dropped while rebuilding caches
             command = device.get_hue_command()
+            trace = device.get_command_trace()
             if command:
-                self._thing_commands.append((device, command))
+                if trace is not None:
+                    LatencyTracer.stamp(trace, LatencyTracer.FETCH_COMMANDS)
+                self._thing_commands.append((device, command, trace))
         return bool(self._thing_commands)
 
     async def send_commands(self):
+        """Hands over the commands to the dispatcher, which sends them concurrently within the bridge rate limits."""
+        self._dispatcher.raise_failure()
         while self._thing_commands:
-            device, command = self._thing_commands.popleft()
+            device, command, trace = self._thing_commands.popleft()
 
             hue_item = self._hue_items.get(device.hue_id)
             if hue_item:
-                command = self._prepare_toggle_command(hue_item, command)
-
-                try:
-                    await self._send_command(hue_item, command)
-                except HueException as ex:
-                    _logger.warning("command failures ('%s', %s): %s", device.name, command, ex)
+                bucket = self.BUCKET_GROUPS if isinstance(hue_item, Room) else self.BUCKET_LIGHTS
+                self._dispatcher.submit(bucket, device.hue_id, self._create_command_sender(device, command, trace))
             # else: hue item does not exist, wrongly configured
 
+    def _create_command_sender(self, device: Thing, command: HueCommand, trace: Optional[Trace] = None):
+        async def send():
+            hue_item = self._hue_items.get(device.hue_id)  # current state is needed for toggling
+            if not hue_item:
+                return
+            if trace is not None:
+                LatencyTracer.stamp(trace, LatencyTracer.SET_LIGHT_START)
+            try:
+                await self._send_command(hue_item, self._prepare_toggle_command(hue_item, command))
+            except HueException as ex:
+                _logger.warning("command failures ('%s', %s): %s", device.name, command, ex)
+                return
+            if trace is not None:
+                LatencyTracer.stamp(trace, LatencyTracer.SET_LIGHT_END)
+                self._command_traces[device.hue_id] = trace  # continued by the Hue event
+
+        return send
+
     async def _send_command(self, hue_item: Union[Light, Room], command: HueCommand):
         # _logger.debug("send_device_command:\n%s\n%s", hue_item, command)
 
@@ -408,6 +700,8 @@ class HueConnector(HueConnectorBase):
             else:
                 raise Exception(f"_set_light doesn't support '{type(hue_item)}'!")
 
+        except aiohue.errors.BridgeBusy:
+            raise  # the dispatcher retries
         except aiohue.errors.AiohueException as ex:
             # further analysis needed!
             _logger.error("%s(%s, %s, %s): %s", log_info, hue_item, on, brightness, ex)
@@ -452,5 +746,5 @@ class HueConnector(HueConnectorBase):
 
         return command
 
-    def get_next_refresh_time(self) -> datetime.datetime:
-        return TimeUtils.now() + datetime.timedelta(seconds=self._full_reload_time)
+    def get_next_refresh_time(self) -> float:
+        return TimeUtils.monotonic() + self._full_reload_time
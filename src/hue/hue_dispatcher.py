@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import time
+from asyncio import Task
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+import aiohttp
+import aiohue
+
+_logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `capacity` tokens for bursts."""
+
+    def __init__(self, rate: float, capacity: float):
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._last) * self._rate)
+        self._last = now
+
+    def pause(self, seconds: float):
+        """No tokens are handed out for `seconds`, afterwards the bucket starts empty."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    async def acquire(self) -> float:
+        """:return: waited seconds"""
+        waited = 0.0
+        while True:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                waited += pause
+                await asyncio.sleep(pause)
+                self._tokens = 0.0
+                self._last = time.monotonic()
+                continue
+
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return waited
+
+            delay = (1 - self._tokens) / self._rate
+            waited += delay
+            await asyncio.sleep(delay)
+
+
+class HueDispatcher:
+    """
+    Sends Hue commands concurrently, but stays within the bridge limits: one token bucket per bucket name (lights, groups)
+    and a max. number of parallel requests. Commands queued for the same key get replaced by newer ones (only the last
+    command of a thing counts), and there is at most one command in flight per key, so an older command never lands
+    after a newer one. Busy bridges (HTTP 429/503) pause the whole bucket, the command is retried with exponential
+    backoff, unless a newer command for its key is queued. Expected connection errors are logged, unexpected errors are
+    kept and re-raised by `raise_failure`.
+    """
+
+    MAX_RETRIES = 3
+    RETRY_BACKOFF = 0.5  # seconds, doubled on each retry
+
+    def __init__(self, rate_limits: Dict[str, float], max_concurrency: int):
+        self._buckets: Dict[str, TokenBucket] = {name: TokenBucket(rate, max(1.0, rate)) for name, rate in rate_limits.items()}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        # bucket name: {key: (func, submit time)}
+        self._queues: Dict[str, OrderedDict[str, Tuple[Callable[[], Awaitable], float]]] = {name: OrderedDict() for name in rate_limits}
+        self._workers: Dict[str, Task] = {}
+        self._running: Set[Task] = set()
+        self._in_flight: Set[Tuple[str, str]] = set()  # (bucket name, key)
+        self._released: Dict[str, asyncio.Event] = {name: asyncio.Event() for name in rate_limits}  # an in-flight key got free
+
+        self._wait_count = 0
+        self._wait_time_sum = 0.0
+        self._wait_time_max = 0.0
+        self._retry_count = 0
+        self._coalesced_count = 0
+
+        self._failure: Optional[Exception] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def get_metrics(self, reset: bool = False) -> Dict[str, any]:
+        metrics = {
+            "queue_depth": self.queue_depth,
+            "in_flight": len(self._running),
+            "wait_time_avg": self._wait_time_sum / self._wait_count if self._wait_count else 0.0,
+            "wait_time_max": self._wait_time_max,
+            "sent": self._wait_count,
+            "retries": self._retry_count,
+            "coalesced": self._coalesced_count,
+        }
+        if reset:
+            self._wait_count = 0
+            self._wait_time_sum = 0.0
+            self._wait_time_max = 0.0
+            self._retry_count = 0
+            self._coalesced_count = 0
+        return metrics
+
+    def submit(self, bucket: str, key: str, func: Callable[[], Awaitable]):
+        """Queues `func` (creates the coroutine to send), a queued command with the same key gets replaced."""
+        queue = self._queues[bucket]
+        previous = queue.get(key)
+        if previous:
+            self._coalesced_count += 1
+            queue[key] = (func, previous[1])
+        else:
+            queue[key] = (func, time.monotonic())
+
+        if bucket not in self._workers:
+            self._workers[bucket] = asyncio.create_task(self._work(bucket))
+
+    def raise_failure(self):
+        """Re-raises an unexpected error of a sent command (once)."""
+        failure, self._failure = self._failure, None
+        if failure is not None:
+            raise failure
+
+    async def join(self):
+        """Waits until all queued commands are sent."""
+        while self._workers or self._running:
+            await asyncio.gather(*self._workers.values(), *self._running, return_exceptions=True)
+
+    async def close(self):
+        tasks = [*self._workers.values(), *self._running]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = {}
+        self._running = set()
+        self._in_flight = set()
+        for queue in self._queues.values():
+            queue.clear()
+
+    async def _work(self, bucket: str):
+        queue = self._queues[bucket]
+        try:
+            while queue:
+                if self._next_key(bucket) is None:  # only keys with a command in flight are queued
+                    released = self._released[bucket]
+                    released.clear()
+                    await released.wait()
+                    continue
+
+                await self._buckets[bucket].acquire()
+                key = self._next_key(bucket)
+                if key is None:
+                    continue
+                func, submit_time = queue.pop(key)
+
+                wait_time = time.monotonic() - submit_time
+                self._wait_count += 1
+                self._wait_time_sum += wait_time
+                self._wait_time_max = max(self._wait_time_max, wait_time)
+
+                self._in_flight.add((bucket, key))
+                task = asyncio.create_task(self._execute(bucket, key, func))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+        finally:
+            self._workers.pop(bucket, None)
+
+    def _next_key(self, bucket: str) -> Optional[str]:
+        """:return: the oldest queued key without a command in flight"""
+        return next((k for k in self._queues[bucket] if (bucket, k) not in self._in_flight), None)
+
+    async def _execute(self, bucket: str, key: str, func: Callable[[], Awaitable]):
+        try:
+            await self._send(bucket, key, func)
+        finally:
+            self._in_flight.discard((bucket, key))
+            self._released[bucket].set()
+
+    async def _send(self, bucket: str, key: str, func: Callable[[], Awaitable]):
+        for retry in range(self.MAX_RETRIES + 1):
+            try:
+                async with self._semaphore:
+                    await func()
+                return
+            except Exception as ex:
+                if not self.is_busy_error(ex):
+                    if isinstance(ex, (aiohue.errors.AiohueException, aiohttp.ClientError, asyncio.TimeoutError)):
+                        _logger.error("sending Hue command failed: %s", ex)
+                    elif self._failure is None:
+                        self._failure = ex
+                    return
+                if retry >= self.MAX_RETRIES:
+                    _logger.error("sending Hue command failed, the bridge is still busy: %s", ex)
+                    return
+
+            self._retry_count += 1
+            backoff = self.RETRY_BACKOFF * (2 ** retry)
+            _logger.warning("Hue bridge is busy, retry in %.1fs", backoff)
+            self._buckets[bucket].pause(backoff)  # other commands of the bucket wait too
+            await asyncio.sleep(backoff)  # without occupying a concurrency slot
+            if key in self._queues[bucket]:
+                _logger.debug("retry of '%s' dropped, a newer command is queued", key)
+                self._coalesced_count += 1
+                return
+
+    @classmethod
+    def is_busy_error(cls, ex: Optional[Exception]) -> bool:
+        if isinstance(ex, aiohue.errors.BridgeBusy):
+            return True
+        if isinstance(ex, aiohttp.ClientResponseError) and ex.status in (429, 503):
+            return True
+        return False
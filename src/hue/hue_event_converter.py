@@ -22,7 +22,7 @@ class HueEventConverter:
 
         if event_type in [EventType.RESOURCE_DELETED, EventType.DISCONNECTED]:
             e.status = ThingStatus.OFFLINE
-            return
+            return e
 
         is_on: Optional[bool] = None
 
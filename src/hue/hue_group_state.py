@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import attr
+from aiohue.v2.models.light import Light
+
+
+@attr.frozen
+class LightContribution:
+    """What a single light contributes to the state of its groups."""
+
+    is_on: bool
+    dimmable: bool
+    brightness: float  # 0 if switched off; non-dimmable lights count as 100 if switched on
+
+    @classmethod
+    def from_light(cls, light: Light) -> LightContribution:
+        is_on = bool(light.on and light.on.on)
+        if light.dimming:
+            brightness = light.dimming.brightness if is_on else 0.0
+        else:
+            brightness = 100.0 if is_on else 0.0
+        return LightContribution(is_on=is_on, dimmable=bool(light.dimming), brightness=brightness)
+
+
+class GroupAggregate:
+    """Running on/off and brightness aggregates of a group, updated in O(1) per changed light."""
+
+    def __init__(self):
+        self.children_count = 0
+        self.on_count = 0
+        self.dimmable_count = 0
+        self.brightness_sum = 0.0
+
+    def add(self, contribution: Optional[LightContribution]):
+        self._apply(contribution, 1)
+
+    def remove(self, contribution: Optional[LightContribution]):
+        self._apply(contribution, -1)
+
+    def replace(self, old: Optional[LightContribution], new: Optional[LightContribution]):
+        self._apply(old, -1)
+        self._apply(new, 1)
+
+    def _apply(self, contribution: Optional[LightContribution], sign: int):
+        if contribution is None:
+            return
+        self.children_count += sign
+        self.on_count += sign if contribution.is_on else 0
+        self.dimmable_count += sign if contribution.dimmable else 0
+        self.brightness_sum += sign * contribution.brightness
+
+    @property
+    def is_on(self) -> bool:
+        return self.on_count > 0
+
+    @property
+    def average_brightness(self) -> Optional[float]:
+        if self.dimmable_count == 0 or self.children_count == 0:
+            return None
+        return max(self.brightness_sum, 0.0) / self.children_count
@@ -0,0 +1,134 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from aiohue.v2.models.device import Device
+from aiohue.v2.models.resource import ResourceTypes
+from aiohue.v2.models.room import Room
+
+
+class HueTopology:
+    """
+    Persistent index of the Hue topology: which lights belong to which device and which devices/lights belong to which
+    room or zone. It's built once and then updated incrementally from resource events. Each update returns the ids of
+    the groups, whose light membership changed.
+    """
+
+    def __init__(self):
+        self._device_lights: Dict[str, Set[str]] = {}  # device id: light ids
+
+        self._group_devices: Dict[str, Tuple[str, ...]] = {}  # group id: device ids (rooms)
+        self._group_direct_lights: Dict[str, Tuple[str, ...]] = {}  # group id: light ids (zones)
+        self._child_groups: Dict[str, Set[str]] = {}  # device or light id: group ids
+
+        self._grouped_light_to_group: Dict[str, str] = {}
+        self._group_to_grouped_light: Dict[str, str] = {}
+
+        self._group_lights: Dict[str, List[str]] = {}  # cached results
+
+    def clear(self):
+        self.__init__()
+
+    @property
+    def group_ids(self) -> Set[str]:
+        return set(self._group_devices.keys())
+
+    def get_group_lights(self, group_id: str) -> List[str]:
+        """Light ids of a group (room or zone)"""
+        lights = self._group_lights.get(group_id)
+        if lights is None:
+            lights = []
+            for device_id in self._group_devices.get(group_id, ()):
+                for light_id in sorted(self._device_lights.get(device_id, ())):
+                    if light_id not in lights:
+                        lights.append(light_id)
+            for light_id in self._group_direct_lights.get(group_id, ()):
+                if light_id not in lights:
+                    lights.append(light_id)
+            self._group_lights[group_id] = lights
+        return lights
+
+    def get_group_for_grouped_light(self, grouped_light_id: str) -> Optional[str]:
+        return self._grouped_light_to_group.get(grouped_light_id)
+
+    def update_device(self, device: Device) -> Set[str]:
+        light_ids = device.lights
+        if self._device_lights.get(device.id) == light_ids:
+            return set()
+        self._device_lights[device.id] = light_ids
+        return self._invalidate(self._child_groups.get(device.id, set()))
+
+    def remove_device(self, device_id: str) -> Set[str]:
+        if self._device_lights.pop(device_id, None) is None:
+            return set()
+        return self._invalidate(self._child_groups.get(device_id, set()))
+
+    def update_group(self, group: Room) -> Set[str]:
+        device_ids = tuple(c.rid for c in group.children if c.rtype == ResourceTypes.DEVICE)
+        light_ids = tuple(c.rid for c in group.children if c.rtype == ResourceTypes.LIGHT)
+        grouped_light_id = group.grouped_light
+
+        old_grouped_light_id = self._group_to_grouped_light.get(group.id)
+        if old_grouped_light_id != grouped_light_id:
+            if old_grouped_light_id:
+                self._grouped_light_to_group.pop(old_grouped_light_id, None)
+                del self._group_to_grouped_light[group.id]
+            if grouped_light_id:
+                self._grouped_light_to_group[grouped_light_id] = group.id
+                self._group_to_grouped_light[group.id] = grouped_light_id
+
+        if self._group_devices.get(group.id) == device_ids and self._group_direct_lights.get(group.id) == light_ids:
+            return set()
+
+        self._unlink_children(group.id)
+        self._group_devices[group.id] = device_ids
+        self._group_direct_lights[group.id] = light_ids
+        for child_id in device_ids + light_ids:
+            self._child_groups.setdefault(child_id, set()).add(group.id)
+
+        return self._invalidate({group.id})
+
+    def remove_group(self, group_id: str) -> Set[str]:
+        if group_id not in self._group_devices:
+            return set()
+
+        self._unlink_children(group_id)
+        del self._group_devices[group_id]
+        del self._group_direct_lights[group_id]
+        grouped_light_id = self._group_to_grouped_light.pop(group_id, None)
+        if grouped_light_id:
+            self._grouped_light_to_group.pop(grouped_light_id, None)
+
+        return self._invalidate({group_id})
+
+    def sync(self, devices: Iterable[Device], groups: Iterable[Room]) -> Set[str]:
+        """Applies a full resource listing (reload); only differences are processed."""
+        changed_groups = set()
+
+        device_ids = set()
+        for device in devices:
+            device_ids.add(device.id)
+            changed_groups |= self.update_device(device)
+        for device_id in set(self._device_lights.keys()) - device_ids:
+            changed_groups |= self.remove_device(device_id)
+
+        group_ids = set()
+        for group in groups:
+            if isinstance(group, Room):  # Zone is inherited from Room
+                group_ids.add(group.id)
+                changed_groups |= self.update_group(group)
+        for group_id in self.group_ids - group_ids:
+            changed_groups |= self.remove_group(group_id)
+
+        return changed_groups
+
+    def _unlink_children(self, group_id: str):
+        for child_id in self._group_devices.get(group_id, ()) + self._group_direct_lights.get(group_id, ()):
+            groups = self._child_groups.get(child_id)
+            if groups:
+                groups.discard(group_id)
+                if not groups:
+                    del self._child_groups[child_id]
+
+    def _invalidate(self, group_ids: Set[str]) -> Set[str]:
+        for group_id in group_ids:
+            self._group_lights.pop(group_id, None)
+        return set(group_ids)
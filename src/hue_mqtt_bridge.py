@@ -1,22 +1,25 @@
 #!/usr/bin/env python3
 import asyncio
 import logging
+import os
 import sys
-from typing import Optional, List
+from typing import Dict, Optional, List, TYPE_CHECKING
 
 import click
-from yaml.parser import ParserError
 
 from src.app_config import AppConfig, ConfigException, RunMode
-from src.app_logging import AppLogging, LOGGING_CHOICES
-from src.thing.thing import Thing
-from src.thing.thing_factory import ThingFactory
-from src.hue.hue_app_key import HueAppKey
-from src.hue.hue_connector import HueConnector, HueConnectorBase
-from src.hue.hue_explorer import HueExplorer
-from src.mqtt.mqtt_client import MqttClient
-from src.mqtt.mqtt_proxy import MqttProxy
-from src.runner import Runner
+from src.app_logging import AppLogging, LoggingConfKey, LOGGING_CHOICES
+from src.hue.hue_config import HueBridgeConfKey
+from src.mqtt.mqtt_config import MqttConfKey
+
+if TYPE_CHECKING:
+    from src.thing.thing import Thing
+    from src.hue.hue_connector import HueConnectorBase
+    from src.mqtt.mqtt_client import MqttClient
+    from src.mqtt.mqtt_proxy import MqttProxy
+
+# Heavy dependencies (aiohue, aiohttp, paho, jsonschema, yaml) are imported per run mode, so `--json-schema` or `--discover`
+# don't pay for the service modules. See test_startup_imports for the import time budget.
 
 _logger = logging.getLogger("main")
 
@@ -42,10 +45,24 @@ _logger = logging.getLogger("main")
     is_flag=True,
     help="Prints the config file JSON schema and exits. (JSON schema is used to validate the YAML config.)"
 )
+@click.option(
+    "--supervisor",
+    is_flag=True,
+    help="Runs one worker process per Hue bridge ('hue_bridges'), which get restarted independently."
+)
+@click.option(
+    "--worker",
+    hidden=True,
+    help="Name of the Hue bridge, the service is restricted to (started by the supervisor)."
+)
 @click.option(
     "--config-file",
     help="Config file",
 )
+@click.option(
+    "--config-cache",
+    help="Cache file for the validated config (parsing and validation are skipped, while the config file is unchanged)",
+)
 @click.option(
     "--log-file",
     help="Log file"
@@ -66,7 +83,8 @@ _logger = logging.getLogger("main")
     help="Skip log timestamp (systemd/journald logs get their own timestamp)."
 )
 def _main(
-    create_app_key, discover, explore, json_schema, config_file, log_file, log_level, print_log_console, skip_log_times
+    create_app_key, discover, explore, json_schema, supervisor, worker, config_file, config_cache, log_file, log_level, print_log_console,
+    skip_log_times
 ):
     """
     Connect a Philips Hue bridge via MQTT. It's supposed to run as service but offers also some utility functions:
@@ -80,7 +98,8 @@ def _main(
         asyncio.set_event_loop(loop)
         try:
             loop.run_until_complete(testable_main(
-                create_app_key, discover, explore, json_schema, config_file, log_file, log_level, print_log_console, skip_log_times
+                create_app_key, discover, explore, json_schema, config_file, log_file, log_level, print_log_console, skip_log_times,
+                config_cache, supervisor, worker
             ))
         finally:
             loop.close()
@@ -90,70 +109,131 @@ def _main(
     except ConfigException as ex:
         _logger.error(ex)
         sys.exit(config_error_code)
-    except ParserError as ex:
-        _logger.error("parsing error in config file:\n%s", ex)
-        sys.exit(config_error_code)
     except Exception as ex:
         _logger.exception(ex)
         sys.exit(1)  # a simple return is not understood by click
 
 
 async def testable_main(
-    create_app_key, discover, explore, json_schema, config_file, log_file, log_level, print_log_console, skip_log_times
+    create_app_key, discover, explore, json_schema, config_file, log_file, log_level, print_log_console, skip_log_times,
+    config_cache=None, supervisor=False, worker=None
 ):
     """
     Due to the click annotations, _main cannot be called from within tests
     """
-    run_mode = AppConfig.determine_run_mode(create_app_key, discover, explore, json_schema)
+    run_mode = AppConfig.determine_run_mode(create_app_key, discover, explore, json_schema, supervisor)
+    if worker and run_mode != RunMode.RUN_SERVICE:
+        raise ConfigException("A worker runs always as service!")
 
-    things: List[Thing] = []
-    hue_connector: Optional[HueConnectorBase] = None
-    mqtt_client: Optional[MqttClient] = None
-    mqtt_proxy: Optional[MqttProxy] = None
+    things: List["Thing"] = []
+    hue_connectors: List["HueConnectorBase"] = []
+    mqtt_client: Optional["MqttClient"] = None
+    mqtt_proxy: Optional["MqttProxy"] = None
 
     try:
         if run_mode != RunMode.JSON_SCHEMA and run_mode != RunMode.DISCOVER:
-            app_config = AppConfig(config_file, run_mode)
+            app_config = AppConfig(config_file, run_mode, config_cache)
+            logging_config = app_config.get_logging_config()
+            if worker:  # workers must not share a rotating log file
+                log_file = _get_worker_log_file(log_file or logging_config.get(LoggingConfKey.FILE), worker)
             AppLogging.configure(
-                app_config.get_logging_config(),
+                logging_config,
                 log_file, log_level, print_log_console, skip_log_times,
             )
 
+            bridge_configs = app_config.get_hue_bridge_configs()
+            if worker:
+                bridge_configs = [c for c in bridge_configs if c.get(HueBridgeConfKey.NAME) == worker]
+                if not bridge_configs:
+                    raise ConfigException(f"Unknown Hue bridge '{worker}'!")
+            if run_mode == RunMode.SUPERVISOR and any(not c.get(HueBridgeConfKey.NAME) for c in bridge_configs):
+                raise ConfigException("The supervisor mode requires named bridges ('hue_bridges')!")
+            bridge_things: Dict[Optional[str], List["Thing"]] = {}
             if run_mode in [RunMode.RUN_SERVICE, RunMode.EXPLORE]:
-                things = ThingFactory.create_things(app_config.get_things_config(), app_config.get_thing_defaults_config())
+                from src.thing.thing_factory import ThingFactory
+                things = ThingFactory.create_things(
+                    app_config.get_things_config(), app_config.get_thing_defaults_config(), app_config.cache
+                )
+                bridge_names = [c.get(HueBridgeConfKey.NAME) for c in app_config.get_hue_bridge_configs()]
+                bridge_things = ThingFactory.assign_bridges(things, bridge_names)
+                if worker:
+                    things = bridge_things[worker]
 
             if run_mode == RunMode.RUN_SERVICE:
-                hue_connector = HueConnector(app_config.get_hue_bridge_config(), things)
-                mqtt_client = MqttClient(app_config.get_mqtt_config())
-                mqtt_proxy = MqttProxy(mqtt_client, things)
+                from src.hue.hue_connector import HueConnector
+                from src.mqtt.mqtt_client import MqttClientFactory
+                from src.mqtt.mqtt_proxy import MqttProxy
+                for bridge_config in bridge_configs:
+                    hue_connectors.append(HueConnector(bridge_config, bridge_things[bridge_config.get(HueBridgeConfKey.NAME)]))
+                mqtt_config = app_config.get_mqtt_config()
+                if worker and mqtt_config.get(MqttConfKey.CLIENT_ID):  # one MQTT connection per worker
+                    mqtt_config = {**mqtt_config, MqttConfKey.CLIENT_ID: f"{mqtt_config[MqttConfKey.CLIENT_ID]}-{worker}"}
+                mqtt_client = MqttClientFactory.create(mqtt_config)
+                mqtt_proxy = MqttProxy(mqtt_client, things)  # shared by all bridges
             elif run_mode == RunMode.CREATE_APP_KEY:
-                hue_connector = HueAppKey(app_config.get_hue_bridge_config(), things)
+                from src.hue.hue_app_key import HueAppKey
+                hue_connectors.append(HueAppKey(bridge_configs[0], things))
             elif run_mode == RunMode.EXPLORE:
-                hue_connector = HueExplorer(app_config.get_hue_bridge_config(), things)
+                from src.hue.hue_explorer import HueExplorer
+                bridge_config = bridge_configs[0]  # CLI tools handle the first bridge
+                hue_connectors.append(HueExplorer(bridge_config, bridge_things[bridge_config.get(HueBridgeConfKey.NAME)]))
+
+            app_config.save_cache()
 
         _logger.info(run_mode)
 
         if run_mode == RunMode.JSON_SCHEMA:
             AppConfig.print_config_file_json_schema()
         elif run_mode == RunMode.DISCOVER:
+            from src.hue.hue_explorer import HueExplorer
             await HueExplorer.discover()
         elif run_mode == RunMode.EXPLORE:
-            await hue_connector.run_cli_tools()  # no loop
+            await hue_connectors[0].run_cli_tools()  # no loop
         elif run_mode == RunMode.CREATE_APP_KEY:
-            await hue_connector.run_cli_tools()  # no loop
+            await hue_connectors[0].run_cli_tools()  # no loop
+        elif run_mode == RunMode.SUPERVISOR:
+            from src.supervisor import Supervisor
+
+            def worker_command(bridge_name: str) -> List[str]:
+                # workers inherit PYTHONPATH and the working dir, paths are made absolute anyway
+                command = [sys.executable, os.path.abspath(__file__), "--worker", bridge_name]
+                for option, value in [("--config-file", config_file), ("--config-cache", config_cache), ("--log-file", log_file)]:
+                    if value:
+                        command.extend([option, os.path.abspath(value)])
+                if log_level:
+                    command.extend(["--log-level", log_level])
+                for option, value in [("--print-log-console", print_log_console), ("--skip-log-times", skip_log_times)]:
+                    if value:
+                        command.append(option)
+                return command
+
+            supervisor = Supervisor([c[HueBridgeConfKey.NAME] for c in bridge_configs], worker_command)
+            await supervisor.run()
         else:
-            runner = Runner(hue_connector, mqtt_proxy)
+            from src.runner import Runner
+            status_reporter = None
+            if worker:
+                from src.supervisor import Supervisor
+                status_reporter = Supervisor.report_status
+            runner = Runner(hue_connectors, mqtt_proxy, status_reporter)
             await runner.run()
 
     finally:
         _logger.info("shutdown")
         if mqtt_proxy is not None:
             await mqtt_proxy.close()
-        if hue_connector is not None:
+        for hue_connector in hue_connectors:
             await hue_connector.close()
         if mqtt_client is not None:
             mqtt_client.close()
 
 
+def _get_worker_log_file(log_file: Optional[str], worker: str) -> Optional[str]:
+    if not log_file:
+        return None
+    root, ext = os.path.splitext(log_file)
+    return f"{root}-{worker}{ext}"
+
+
 if __name__ == '__main__':
     _main()  # exit codes must be handled by click!
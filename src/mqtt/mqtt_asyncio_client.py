@@ -0,0 +1,138 @@
+import asyncio
+import contextlib
+import logging
+from asyncio import Task
+from typing import List, Optional
+
+import paho.mqtt.client as mqtt
+
+from src.mqtt.mqtt_client import MqttClient
+
+_logger = logging.getLogger(__name__)
+
+
+class MqttAsyncioClient(MqttClient):
+    """
+    Drives the paho socket from the asyncio event loop (reader/writer callbacks) instead of paho's background thread.
+    All paho callbacks run within the event loop, so inbound messages go straight into an asyncio queue, without locking.
+    """
+
+    MISC_INTERVAL = 1.0  # seconds; paho keepalive handling
+
+    def __init__(self, config):
+        super().__init__(config)
+
+        self._lock = contextlib.nullcontext()  # single threaded
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._connect_task: Optional[Task] = None
+        self._reconnect_task: Optional[Task] = None
+        self._misc_task: Optional[Task] = None
+        self._queue: asyncio.Queue[mqtt.MQTTMessage] = asyncio.Queue()
+
+        self._client.on_socket_open = self._on_socket_open
+        self._client.on_socket_close = self._on_socket_close
+        self._client.on_socket_register_write = self._on_socket_register_write
+        self._client.on_socket_unregister_write = self._on_socket_unregister_write
+
+    def connect(self):
+        self._loop = asyncio.get_running_loop()
+        self._connect_task = self._loop.create_task(self._connect())
+
+    async def _connect(self):
+        """DNS lookup, TCP connect and TLS handshake are blocking, so they run in an executor."""
+        try:
+            connect_args = self._get_connect_args()
+            await self._loop.run_in_executor(None, lambda: self._client.connect(**connect_args))
+        except Exception as ex:
+            connection_error_info = f"MQTT connection failed ({ex})!"
+            _logger.error(connection_error_info)
+            with self._lock:
+                self._connection_error_info = connection_error_info
+            self._notify_wakeup()
+            return
+
+        if self._client is not None:
+            self._misc_task = self._loop.create_task(self._misc_loop())
+
+    def close(self):
+        self._shutdown = True
+        for task in [self._connect_task, self._reconnect_task, self._misc_task]:
+            if task:
+                task.cancel()
+        self._connect_task = self._reconnect_task = self._misc_task = None
+        if self._client is not None:
+            if self._client.socket() is not None:
+                self._drain_queued(0)  # acknowledgements need the event loop, so no waiting here
+                self._client.disconnect()
+                self._client.loop_write()  # flushes DISCONNECT, closes the socket
+            self._client = None
+            _logger.debug("closed")
+
+    def get_messages(self) -> List[mqtt.MQTTMessage]:
+        messages = []
+        while not self._queue.empty():
+            messages.append(self._queue.get_nowait())
+        return messages
+
+    def _schedule_reconnect(self):
+        if self._shutdown or self._client is None or self._reconnect_task is not None or self._client.socket() is not None:
+            return  # closed or (re-)connecting (paho closes the old socket when reconnecting)
+        self._reconnect_task = self._loop.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        """Reconnects with exponential backoff, like paho's network thread does."""
+        delay = self.RECONNECT_DELAY_MIN
+        try:
+            while not self._shutdown and self._client is not None:
+                await asyncio.sleep(delay)
+                try:
+                    await self._loop.run_in_executor(None, self._client.reconnect)
+                    break
+                except OSError as ex:
+                    delay = min(delay * 2, self.RECONNECT_DELAY_MAX)
+                    _logger.warning("MQTT reconnect failed (%s), next attempt in %.1fs", ex, delay)
+        finally:
+            self._reconnect_task = None
+
+        if self._client is not None and self._misc_task is None:
+            self._misc_task = self._loop.create_task(self._misc_loop())
+
+    async def _misc_loop(self):
+        while self._client is not None:
+            self._client.loop_misc()
+            await asyncio.sleep(self.MISC_INTERVAL)
+
+    def _call_in_loop(self, func, *args):
+        """Socket callbacks come from the executor while connecting."""
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            func(*args)
+        else:
+            self._loop.call_soon_threadsafe(func, *args)
+
+    def _on_socket_open(self, _mqtt_client, _userdata, sock):
+        self._call_in_loop(self._loop.add_reader, sock, self._client.loop_read)
+
+    def _on_socket_close(self, _mqtt_client, _userdata, sock):
+        self._call_in_loop(self._loop.remove_reader, sock)
+        self._call_in_loop(self._loop.remove_writer, sock)
+        if self._misc_task:
+            self._call_in_loop(self._misc_task.cancel)
+            self._misc_task = None
+        self._call_in_loop(self._schedule_reconnect)
+
+    def _on_socket_register_write(self, _mqtt_client, _userdata, sock):
+        self._call_in_loop(self._loop.add_writer, sock, self._client.loop_write)
+
+    def _on_socket_unregister_write(self, _mqtt_client, _userdata, sock):
+        self._call_in_loop(self._loop.remove_writer, sock)
+
+    def _on_message(self, _mqtt_client, _userdata, mqtt_message: mqtt.MQTTMessage):
+        """MQTT callback when a message is received from MQTT server"""
+        _logger.debug("on_message(%s): %s", mqtt_message.topic, mqtt_message.payload)
+        self._queue.put_nowait(mqtt_message)
+        self._notify_wakeup()
@@ -1,11 +1,18 @@
 import logging
 import threading
-from typing import Dict, Optional, Union, List
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Union, List, Set, Tuple
 
+import attr
 import paho.mqtt.client as mqtt
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+from paho.mqtt.reasoncodes import ReasonCode
 
 from src.mqtt.mqtt_config import MqttConfKey
 from src.utils.json_utils import JsonUtils
+from src.utils.latency_tracer import LatencyTracer
 
 _logger = logging.getLogger(__name__)
 
@@ -14,6 +21,15 @@ class MqttException(Exception):
     pass
 
 
+@attr.frozen
+class _OutMessage:
+    topic: str
+    payload: str
+    retain: bool
+    qos: int
+    user_properties: Tuple[Tuple[str, str], ...] = ()
+
+
 class MqttClient:
 
     DEFAULT_KEEPALIVE = 60
@@ -21,9 +37,17 @@ class MqttClient:
     DEFAULT_PORT_SSL = 8883
     DEFAULT_PROTOCOL = 4  # 5==MQTTv5, default: 4==MQTTv311, 3==MQTTv31
     DEFAULT_QOS = 2
+    DEFAULT_CMD_QOS = 1
     DEFAULT_RETAIN = True
+    DEFAULT_MAX_IN_FLIGHT = 20
+    DEFAULT_MAX_QUEUED = 1000
+    DEFAULT_TOPIC_ALIAS_MAXIMUM = 1000
+    DEFAULT_SESSION_EXPIRY = 3600  # seconds; MQTT v5 persistent session
 
     TIME_WAIT_FOR_CONNECTION = 10  # seconds
+    CLOSE_TIMEOUT = 3  # seconds; max. time to send queued messages on close
+    RECONNECT_DELAY_MIN = 1  # seconds; doubled with each failed attempt
+    RECONNECT_DELAY_MAX = 60
 
     # noinspection SpellCheckingInspection
     def __init__(self, config):
@@ -35,18 +59,64 @@ class MqttClient:
         self._client = None
         self._is_connected = False
         self._connection_error_info = None  # type: Optional[str]
-        self._subscribed = False
+        self._subscriptions: List[str] = []  # get restored after reconnects without session
         self._shutdown = False
 
-        self._lock = threading.Lock()
+        self._disconnect_time: Optional[float] = None  # monotonic, connection lost
+        self._reconnect_count = 0
+        self._last_downtime = 0.0
+
+        self._lock = threading.Lock()  # never hold it while calling paho (paho calls back with its own locks held)
+
+        # outbound flow control: at most `max_in_flight` messages are handed to paho (sent, but not acknowledged),
+        # further messages wait in a bounded queue
+        self._in_flight: Dict[int, float] = {}  # mid: send time (monotonic)
+        self._in_flight_qos0: Set[int] = set()  # paho forgets them, when the connection gets lost before sending
+        self._in_flight_count = 0  # includes reserved slots, whose mid is not known yet
+        self._early_acks: Set[int] = set()  # acknowledged before `publish` returned the mid
+        self._queued: OrderedDict[int, _OutMessage] = OrderedDict()  # sequence number: message
+        self._queued_topics: Dict[str, int] = {}  # topic: sequence number of the queued message
+        self._queued_sequence = 0
+
+        self._acked_count = 0
+        self._ack_latency_sum = 0.0
+        self._ack_latency_max = 0.0
+        self._coalesced_count = 0
+        self._dropped_count = 0
+
+        # MQTT v5 topic aliases (per connection): the first message of a topic announces the alias together with the topic,
+        # following messages send the alias only. QoS 0 messages only: paho retransmits QoS 1/2 messages after reconnects
+        # as they were sent, but the aliases of the previous connection are gone; unsent QoS 0 messages get dropped instead.
+        self._topic_alias_maximum = 0  # negotiated with the broker on connect
+        self._topic_aliases: Dict[str, int] = {}  # topic: alias
+        self._announced_aliases: Set[int] = set()
 
         self._messages = []  # type: List[mqtt.MQTTMessage]
+        # id(message): monotonic receive time (start of the command trace; only while tracing is on)
+        self._receive_times = {}  # type: Dict[int, float]
+        self._fetched_receive_times = {}  # type: Dict[int, float]  # messages of the last `get_messages` call
+        self._wakeup = None  # type: Optional[Callable[[], None]]
 
         self._host = config[MqttConfKey.HOST]
         self._port = config.get(MqttConfKey.PORT)
         self._keepalive = config.get(MqttConfKey.KEEPALIVE, self.DEFAULT_KEEPALIVE)
+        self._max_in_flight = config.get(MqttConfKey.MAX_IN_FLIGHT, self.DEFAULT_MAX_IN_FLIGHT)
+        self._max_queued = config.get(MqttConfKey.MAX_QUEUED, self.DEFAULT_MAX_QUEUED)
+
+        qos = config.get(MqttConfKey.QOS)
+        self._qos = self.DEFAULT_QOS if qos is None else qos
+        self._state_qos = config.get(MqttConfKey.STATE_QOS, self._qos)
+        self._last_will_qos = config.get(MqttConfKey.LAST_WILL_QOS, self._qos)
+        self._cmd_qos = config.get(MqttConfKey.CMD_QOS, self.DEFAULT_CMD_QOS if qos is None else qos)
 
         protocol = config.get(MqttConfKey.PROTOCOL, self.DEFAULT_PROTOCOL)
+        self._is_v5 = protocol == mqtt.MQTTv5
+        self._message_expiry = config.get(MqttConfKey.MESSAGE_EXPIRY)
+        self._session_expiry = config.get(MqttConfKey.SESSION_EXPIRY)
+        self._config_topic_alias_maximum = config.get(MqttConfKey.TOPIC_ALIAS_MAXIMUM, self.DEFAULT_TOPIC_ALIAS_MAXIMUM)
+        self._user_properties = tuple(config.get(MqttConfKey.USER_PROPERTIES, {}).items())
+        self._persistent_session = config.get(MqttConfKey.PERSISTENT_SESSION, False)
+
         client_id = config.get(MqttConfKey.CLIENT_ID)
         ssl_ca_certs = config.get(MqttConfKey.SSL_CA_CERTS)
         ssl_certfile = config.get(MqttConfKey.SSL_CERTFILE)
@@ -59,7 +129,13 @@ class MqttClient:
         if not self._port:
             self._port = self.DEFAULT_PORT_SSL if is_ssl else self.DEFAULT_PORT
 
-        self._client = mqtt.Client(client_id=client_id, protocol=protocol)
+        if self._persistent_session and not client_id:
+            raise MqttException("A persistent MQTT session requires a client_id!")
+        if self._is_v5:
+            self._client = mqtt.Client(client_id=client_id, protocol=protocol)
+        else:
+            self._client = mqtt.Client(client_id=client_id, protocol=protocol, clean_session=not self._persistent_session)
+        self._client.max_inflight_messages_set(self._max_in_flight)
 
         if is_ssl:
             self._client.tls_set(ca_certs=ssl_ca_certs, certfile=ssl_certfile, keyfile=ssl_keyfile)
@@ -75,128 +151,394 @@ class MqttClient:
         self._client.on_message = self._on_message
         self._client.on_publish = self._on_publish
 
-        self._client.reconnect_delay_set()
+        self._client.reconnect_delay_set(self.RECONNECT_DELAY_MIN, self.RECONNECT_DELAY_MAX)
+
+    def set_wakeup(self, wakeup: Optional[Callable[[], None]]):
+        """wakeup gets called from the MQTT thread on new messages and connection changes"""
+        self._wakeup = wakeup
+
+    def _notify_wakeup(self):
+        wakeup = self._wakeup
+        if wakeup:
+            wakeup()
+
+    @property
+    def state_qos(self) -> int:
+        return self._state_qos
+
+    @property
+    def last_will_qos(self) -> int:
+        return self._last_will_qos
+
+    @property
+    def cmd_qos(self) -> int:
+        return self._cmd_qos
 
     def is_connected(self):
         with self._lock:
             return self._is_connected
 
+    def _get_connect_args(self) -> Dict[str, any]:
+        connect_args = {"host": self._host, "port": self._port, "keepalive": self._keepalive}
+        if self._is_v5:
+            session_expiry = self._session_expiry
+            if self._persistent_session:
+                connect_args["clean_start"] = False
+                if session_expiry is None:
+                    session_expiry = self.DEFAULT_SESSION_EXPIRY
+            if session_expiry:  # otherwise the session ends with the connection
+                properties = Properties(PacketTypes.CONNECT)
+                properties.SessionExpiryInterval = session_expiry
+                connect_args["properties"] = properties
+        return connect_args
+
     def connect(self):
-        self._client.connect_async(self._host, port=self._port, keepalive=self._keepalive)
+        self._client.connect_async(**self._get_connect_args())
         self._client.loop_start()
 
     def close(self):
         self._shutdown = True
         if self._client is not None:
-            self._client.loop_stop()
+            self._drain_queued(self.CLOSE_TIMEOUT)  # e.g. last wills
+            # disconnect before stopping the network thread, paho would wait for all acknowledgements otherwise
             self._client.disconnect()
-            self._client.loop_forever()  # will block until disconnect complete
+            self._client.loop_stop()
             self._client = None
             _logger.debug("closed")
 
+    def _drain_queued(self, timeout: float):
+        """Sends queued messages (within the in-flight limit) until the queue is empty or the timeout is over."""
+        deadline = time.monotonic() + timeout
+        while True:
+            self._release_queued()
+            with self._lock:
+                queued_count = len(self._queued)
+            if not queued_count or time.monotonic() >= deadline:
+                break
+            time.sleep(0.01)  # acknowledgements arrive via the network thread
+
+        with self._lock:
+            self._queued.clear()
+            self._queued_topics.clear()
+        if queued_count:
+            _logger.warning("closed with %d unsent messages", queued_count)
+
     def ensure_connection(self):
         """
-        Check for rarely unexpected disconnects, but when happens, it's not clear how to heal. At least the loop has to be restarted.
-        Best to restart the whole app. Recognise a stopped service in system log.
+        Lost connections are healed in-process (reconnect with backoff; states published meanwhile are queued, only the latest
+        one per topic is kept). A refused connection (e.g. bad credentials) can't be healed, it raises an exception instead.
         """
         with self._lock:
-            is_connected = self._is_connected
             connection_error_info = self._connection_error_info
 
         if connection_error_info:
             raise MqttException(connection_error_info)  # leads to exit => restarted by systemd
-        if not is_connected:
-            raise MqttException("MQTT is not connected!")
 
     def set_last_will(self, topic: str, last_will: Union[str, Dict], retain: Optional[bool] = None, qos: Optional[int] = None):
         if self.is_connected():
             raise MqttException("MQTT last will must be set before connecting!")
 
         retain = self.DEFAULT_RETAIN if retain is None else retain
-        qos = self.DEFAULT_QOS if qos is None else qos
+        qos = self._last_will_qos if qos is None else qos
 
         if isinstance(last_will, dict):
             last_will = JsonUtils.dumps(last_will)
 
+        properties = None
+        if self._is_v5 and (self._message_expiry or self._user_properties):
+            properties = Properties(PacketTypes.WILLMESSAGE)
+            if self._message_expiry:
+                properties.MessageExpiryInterval = self._message_expiry
+            if self._user_properties:
+                properties.UserProperty = list(self._user_properties)
+
         self._client.will_set(
             topic=topic,
             payload=last_will,
             qos=qos,
-            retain=retain
+            retain=retain,
+            properties=properties
         )
 
     def get_messages(self) -> List[mqtt.MQTTMessage]:
         with self._lock:
             messages = self._messages
             self._messages = []
+            self._fetched_receive_times, self._receive_times = self._receive_times, {}
             return messages
 
-    def publish(self, topic: str, payload: Union[str, Dict], retain: Optional[bool] = None, qos: Optional[int] = None):
+    def get_receive_time(self, message: mqtt.MQTTMessage) -> Optional[float]:
+        """monotonic receive time of a message returned by the last `get_messages` call (None, if tracing is off)"""
+        return self._fetched_receive_times.get(id(message))
+
+    def publish(self, topic: str, payload: Union[str, Dict], retain: Optional[bool] = None, qos: Optional[int] = None,
+                user_properties: Optional[Dict[str, str]] = None):
+        """
+        Sends the message, if less than `max_in_flight` messages are unacknowledged. Otherwise, the message gets queued;
+        if the queue is full, a queued message of the same topic gets replaced (only the latest state counts) or the
+        oldest queued message is dropped.
+
+        `user_properties` are added to the configured ones (MQTT v5 only).
+
+        :return: paho message info if handed over to paho, None if queued
+        """
         if self._shutdown:
             return
 
         retain = self.DEFAULT_RETAIN if retain is None else retain
-        qos = self.DEFAULT_QOS if qos is None else qos
+        qos = self._qos if qos is None else qos
 
         if isinstance(payload, dict):
             payload = JsonUtils.dumps(payload)
 
-        result = self._client.publish(
-            topic=topic,
-            payload=payload,
-            qos=qos,
-            retain=retain
+        message = _OutMessage(
+            topic=topic, payload=payload, retain=retain, qos=qos, user_properties=tuple(user_properties.items()) if user_properties else ()
         )
 
-        _logger.debug("sent - topic: '%s' | payload: '%s'", topic, payload)
+        with self._lock:
+            send_now = self._is_connected and not self._queued and self._in_flight_count < self._max_in_flight
+            if send_now:
+                self._in_flight_count += 1
+            else:
+                self._enqueue(message, coalesce=not self._is_connected)
+
+        if send_now:
+            return self._send(message)
 
-        return result
+        self._release_queued()
+        return None
+
+    def _enqueue(self, message: _OutMessage, coalesce: bool):
+        """
+        Has to be called with lock. With `coalesce` (or a full queue) a queued message of the same topic gets replaced,
+        so after a reconnect only the latest state per topic is sent.
+        """
+        if coalesce or len(self._queued) >= self._max_queued:
+            sequence = self._queued_topics.get(message.topic)
+            if sequence is not None:
+                self._queued[sequence] = message  # keeps the position within the queue
+                self._coalesced_count += 1
+                return
+
+        if len(self._queued) >= self._max_queued:
+            sequence, dropped = self._queued.popitem(last=False)
+            if self._queued_topics.get(dropped.topic) == sequence:
+                del self._queued_topics[dropped.topic]
+            self._dropped_count += 1
+            _logger.warning("MQTT queue is full, dropped message (topic: %s)", dropped.topic)
+
+        self._queued_sequence += 1
+        self._queued[self._queued_sequence] = message
+        self._queued_topics[message.topic] = self._queued_sequence
+
+    def _send(self, message: _OutMessage) -> Optional[mqtt.MQTTMessageInfo]:
+        """Hands the message over to paho; an in-flight slot has to be reserved before."""
+        send_time = time.monotonic()
+        client = self._client
+        topic, properties = self._get_publish_properties(message) if self._is_v5 else (message.topic, None)
+        info = None
+        if client:
+            info = client.publish(topic=topic, payload=message.payload, qos=message.qos, retain=message.retain, properties=properties)
+
+        with self._lock:
+            if properties is not None and topic and hasattr(properties, "TopicAlias"):
+                # the alias is announced (within paho's outgoing order), following messages can use the alias only
+                self._announced_aliases.add(properties.TopicAlias)
+            if info is None or (message.qos == 0 and info.rc != mqtt.MQTT_ERR_SUCCESS):
+                self._in_flight_count -= 1  # won't be acknowledged
+            elif info.mid in self._early_acks:
+                self._early_acks.discard(info.mid)
+                self._in_flight_count -= 1
+                self._record_ack(send_time)
+            else:
+                self._in_flight[info.mid] = send_time
+                if message.qos == 0:
+                    self._in_flight_qos0.add(info.mid)
+
+        _logger.debug("sent - topic: '%s' | payload: '%s' | qos: %d", message.topic, message.payload, message.qos)
+        return info
+
+    def _get_publish_properties(self, message: _OutMessage) -> Tuple[str, Optional[Properties]]:
+        """:return: topic to send ("" if the topic alias is known by the broker) and MQTT v5 publish properties"""
+        properties = Properties(PacketTypes.PUBLISH)
+        if self._message_expiry:
+            properties.MessageExpiryInterval = self._message_expiry
+        if self._user_properties or message.user_properties:
+            properties.UserProperty = [*self._user_properties, *message.user_properties]
+
+        topic = message.topic
+        if message.qos != 0:
+            return topic, (None if properties.isEmpty() else properties)
+
+        with self._lock:
+            alias = self._topic_aliases.get(topic)
+            if alias is None and len(self._topic_aliases) < self._topic_alias_maximum:
+                alias = len(self._topic_aliases) + 1
+                self._topic_aliases[topic] = alias
+            if alias is not None:
+                properties.TopicAlias = alias
+                if alias in self._announced_aliases:
+                    topic = ""
+
+        return topic, (None if properties.isEmpty() else properties)
+
+    def _reset_topic_aliases(self, topic_alias_maximum: int):
+        """Topic aliases are valid for one connection only; queued messages announce them again."""
+        with self._lock:
+            self._topic_alias_maximum = topic_alias_maximum
+            self._topic_aliases = {}
+            self._announced_aliases = set()
+
+    def _release_queued(self):
+        """Sends queued messages as long as in-flight slots are free."""
+        while True:
+            with self._lock:
+                if not self._is_connected or not self._queued or self._in_flight_count >= self._max_in_flight:
+                    return
+                sequence, message = self._queued.popitem(last=False)
+                if self._queued_topics.get(message.topic) == sequence:
+                    del self._queued_topics[message.topic]
+                self._in_flight_count += 1
+
+            self._send(message)
+
+    def _record_ack(self, send_time: float):
+        """Has to be called with lock."""
+        latency = time.monotonic() - send_time
+        self._acked_count += 1
+        self._ack_latency_sum += latency
+        self._ack_latency_max = max(self._ack_latency_max, latency)
+
+    @property
+    def queue_depth(self) -> int:
+        with self._lock:
+            return len(self._queued)
+
+    def get_metrics(self, reset: bool = False) -> Dict[str, any]:
+        with self._lock:
+            metrics = {
+                "queue_depth": len(self._queued),
+                "in_flight": self._in_flight_count,
+                "ack_latency_avg": self._ack_latency_sum / self._acked_count if self._acked_count else 0.0,
+                "ack_latency_max": self._ack_latency_max,
+                "acked": self._acked_count,
+                "coalesced": self._coalesced_count,
+                "dropped": self._dropped_count,
+                "reconnects": self._reconnect_count,
+                "downtime": self._last_downtime,
+            }
+            if reset:
+                self._acked_count = 0
+                self._ack_latency_sum = 0.0
+                self._ack_latency_max = 0.0
+                self._coalesced_count = 0
+                self._dropped_count = 0
+                self._reconnect_count = 0
+                self._last_downtime = 0.0
+        return metrics
 
     def subscribe(self, topics: List[str]):
-        subs_qos = 1  # qos for subscriptions, not used, but necessary
-        subscriptions = [(t, subs_qos) for t in topics]
+        self._subscriptions = list(topics)
+        subscriptions = [(t, self._cmd_qos) for t in topics]
         result, dummy = self._client.subscribe(subscriptions)
         if result != mqtt.MQTT_ERR_SUCCESS:
             error_info = "{} (#{})".format(mqtt.error_string(result), result)
             raise MqttException(f"could not subscribe to MQTT topics): {error_info}; topics: {topics}")
 
-    def _on_connect(self, _mqtt_client, _userdata, _flags, rc):
-        """MQTT callback is called when client connects to MQTT server."""
+    def unsubscribe(self, topics: List[str]):
+        self._subscriptions = [t for t in self._subscriptions if t not in topics]
+        result, dummy = self._client.unsubscribe(topics)
+        if result != mqtt.MQTT_ERR_SUCCESS:
+            error_info = "{} (#{})".format(mqtt.error_string(result), result)
+            raise MqttException(f"could not unsubscribe from MQTT topics): {error_info}; topics: {topics}")
+
+    def _restore_subscriptions(self, flags: Dict[str, int]):
+        """After a reconnect without session (or with a session expired by the broker), subscriptions are gone."""
+        if not self._subscriptions or flags.get("session present"):
+            return
+        try:
+            self.subscribe(self._subscriptions)
+            _logger.info("re-subscribed %d topics", len(self._subscriptions))
+        except MqttException as ex:
+            _logger.error(ex)
+
+    @classmethod
+    def _get_error_info(cls, rc: Union[int, ReasonCode]) -> str:
+        return str(rc) if isinstance(rc, ReasonCode) else mqtt.error_string(rc)
+
+    def _on_connect(self, _mqtt_client, _userdata, flags, rc, properties: Optional[Properties] = None):
+        """MQTT callback is called when client connects to MQTT server (`properties` with MQTT v5 only)."""
+        if self._is_v5:
+            broker_maximum = getattr(properties, "TopicAliasMaximum", 0) if rc == 0 else 0
+            self._reset_topic_aliases(min(self._config_topic_alias_maximum, broker_maximum))
+
         if rc == 0:
             with self._lock:
                 self._is_connected = True
-            _logger.debug("connected")
+                disconnect_time, self._disconnect_time = self._disconnect_time, None
+                if disconnect_time is not None:
+                    self._reconnect_count += 1
+                    self._last_downtime = time.monotonic() - disconnect_time
+
+            self._restore_subscriptions(flags)
+            if disconnect_time is None:
+                _logger.debug("connected")
+            else:
+                _logger.info("reconnected after %.1fs (session present: %s)", self._last_downtime, bool(flags.get("session present")))
+            with self._lock:
+                retransmitting = self._in_flight_count > 0
+            if not retransmitting:
+                self._release_queued()  # sends the states queued while disconnected
+            # else: paho retransmits unacknowledged messages after this callback; the queued (newer) states follow with their acks
         else:
-            connection_error_info = f"MQTT connection failed (#{rc}: {mqtt.error_string(rc)})!"
+            connection_error_info = f"MQTT connection failed (#{int(rc)}: {self._get_error_info(rc)})!"
             _logger.error(connection_error_info)
             with self._lock:
                 self._is_connected = False
                 self._connection_error_info = connection_error_info
+        self._notify_wakeup()
 
-    def _on_disconnect(self, _mqtt_client, _userdata, rc):
+    def _on_disconnect(self, _mqtt_client, _userdata, rc, _properties: Optional[Properties] = None):
         """MQTT callback for when the client disconnects from the MQTT server."""
-        connection_error_info = None
-        if rc != 0:
-            connection_error_info = f"MQTT connection was lost (#{rc}: {mqtt.error_string(rc)}) => abort => restart!"
-
         with self._lock:
-            self._is_connected = False
-            if connection_error_info and not self._connection_error_info:
-                self._connection_error_info = connection_error_info
-
-        if rc == 0:
+            was_connected, self._is_connected = self._is_connected, False
+            if was_connected and not self._shutdown:
+                self._disconnect_time = time.monotonic()
+            # QoS 0 messages, which were not sent yet, are lost (paho retransmits QoS 1/2 messages after reconnecting)
+            for mid in self._in_flight_qos0:
+                if self._in_flight.pop(mid, None) is not None:
+                    self._in_flight_count -= 1
+            self._in_flight_qos0.clear()
+
+        self._notify_wakeup()
+
+        if rc == 0 or self._shutdown:
             _logger.debug("disconnected")
         else:
-            _logger.error("unexpectedly disconnected: %s", connection_error_info or "???")
+            _logger.warning("MQTT connection was lost (#%d: %s) => reconnecting", int(rc), self._get_error_info(rc))
 
     def _on_message(self, _mqtt_client, _userdata, mqtt_message: mqtt.MQTTMessage):
         """MQTT callback when a message is received from MQTT server"""
+        receive_time = LatencyTracer.now() if LatencyTracer.is_enabled() else None  # QoS 2: after the handshake
         with self._lock:
             _logger.debug("on_message(%s): %s", mqtt_message.topic, mqtt_message.payload)
             self._messages.append(mqtt_message)
+            if receive_time is not None:
+                self._receive_times[id(mqtt_message)] = receive_time
+        self._notify_wakeup()
+
+    def _on_publish(self, _mqtt_client, _userdata, mid):
+        """MQTT callback is invoked when message was successfully sent to the MQTT server (QoS 1/2: acknowledged)."""
+        with self._lock:
+            send_time = self._in_flight.pop(mid, None)
+            self._in_flight_qos0.discard(mid)
+            if send_time is None:
+                self._early_acks.add(mid)  # `publish` has not returned yet
+                return
+            self._in_flight_count -= 1
+            self._record_ack(send_time)
 
-    def _on_publish(self, mqtt_client, userdata, mid):
-        """MQTT callback is invoked when message was successfully sent to the MQTT server."""
+        self._release_queued()
 
 
 class MqttClientFactory:
@@ -204,4 +546,7 @@ class MqttClientFactory:
 
     @classmethod
     def create(cls, config):
+        if config.get(MqttConfKey.ASYNCIO_LOOP, False):
+            from src.mqtt.mqtt_asyncio_client import MqttAsyncioClient
+            return MqttAsyncioClient(config)
         return MqttClient(config)
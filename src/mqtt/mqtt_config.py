@@ -1,13 +1,24 @@
 # noinspection SpellCheckingInspection
 class MqttConfKey:
+    ASYNCIO_LOOP = "asyncio_loop"
     CLIENT_ID = "client_id"
+    CMD_QOS = "cmd_qos"
     HOST = "host"
     PORT = "port"
     PASSWORD = "password"
+    PERSISTENT_SESSION = "persistent_session"
     USER = "user"
     KEEPALIVE = "keepalive"
+    LAST_WILL_QOS = "last_will_qos"
+    MAX_IN_FLIGHT = "max_in_flight"
+    MAX_QUEUED = "max_queued"
+    MESSAGE_EXPIRY = "message_expiry"
     PROTOCOL = "protocol"
     QOS = "qos"
+    SESSION_EXPIRY = "session_expiry"
+    STATE_QOS = "state_qos"
+    TOPIC_ALIAS_MAXIMUM = "topic_alias_maximum"
+    USER_PROPERTIES = "user_properties"
 
     SSL_CA_CERTS = "ssl_ca_certs"
     SSL_CERTFILE = "ssl_certfile"
@@ -18,18 +29,63 @@ class MqttConfKey:
 MQTT_JSONSCHEMA = {
     "type": "object",
     "properties": {
+        MqttConfKey.ASYNCIO_LOOP: {
+            "type": "boolean",
+            "description": "Drive the MQTT socket from the asyncio event loop instead of a background thread. Default: false"
+        },
         MqttConfKey.CLIENT_ID: {"type": "string", "minLength": 1},
         MqttConfKey.HOST: {"type": "string", "minLength": 1},
         MqttConfKey.KEEPALIVE: {"type": "integer", "minimum": 1},
+        MqttConfKey.MAX_IN_FLIGHT: {
+            "type": "integer",
+            "minimum": 1,
+            "description": "Max. number of sent, but unacknowledged messages. Default: 20"
+        },
+        MqttConfKey.MAX_QUEUED: {
+            "type": "integer",
+            "minimum": 1,
+            "description": "Max. number of messages waiting for a free in-flight slot. When full, messages of the same topic get "
+                           "replaced (otherwise the oldest gets dropped). Default: 1000"
+        },
         MqttConfKey.PORT: {"type": "integer"},
         MqttConfKey.PROTOCOL: {"type": "integer", "enum": [3, 4, 5]},
+        MqttConfKey.PERSISTENT_SESSION: {
+            "type": "boolean",
+            "description": "Keep the session (subscriptions and queued commands) across reconnects and restarts: clean_session=false "
+                           "with MQTT 3.1.1, a session expiry (session_expiry or 1 hour) with MQTT v5. Requires client_id. Default: false"
+        },
         MqttConfKey.SSL_CA_CERTS: {"type": "string", "minLength": 1},
         MqttConfKey.SSL_CERTFILE: {"type": "string", "minLength": 1},
         MqttConfKey.SSL_INSECURE: {"type": "boolean"},
         MqttConfKey.SSL_KEYFILE: {"type": "string", "minLength": 1},
         MqttConfKey.USER: {"type": "string", "minLength": 1},
         MqttConfKey.PASSWORD: {"type": "string"},
-        MqttConfKey.QOS: {"type": "integer", "enum": [0, 1, 2]},
+        MqttConfKey.QOS: {"type": "integer", "enum": [0, 1, 2], "description": "Default QoS of all messages and subscriptions"},
+        MqttConfKey.STATE_QOS: {"type": "integer", "enum": [0, 1, 2], "description": "QoS of state messages. Default: qos or 2"},
+        MqttConfKey.LAST_WILL_QOS: {"type": "integer", "enum": [0, 1, 2], "description": "QoS of last wills. Default: qos or 2"},
+        MqttConfKey.CMD_QOS: {"type": "integer", "enum": [0, 1, 2], "description": "QoS of command subscriptions. Default: qos or 1"},
+        MqttConfKey.MESSAGE_EXPIRY: {
+            "type": "integer",
+            "minimum": 1,
+            "description": "MQTT v5 only: seconds until the broker discards undelivered state messages and last wills. Default: no expiry"
+        },
+        MqttConfKey.SESSION_EXPIRY: {
+            "type": "integer",
+            "minimum": 0,
+            "description": "MQTT v5 only: seconds the broker keeps the session (and the commands queued for it) after a disconnect. "
+                           "Commands older than this are not delivered after a reconnect. Default: 0"
+        },
+        MqttConfKey.TOPIC_ALIAS_MAXIMUM: {
+            "type": "integer",
+            "minimum": 0,
+            "description": "MQTT v5 only: max. number of topic aliases for topics published with QoS 0 (limited by the broker too); "
+                           "0 disables topic aliases. Default: 1000"
+        },
+        MqttConfKey.USER_PROPERTIES: {
+            "type": "object",
+            "additionalProperties": {"type": "string"},
+            "description": "MQTT v5 only: user properties attached to all published messages"
+        },
     },
     "additionalProperties": False,
     "required": [MqttConfKey.HOST],
@@ -1,19 +1,24 @@
 import asyncio
 import logging
 from collections import deque
-from typing import Dict, List, Optional, Deque
+from typing import Callable, Dict, List, Optional, Deque
 
 from paho.mqtt.client import MQTTMessage
 
 from src.thing.thing import Thing, StateMessage
-from src.mqtt.mqtt_client import MqttClient
+from src.mqtt.mqtt_client import MqttClient, MqttException
+from src.mqtt.topic_router import TopicRouter
 from src.utils.json_utils import JsonUtils
+from src.utils.latency_tracer import LatencyTracer
+from src.utils.time_utils import TimeUtils
 
 _logger = logging.getLogger(__name__)
 
 
 class MqttProxy:
 
+    RETAINED_STATE_TIMEOUT = 2.0  # seconds; the broker delivers retained states right after the subscription
+
     def __init__(self, mqtt_client: Optional[MqttClient], things: List[Thing]):
 
         self._mqtt_client = mqtt_client
@@ -21,15 +26,37 @@ class MqttProxy:
 
         self._state_messages: Deque[StateMessage] = deque()
 
-        self._command_subscriptions: Dict[str, List[Thing]] = {}
+        # things with pending state messages; dict used as insertion ordered set
+        self._dirty_things: Dict[Thing, None] = {}
+        self._wakeup: Optional[Callable[[], None]] = None
+
+        self._command_router: TopicRouter[Thing] = TopicRouter()
+        subscriptions = []
         for thing in self._things:
-            subscriptions = thing.mqtt_subscriptions
-            for subscription in subscriptions:
-                listeners = self._command_subscriptions.get(subscription)
-                if not listeners:
-                    listeners = []
-                    self._command_subscriptions[subscription] = listeners
-                listeners.append(thing)
+            if thing.cmd_topic:
+                self._command_router.add(thing.cmd_topic, thing)
+                subscriptions.extend(thing.mqtt_subscriptions)
+
+            thing.set_state_listener(self._on_thing_state_message)
+
+        # things with default topics share one wildcard subscription
+        self._command_subscriptions: List[str] = TopicRouter.reduce_filters(subscriptions)
+
+        # warm start: state topics are subscribed until the broker delivered the retained states (or the timeout)
+        self._retained_state_things: Dict[str, Thing] = {t.state_topic: t for t in self._things if t.awaits_retained_state}
+        self._state_subscriptions: List[str] = []
+        self._retained_state_deadline: Optional[float] = None  # monotonic
+
+    def set_wakeup(self, wakeup: Optional[Callable[[], None]]):
+        """wakeup gets called (maybe from other threads) when there is something to process"""
+        self._wakeup = wakeup
+        if self._mqtt_client:
+            self._mqtt_client.set_wakeup(wakeup)
+
+    def _on_thing_state_message(self, thing: Thing):
+        self._dirty_things[thing] = None
+        if self._wakeup:
+            self._wakeup()
 
     async def close(self):
         self.fetch_state_changes()
@@ -42,8 +69,9 @@ class MqttProxy:
 
             while True:
                 if self._mqtt_client.is_connected():
-                    topics = list(self._command_subscriptions.keys())
-                    self._mqtt_client.subscribe(topics)
+                    self._state_subscriptions = list(self._retained_state_things)
+                    self._retained_state_deadline = TimeUtils.monotonic() + self.RETAINED_STATE_TIMEOUT
+                    self._mqtt_client.subscribe(self._command_subscriptions + self._state_subscriptions)
                     _logger.info("connected + subscribed")
                     break
 
@@ -55,8 +83,15 @@ class MqttProxy:
         else:
             return False
 
+    def get_status(self) -> Dict[str, any]:
+        return {
+            "connected": self.is_connected(),
+            "queue_depth": self._mqtt_client.queue_depth if self._mqtt_client else 0,
+        }
+
     def fetch_state_changes(self) -> bool:
-        for thing in self._things:
+        dirty_things, self._dirty_things = self._dirty_things, {}
+        for thing in dirty_things:
             state_message = thing.get_state_messages()
             if state_message:
                 self._state_messages.extend(state_message)
@@ -69,10 +104,27 @@ class MqttProxy:
             payload = m.payload
             if isinstance(payload, dict):
                 payload = JsonUtils.dumps(payload)
-            self._mqtt_client.publish(topic=m.topic, payload=payload, retain=m.retain)
+            qos = m.qos
+            if qos is None:
+                qos = self._mqtt_client.last_will_qos if m.last_will else self._mqtt_client.state_qos
+            user_properties = {"source": m.source} if m.source else None
+            self._mqtt_client.publish(topic=m.topic, payload=payload, retain=m.retain, qos=qos, user_properties=user_properties)
+            if m.trace is not None:
+                LatencyTracer.finish(m.trace, LatencyTracer.PUBLISH)
 
     async def process_timer(self):
-        """placeholder for reconnects"""
+        """heartbeats and MQTT metrics (reconnects are handled by the MQTT client)"""
+        for thing in self._things:
+            thing.check_heartbeat()
+
+        self._finish_retained_states()
+
+        if self._mqtt_client:
+            metrics = self._mqtt_client.get_metrics(reset=True)
+            if metrics["coalesced"] or metrics["dropped"]:
+                _logger.warning("MQTT broker is too slow, messages were replaced or dropped: %s", metrics)
+            elif metrics["acked"]:
+                _logger.debug("MQTT publishing: %s", metrics)
 
     async def publish_last_wills(self):
         for thing in self._things:
@@ -81,6 +133,19 @@ class MqttProxy:
         self.fetch_state_changes()
         await self.publish_state_messages()
 
+    def _finish_retained_states(self):
+        """Stops listening to state topics; things without retained state publish their snapshot state."""
+        retained_state_things, self._retained_state_things = self._retained_state_things, {}
+        for thing in retained_state_things.values():
+            thing.publish_restored_state()
+
+        topics, self._state_subscriptions = self._state_subscriptions, []
+        if topics and self._mqtt_client:
+            try:
+                self._mqtt_client.unsubscribe(topics)
+            except MqttException as ex:
+                _logger.warning(ex)  # not restored after reconnects anyway
+
     @classmethod
     def ensure_string(cls, value_in) -> str:
         if isinstance(value_in, bytes):
@@ -94,11 +159,24 @@ class MqttProxy:
         messages: List[MQTTMessage] = self._mqtt_client.get_messages()
         for message in messages:
             topic = message.topic
-            listeners: List[Thing] = self._command_subscriptions.get(topic)
+            if message.retain and topic in self._retained_state_things:
+                self._retained_state_things.pop(topic).process_retained_state(self.ensure_string(message.payload))
+                if not self._retained_state_things:
+                    self._finish_retained_states()
+                continue
+
+            listeners: List[Thing] = self._command_router.match(topic)
             if listeners:
                 payload = self.ensure_string(message.payload)
+                receive_time = self._mqtt_client.get_receive_time(message)
                 for listener in listeners:
-                    listener.process_mqtt_command(topic, payload)
+                    trace = LatencyTracer.start(LatencyTracer.COMMAND, listener.hue_id, LatencyTracer.MQTT_RECEIVED, receive_time)
+                    listener.process_mqtt_command(topic, payload, trace)
+            else:
+                _logger.debug("no thing found for command topic '%s'", topic)
+
+        if self._state_subscriptions and TimeUtils.monotonic() >= self._retained_state_deadline:
+            self._finish_retained_states()
 
         if not messages:
             self._mqtt_client.ensure_connection()
@@ -0,0 +1,113 @@
+from typing import Dict, Generic, Iterable, List, TypeVar
+
+T = TypeVar("T")
+
+
+class _TopicNode:
+
+    __slots__ = ("children", "listeners", "multi_level_listeners")
+
+    def __init__(self):
+        self.children: Dict[str, _TopicNode] = {}
+        self.listeners: List = []  # filter ends here
+        self.multi_level_listeners: List = []  # filter ends here with "#"
+
+
+class TopicRouter(Generic[T]):
+    """
+    Resolves the listeners of an MQTT topic by a trie of topic filters (one node per topic level, "+" and "#" wildcards
+    supported). A lookup walks the topic levels once, so it costs O(topic depth) and not O(listener count).
+    """
+
+    SEPARATOR = "/"
+    SINGLE_LEVEL = "+"
+    MULTI_LEVEL = "#"
+
+    def __init__(self):
+        self._root = _TopicNode()
+
+    @classmethod
+    def validate_filter(cls, topic_filter: str):
+        """raises ValueError for invalid topic filters"""
+        if not topic_filter:
+            raise ValueError("empty topic filter!")
+        levels = topic_filter.split(cls.SEPARATOR)
+        for index, level in enumerate(levels):
+            if cls.MULTI_LEVEL in level and (level != cls.MULTI_LEVEL or index != len(levels) - 1):
+                raise ValueError(f"'{cls.MULTI_LEVEL}' is only allowed as last level ({topic_filter})!")
+            if cls.SINGLE_LEVEL in level and level != cls.SINGLE_LEVEL:
+                raise ValueError(f"'{cls.SINGLE_LEVEL}' has to occupy a whole level ({topic_filter})!")
+
+    @classmethod
+    def has_wildcards(cls, topic_filter: str) -> bool:
+        return cls.SINGLE_LEVEL in topic_filter or cls.MULTI_LEVEL in topic_filter
+
+    def add(self, topic_filter: str, listener: T):
+        self.validate_filter(topic_filter)
+
+        node = self._root
+        for level in topic_filter.split(self.SEPARATOR):
+            if level == self.MULTI_LEVEL:
+                node.multi_level_listeners.append(listener)
+                return
+            child = node.children.get(level)
+            if child is None:
+                child = _TopicNode()
+                node.children[level] = child
+            node = child
+        node.listeners.append(listener)
+
+    def match(self, topic: str) -> List[T]:
+        """:return: listeners of all matching filters, without duplicates"""
+        found: List[T] = []
+        nodes = [self._root]
+        wildcards = not topic.startswith("$")  # wildcards don't match "$SYS/..." topics at the first level
+
+        for level in topic.split(self.SEPARATOR):
+            next_nodes = []
+            for node in nodes:
+                if wildcards:
+                    found.extend(node.multi_level_listeners)
+                    child = node.children.get(self.SINGLE_LEVEL)
+                    if child is not None:
+                        next_nodes.append(child)
+                child = node.children.get(level)
+                if child is not None:
+                    next_nodes.append(child)
+            nodes = next_nodes
+            wildcards = True
+            if not nodes:
+                break
+
+        for node in nodes:
+            found.extend(node.listeners)
+            found.extend(node.multi_level_listeners)  # "a/#" matches "a" too
+
+        if len(found) > 1:
+            found = list(dict.fromkeys(found))
+        return found
+
+    @classmethod
+    def covers(cls, topic_filter: str, other_filter: str) -> bool:
+        """:return: True, if all topics matched by `other_filter` are matched by `topic_filter` too"""
+        levels = topic_filter.split(cls.SEPARATOR)
+        other_levels = other_filter.split(cls.SEPARATOR)
+        for index, level in enumerate(levels):
+            if level == cls.MULTI_LEVEL:
+                return True
+            if index >= len(other_levels):
+                return False
+            other_level = other_levels[index]
+            if level == cls.SINGLE_LEVEL:
+                if other_level == cls.MULTI_LEVEL:
+                    return False
+            elif level != other_level:
+                return False
+        return len(levels) == len(other_levels)
+
+    @classmethod
+    def reduce_filters(cls, topic_filters: Iterable[str]) -> List[str]:
+        """Removes duplicates and filters, which are covered by a wildcard filter (order is kept)."""
+        unique_filters = list(dict.fromkeys(topic_filters))
+        wildcard_filters = [f for f in unique_filters if cls.has_wildcards(f)]
+        return [f for f in unique_filters if not any(w != f and cls.covers(w, f) for w in wildcard_filters)]
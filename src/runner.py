@@ -1,14 +1,17 @@
 import asyncio
-import datetime
 import logging
 import random
 import signal
 import threading
 from asyncio import Task
-from typing import Callable, Optional
+from typing import Callable, Dict, List, Optional
+
+import aiohttp
+import aiohue
 
 from src.hue.hue_connector import HueConnector
 from src.mqtt.mqtt_proxy import MqttProxy
+from src.utils.latency_tracer import LatencyTracer
 from src.utils.time_utils import TimeUtils
 
 _logger = logging.getLogger(__name__)
@@ -17,37 +20,79 @@ _logger = logging.getLogger(__name__)
 class Runner:
 
     PROCESSING_TIMEOUT = 10  # seconds
-
-    def __init__(self, hue_bridge: HueConnector, mqtt_proxy: MqttProxy):
-
-        self._hue_connector = hue_bridge
+    IDLE_TIMEOUT = 1.0  # seconds; max. sleep without wakeup (connection checks)
+    HUE_CONNECT_DELAY_MIN = 1.0  # seconds; doubled with each failed attempt
+    HUE_CONNECT_DELAY_MAX = 60.0
+    HUE_CONNECT_ERRORS = (aiohue.errors.AiohueException, aiohttp.ClientError, asyncio.TimeoutError, OSError)
+
+    def __init__(self, hue_connectors: List[HueConnector], mqtt_proxy: MqttProxy,
+                 status_reporter: Optional[Callable[[Dict[str, any]], None]] = None):
+        """
+        All Hue bridges are driven concurrently, each with its own task, so a slow bridge doesn't stall the others.
+        An unreachable bridge is retried with backoff (and reported as not connected), the other bridges keep running.
+        :param status_reporter: gets the status after connecting and with each timer run (supervisor workers)
+        """
+
+        self._hue_connectors = hue_connectors
         self._mqtt_proxy = mqtt_proxy
+        self._status_reporter = status_reporter
 
         self._shutdown = False
 
-        self._hue_task = None  # type: Optional[Task]
+        self._hue_tasks: Dict[HueConnector, Optional[Task]] = {c: None for c in hue_connectors}
         self._mqtt_task = None  # type: Optional[Task]
 
-        self._hue_next_timer_start = self.get_next_timer_start()
+        self._hue_next_timer_starts: Dict[HueConnector, float] = {c: self.get_next_timer_start() for c in hue_connectors}
+        self._hue_connected: Dict[HueConnector, bool] = {c: False for c in hue_connectors}
+        self._hue_next_connect_starts: Dict[HueConnector, float] = {c: 0.0 for c in hue_connectors}
+        self._hue_connect_delays: Dict[HueConnector, float] = {c: self.HUE_CONNECT_DELAY_MIN for c in hue_connectors}
         self._mqtt_next_timer_start = self.get_next_timer_start()
 
+        self._loop = None  # type: Optional[asyncio.AbstractEventLoop]
+        self._wakeup_event = None  # type: Optional[asyncio.Event]
+
         if threading.current_thread() is threading.main_thread():
             # integration tests may run the service in a thread...
             signal.signal(signal.SIGINT, self._signal_shutdown)
             signal.signal(signal.SIGTERM, self._signal_shutdown)
+            signal.signal(signal.SIGUSR1, self._signal_trace_log)
 
     def _signal_shutdown(self, sig, _frame):
         _logger.info("shutdown signaled (%s)", sig)
         self._shutdown = True
+        self.wakeup()
+
+    @classmethod
+    def _signal_trace_log(cls, _sig, _frame):
+        """logs the latency histograms and switches tracing (with the sampled trace log) on/off"""
+        LatencyTracer.log_summary()
+        _logger.info("latency tracing switched %s", "on" if LatencyTracer.toggle_trace_log() else "off")
+
+    def wakeup(self):
+        """Wakes up the processing loop. Thread safe, is called from MQTT and Hue callbacks."""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wakeup_event.set)
+
+    def shutdown(self):
+        self._shutdown = True
+        self.wakeup()
 
     async def run(self):
         """endless loop"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup_event = asyncio.Event()
+
+        self._mqtt_proxy.set_wakeup(self.wakeup)
+        for hue_connector in self._hue_connectors:
+            hue_connector.set_wakeup(self.wakeup)
 
         await self._process_with_timeout(self._mqtt_proxy.connect(), "couldn't connect to MQTT")
-        await self._process_with_timeout(self._hue_connector.connect(), "couldn't connect to Hue bridge")
+        self._report_status()  # the Hue bridges connect within the loop
 
         try:
             while not self._shutdown:
+                self._wakeup_event.clear()
 
                 if self._mqtt_task:
                     self._mqtt_task = self._check_or_finish_task(self._mqtt_task)
@@ -55,28 +100,88 @@ class Runner:
                     if self._mqtt_proxy.fetch_state_changes():
                         self._mqtt_task = self._create_task(self._mqtt_proxy.publish_state_messages)
                     else:
-                        if TimeUtils.now() > self._mqtt_next_timer_start:
+                        if TimeUtils.monotonic() > self._mqtt_next_timer_start:
                             self._mqtt_next_timer_start = self.get_next_timer_start()
+                            self._report_status()
                             self._mqtt_task = self._create_task(self._mqtt_proxy.process_timer)
 
                 # Push MQTT commands => devices
                 self._mqtt_proxy.process_thing_commands()
 
-                if self._hue_task:
-                    self._hue_task = self._check_or_finish_task(self._hue_task)
-                if not self._hue_task:
-                    if self._hue_connector.fetch_commands():
-                        self._hue_task = self._create_task(self._hue_connector.send_commands)
-                    else:
-                        if TimeUtils.now() > self._hue_next_timer_start:
-                            self._hue_next_timer_start = self.get_next_timer_start()
-                            self._hue_task = self._create_task(self._hue_connector.process_timer)
+                for hue_connector in self._hue_connectors:
+                    self._process_hue_connector(hue_connector)
 
-                await asyncio.sleep(0.05)
+                await self._wait_for_wakeup()
 
         finally:
+            self._mqtt_proxy.set_wakeup(None)
+            for hue_connector in self._hue_connectors:
+                hue_connector.set_wakeup(None)
             await self._mqtt_proxy.publish_last_wills()
 
+    def get_status(self) -> Dict[str, any]:
+        mqtt_status = self._mqtt_proxy.get_status()
+        bridges = {}
+        for hue_connector in self._hue_connectors:
+            status = hue_connector.get_status()
+            status["connected"] = self._hue_connected[hue_connector] and status["connected"]
+            bridges[hue_connector.name] = status
+        return {
+            "healthy": mqtt_status["connected"] and all(b["connected"] for b in bridges.values()),
+            "mqtt_connected": mqtt_status["connected"],
+            "mqtt_queue_depth": mqtt_status["queue_depth"],
+            "hue_queue_depth": sum(b["queue_depth"] for b in bridges.values()),
+            "bridges": bridges,
+        }
+
+    def _report_status(self):
+        if self._status_reporter:
+            self._status_reporter(self.get_status())
+
+    def _process_hue_connector(self, hue_connector: HueConnector):
+        hue_task = self._hue_tasks[hue_connector]
+        if hue_task:
+            hue_task = self._check_or_finish_task(hue_task)
+        if not hue_task:
+            if not self._hue_connected[hue_connector]:
+                if TimeUtils.monotonic() >= self._hue_next_connect_starts[hue_connector]:
+                    hue_task = asyncio.create_task(self._connect_hue_connector(hue_connector))
+                    hue_task.add_done_callback(lambda _: self._wakeup_event.set())
+            elif hue_connector.fetch_commands():
+                hue_task = self._create_task(hue_connector.send_commands)
+            else:
+                if TimeUtils.monotonic() > self._hue_next_timer_starts[hue_connector]:
+                    self._hue_next_timer_starts[hue_connector] = self.get_next_timer_start()
+                    hue_task = self._create_task(hue_connector.process_timer)
+        self._hue_tasks[hue_connector] = hue_task
+
+    async def _connect_hue_connector(self, hue_connector: HueConnector):
+        """connection failures are retried with backoff"""
+        try:
+            await self._process_with_timeout(hue_connector.connect(), f"couldn't connect to Hue bridge '{hue_connector.name}'")
+        except self.HUE_CONNECT_ERRORS as ex:
+            delay = self._hue_connect_delays[hue_connector]
+            self._hue_connect_delays[hue_connector] = min(delay * 2, self.HUE_CONNECT_DELAY_MAX)
+            self._hue_next_connect_starts[hue_connector] = TimeUtils.monotonic() + delay
+            _logger.error("couldn't connect to Hue bridge '%s' (%s), next attempt in %.1fs", hue_connector.name, ex, delay)
+            return
+
+        self._hue_connected[hue_connector] = True
+        self._hue_connect_delays[hue_connector] = self.HUE_CONNECT_DELAY_MIN
+        self._report_status()
+
+    async def _wait_for_wakeup(self):
+        if self._shutdown:
+            return
+
+        now = TimeUtils.monotonic()
+        timeout = min(self.IDLE_TIMEOUT, self._mqtt_next_timer_start - now, *[t - now for t in self._hue_next_timer_starts.values()],
+                      *[self._hue_next_connect_starts[c] - now for c, connected in self._hue_connected.items() if not connected])
+        try:
+            await asyncio.wait_for(self._wakeup_event.wait(), max(timeout, 0))
+        except asyncio.exceptions.TimeoutError:
+            pass
+
     @classmethod
     def _check_or_finish_task(cls, task: Task) -> Task:
         if task.done():
@@ -87,7 +192,9 @@ class Runner:
 
     def _create_task(self, func_declaration: Callable, timeout: float = None) -> Task:
         func_name = f"{func_declaration.__name__} failure"
-        return asyncio.create_task(self._process_with_timeout(func_declaration(), func_name, timeout))
+        task = asyncio.create_task(self._process_with_timeout(func_declaration(), func_name, timeout))
+        task.add_done_callback(lambda _: self._wakeup_event.set())  # finished tasks get checked immediately
+        return task
 
     @classmethod
     async def _process_with_timeout(cls, func_instance: Callable, error_info: Optional[str] = None, timeout: float = None):
@@ -98,5 +205,5 @@ class Runner:
             raise asyncio.exceptions.TimeoutError("{0} (timeout {1:.1f}s) - abort!".format(error_info, timeout)) from None
 
     @classmethod
-    def get_next_timer_start(cls) -> datetime.datetime:
-        return TimeUtils.now() + datetime.timedelta(seconds=60 + random.randint(-3, 3))
+    def get_next_timer_start(cls) -> float:
+        return TimeUtils.monotonic() + 60 + random.randint(-3, 3)
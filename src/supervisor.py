@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import signal
+import sys
+import threading
+from typing import Callable, Dict, List, Optional
+
+import attr
+
+from src.utils.json_utils import JsonUtils
+from src.utils.time_utils import TimeUtils
+
+_logger = logging.getLogger(__name__)
+
+
+@attr.define
+class WorkerState:
+
+    name: str
+    process: Optional[asyncio.subprocess.Process] = None
+    start_time: Optional[float] = None  # monotonic
+    restarts: int = 0
+    last_exit_code: Optional[int] = None
+    status: Optional[Dict[str, any]] = None  # last reported by the worker
+    status_time: Optional[float] = None  # monotonic
+
+    @property
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+
+class Supervisor:
+    """
+    Runs one worker process per Hue bridge, so event parsing is spread over several cores. Each worker is a regular service
+    restricted to its bridge, with its own MQTT client id. Workers get restarted independently (with backoff). They report
+    their status as lines on stdout, which the supervisor aggregates into a health summary.
+    """
+
+    RESTART_DELAY_MIN = 1.0  # seconds; doubled with each failure in a row
+    RESTART_DELAY_MAX = 60.0
+    STABLE_TIME = 300  # seconds; a worker running longer resets the restart delay
+    HEALTH_INTERVAL = 60  # seconds
+    STATUS_TIMEOUT = 180  # seconds; older worker reports are stale
+    STOP_TIMEOUT = 10  # seconds; then workers get killed
+
+    STATUS_PREFIX = "@status "
+
+    def __init__(self, bridge_names: List[str], worker_command: Callable[[str], List[str]]):
+        """:param worker_command: creates the command line for a bridge worker"""
+        self._worker_command = worker_command
+        self._workers: Dict[str, WorkerState] = {name: WorkerState(name=name) for name in bridge_names}
+
+        self._shutdown = False
+        self._shutdown_event: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, self._signal_shutdown)
+            signal.signal(signal.SIGTERM, self._signal_shutdown)
+
+    @classmethod
+    def report_status(cls, status: Dict[str, any]):
+        """worker side: hands over the status to the supervisor"""
+        print(cls.STATUS_PREFIX + JsonUtils.dumps(status), flush=True)
+
+    def _signal_shutdown(self, sig, _frame):
+        _logger.info("shutdown signaled (%s)", sig)
+        self.shutdown()
+
+    def shutdown(self):
+        self._shutdown = True
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._shutdown_event.set)
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._shutdown_event = asyncio.Event()
+
+        worker_tasks = [asyncio.create_task(self._run_worker(w)) for w in self._workers.values()]
+        try:
+            while not self._shutdown:
+                try:
+                    await asyncio.wait_for(self._shutdown_event.wait(), self.HEALTH_INTERVAL)
+                except asyncio.TimeoutError:
+                    self._log_health()
+                for task in worker_tasks:
+                    if task.done():
+                        task.result()  # raises unexpected errors
+        finally:
+            self._shutdown = True
+            await asyncio.gather(*[self._stop_worker(w) for w in self._workers.values()])
+            for task in worker_tasks:
+                task.cancel()
+            await asyncio.gather(*worker_tasks, return_exceptions=True)
+
+    async def _run_worker(self, worker: WorkerState):
+        delay = self.RESTART_DELAY_MIN
+        while not self._shutdown:
+            command = self._worker_command(worker.name)
+            try:
+                worker.process = await asyncio.create_subprocess_exec(*command, stdout=asyncio.subprocess.PIPE)
+            except (OSError, ValueError) as ex:  # e.g. missing executable; retried like a crash
+                worker.process = None
+                _logger.error("worker '%s' couldn't be started (%s), restart in %.1fs", worker.name, ex, delay)
+            else:
+                worker.start_time = TimeUtils.monotonic()
+                _logger.info("worker '%s' started (pid %d)", worker.name, worker.process.pid)
+
+                await self._read_output(worker)
+                worker.last_exit_code = await worker.process.wait()
+                worker.status = None
+                if self._shutdown:
+                    break
+
+                if TimeUtils.monotonic() - worker.start_time > self.STABLE_TIME:
+                    delay = self.RESTART_DELAY_MIN
+                _logger.error("worker '%s' exited (%d), restart in %.1fs", worker.name, worker.last_exit_code, delay)
+
+            try:
+                await asyncio.wait_for(self._shutdown_event.wait(), delay)
+                break
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, self.RESTART_DELAY_MAX)
+            worker.restarts += 1
+
+    async def _read_output(self, worker: WorkerState):
+        """status lines get processed, all other output is passed through"""
+        while True:
+            line = await worker.process.stdout.readline()
+            if not line:
+                break
+            text = line.decode("utf-8", errors="replace")
+            if text.startswith(self.STATUS_PREFIX):
+                try:
+                    worker.status = JsonUtils.loads(text[len(self.STATUS_PREFIX):])
+                    worker.status_time = TimeUtils.monotonic()
+                except ValueError:
+                    _logger.warning("worker '%s' sent an invalid status: %s", worker.name, text.strip())
+            else:
+                sys.stdout.write(text)
+
+    async def _stop_worker(self, worker: WorkerState):
+        if not worker.is_running:
+            return
+        worker.process.terminate()  # the worker publishes its last wills
+        try:
+            await asyncio.wait_for(worker.process.wait(), self.STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            _logger.warning("worker '%s' didn't stop, killed", worker.name)
+            worker.process.kill()
+            await worker.process.wait()
+
+    def get_health(self) -> Dict[str, any]:
+        """aggregated health and metrics of all workers"""
+        now = TimeUtils.monotonic()
+        workers = {}
+        for worker in self._workers.values():
+            status = worker.status if worker.status_time and now - worker.status_time < self.STATUS_TIMEOUT else None
+            workers[worker.name] = {
+                "running": worker.is_running,
+                "restarts": worker.restarts,
+                "last_exit_code": worker.last_exit_code,
+                "uptime": now - worker.start_time if worker.is_running else 0.0,
+                "status": status,
+            }
+
+        reported = [w["status"] for w in workers.values() if w["status"]]
+        return {
+            "healthy": all(w["running"] and w["status"] and w["status"].get("healthy") for w in workers.values()),
+            "workers": len(workers),
+            "running": sum(1 for w in workers.values() if w["running"]),
+            "restarts": sum(w["restarts"] for w in workers.values()),
+            "mqtt_queue_depth": sum(s.get("mqtt_queue_depth", 0) for s in reported),
+            "hue_queue_depth": sum(s.get("hue_queue_depth", 0) for s in reported),
+            "details": workers,
+        }
+
+    def _log_health(self):
+        health = self.get_health()
+        details = health.pop("details")
+        if health["healthy"]:
+            _logger.info("health: %s", health)
+        else:
+            unhealthy = [n for n, w in details.items() if not (w["running"] and w["status"] and w["status"].get("healthy"))]
+            _logger.warning("health: %s; unhealthy workers: %s", health, unhealthy)
@@ -1,39 +1,87 @@
+from __future__ import annotations
+
+import asyncio
 import logging
 from logging import Logger
-from typing import Dict, List, Union, Optional
+from typing import Callable, Dict, List, Tuple, Union, Optional
 
 import attr
 
 from src.thing.thing_config import ThingDefaults
 from src.thing.thing_event import ThingEvent
+from src.thing.thing_serializer import ThingSerializer
 from src.hue.hue_command import HueCommand
+from src.utils.latency_tracer import LatencyTracer, Trace
+from src.utils.time_utils import TimeUtils
 
 
 @attr.frozen
 class StateMessage:
 
+    SOURCE_EVENT = "event"
+    SOURCE_HEARTBEAT = "heartbeat"
+    SOURCE_LAST_WILL = "last_will"
+    SOURCE_SNAPSHOT = "snapshot"
+
     topic: str
     payload: Union[str, Dict[str, any]]
     retain: bool
+    qos: Optional[int] = None  # None: MQTT default for the message class
+    last_will: bool = False
+    source: Optional[str] = attr.field(default=None, eq=False)  # what caused the message (metadata, MQTT v5 user property)
+    trace: Optional[Trace] = attr.field(default=None, eq=False, repr=False)  # latency trace, finished when published
+
+
+@attr.frozen
+class PublishPolicy:
+
+    suppress_unchanged: bool = ThingDefaults.SUPPRESS_UNCHANGED
+    heartbeat_interval: float = ThingDefaults.HEARTBEAT_INTERVAL  # seconds, 0 == off
+    min_publish_interval: float = ThingDefaults.MIN_PUBLISH_INTERVAL / 1000  # seconds
 
 
 class Thing:
 
     def __init__(self, hue_id: str, name: str, cmd_topic: str, state_topic: str, last_will: str, retain: bool,
-                 min_brightness: float, state_debounce_time: float = ThingDefaults.STATE_DEBOUNCE_TIME):
+                 min_brightness: float, state_debounce_time: float = ThingDefaults.STATE_DEBOUNCE_TIME,
+                 publish_policy: Optional[PublishPolicy] = None, state_fields: Optional[List[str]] = None,
+                 qos: Optional[int] = None, last_will_qos: Optional[int] = None, cmd_subscription: Optional[str] = None,
+                 bridge: Optional[str] = None):
         self._name = name
         self._hue_id = hue_id
+        self._bridge = bridge  # name of the Hue bridge; None: the only one
         self._cmd_topic = cmd_topic
+        self._cmd_subscription = cmd_subscription  # shared (wildcard) subscription, which covers cmd_topic
         self._state_topic = state_topic
         self._last_will = last_will
         self._retain = retain
+        self._qos = qos
+        self._last_will_qos = last_will_qos
         self._min_brightness = min_brightness
         self._state_debounce_time = state_debounce_time
+        self._publish_policy = publish_policy or PublishPolicy()
+        self._serializer = ThingSerializer(name, state_fields)
 
         self.__logger: Optional[Logger] = None
 
         self._messages: List[StateMessage] = None
         self._hue_command: Optional[HueCommand] = None
+        self._command_trace: Optional[Trace] = None
+
+        # listeners get notified about pending work, so nobody has to poll all things
+        self._state_listener: Optional[Callable[[Thing], None]] = None
+        self._command_listener: Optional[Callable[[Thing], None]] = None
+
+        self._last_event: Optional[ThingEvent] = None
+        self._last_fingerprint: Optional[tuple] = None
+        self._last_payload: Optional[str] = None
+        self._last_publish_time: Optional[float] = None  # monotonic
+        self._pending_event: Optional[ThingEvent] = None
+        self._pending_handle: Optional[asyncio.TimerHandle] = None
+
+        # warm start: the snapshot state is not republished, if the broker still retains it
+        self._restored_state: Optional[Tuple[str, tuple]] = None  # payload, fingerprint
+        self._confirmed_state: Optional[Tuple[str, tuple]] = None
 
         self._closed = False
 
@@ -45,8 +93,14 @@ class Thing:
 
     def close(self):
         if not self._closed:
+            if self._pending_handle:
+                self._pending_handle.cancel()
+                self._pending_handle = None
             if self._last_will:
-                self._add_state_message(StateMessage(topic=self._state_topic, payload=self._last_will, retain=self._retain))
+                self._add_state_message(StateMessage(
+                    topic=self._state_topic, payload=self._last_will, retain=self._retain, qos=self._last_will_qos, last_will=True,
+                    source=StateMessage.SOURCE_LAST_WILL
+                ))
 
             self._closed = True
 
@@ -54,6 +108,16 @@ class Thing:
         if self._messages is None:
             self._messages = []
         self._messages.append(message)
+        if self._state_listener:
+            self._state_listener(self)
+
+    def set_state_listener(self, listener: Optional[Callable[[Thing], None]]):
+        """listener gets called (maybe from another thread), when new state messages are available"""
+        self._state_listener = listener
+
+    def set_command_listener(self, listener: Optional[Callable[[Thing], None]]):
+        """listener gets called, when a new Hue command is available"""
+        self._command_listener = listener
 
     @property
     def hue_id(self) -> str:
@@ -63,6 +127,10 @@ class Thing:
     def name(self) -> str:
         return self._name
 
+    @property
+    def bridge(self) -> Optional[str]:
+        return self._bridge
+
     @property
     def cmd_topic(self) -> str:
         return self._cmd_topic
@@ -79,6 +147,14 @@ class Thing:
     def retain(self) -> bool:
         return self._retain
 
+    @property
+    def qos(self) -> Optional[int]:
+        return self._qos
+
+    @property
+    def last_will_qos(self) -> Optional[int]:
+        return self._last_will_qos
+
     @property
     def min_brightness(self) -> float:
         return self._min_brightness
@@ -87,6 +163,10 @@ class Thing:
     def state_debounce_time(self) -> float:
         return self._state_debounce_time
 
+    @property
+    def publish_policy(self) -> PublishPolicy:
+        return self._publish_policy
+
     @property
     def _logger(self):
         if self.__logger is None:
@@ -97,8 +177,10 @@ class Thing:
 
     @property
     def mqtt_subscriptions(self) -> List[str]:
-        """return MQTT topics the thing is listen to"""
-        return [self._cmd_topic] if self._cmd_topic else []
+        """return MQTT topic filters the thing is listen to"""
+        if not self._cmd_topic:
+            return []
+        return [self._cmd_subscription or self._cmd_topic]
 
     def get_state_messages(self) -> Optional[List[StateMessage]]:
         if not self._messages:
@@ -107,7 +189,7 @@ class Thing:
         self._messages = []
         return messages
 
-    def process_mqtt_command(self, _topic: str, payload: str):
+    def process_mqtt_command(self, _topic: str, payload: str, trace: Optional[Trace] = None):
         if self._closed:
             return
 
@@ -118,6 +200,11 @@ class Thing:
             # else:
             #     self._logger.debug("process_mqtt_command: %s => %s", payload, new_command)
             self._hue_command = new_command
+            self._command_trace = trace
+            if trace is not None:
+                LatencyTracer.stamp(trace, LatencyTracer.PROCESS_COMMAND)
+            if self._command_listener:
+                self._command_listener(self)
 
         except ValueError as ex:
             self._logger.warning(ex)
@@ -128,12 +215,110 @@ class Thing:
         finally:
             self._hue_command = None
 
-    def process_state_change(self, event: ThingEvent):
+    def get_command_trace(self) -> Optional[Trace]:
+        """trace of the last command (fetched with `get_hue_command`)"""
+        trace, self._command_trace = self._command_trace, None
+        return trace
+
+    @property
+    def published_state(self) -> Optional[Tuple[str, tuple]]:
+        """last published state (payload, fingerprint), if any"""
+        if self._last_payload is None:
+            return None
+        return self._last_payload, self._last_fingerprint
+
+    def restore_state(self, payload: str, fingerprint: tuple):
+        """Last published state from the snapshot (only retained states can be confirmed by the broker)"""
+        if self._retain and self._last_payload is None:
+            self._restored_state = (payload, fingerprint)
+
+    @property
+    def awaits_retained_state(self) -> bool:
+        return self._restored_state is not None
+
+    def process_retained_state(self, payload: str):
+        """State events are skipped until the first change, if the broker still retains the restored state."""
+        restored_state, self._restored_state = self._restored_state, None
+        if restored_state and restored_state[0] == payload:
+            self._confirmed_state = restored_state
+
+    def publish_restored_state(self):
+        """The broker retains no state => the snapshot state is published, before the bridge answers."""
+        restored_state, self._restored_state = self._restored_state, None
+        if restored_state is None or self._closed or self._last_payload is not None:
+            return
+
+        payload, fingerprint = restored_state
+        self._confirmed_state = restored_state  # the bridge confirms it with its initial events
+        self._last_fingerprint = fingerprint
+        self._last_payload = payload
+        self._last_publish_time = TimeUtils.monotonic()
+        self._add_state_message(StateMessage(
+            topic=self._state_topic,
+            payload=payload,
+            retain=self._retain,
+            qos=self._qos,
+            source=StateMessage.SOURCE_SNAPSHOT
+        ))
+
+    def process_state_change(self, event: ThingEvent, trace: Optional[Trace] = None):
         if self._closed:
             return
 
+        self._restored_state = None  # too late for a confirmation
+        if self._confirmed_state is not None:
+            payload, fingerprint = self._confirmed_state
+            if event.fingerprint() == fingerprint:  # initial (repeated) events until the first real change
+                self._last_event = event
+                self._last_fingerprint = fingerprint
+                self._last_payload = payload
+                self._last_publish_time = TimeUtils.monotonic()
+                return
+            self._confirmed_state = None
+
+        policy = self._publish_policy
+        if policy.suppress_unchanged and self._pending_event is None and event.fingerprint() == self._last_fingerprint:
+            return
+
+        if policy.min_publish_interval > 0 and self._last_publish_time is not None:
+            delay = self._last_publish_time + policy.min_publish_interval - TimeUtils.monotonic()
+            if delay > 0:
+                self._pending_event = event
+                if self._pending_handle is None:  # the trace of the first event (waits longest) is kept
+                    self._pending_handle = asyncio.get_running_loop().call_later(delay, self._publish_pending, trace)
+                return
+
+        self._publish(event, StateMessage.SOURCE_EVENT, trace)
+
+    def _publish_pending(self, trace: Optional[Trace] = None):
+        self._pending_handle = None
+        event, self._pending_event = self._pending_event, None
+        if event is not None and not self._closed:
+            if self._publish_policy.suppress_unchanged and event.fingerprint() == self._last_fingerprint:
+                return
+            self._publish(event, StateMessage.SOURCE_EVENT, trace)
+
+    def _publish(self, event: ThingEvent, source: str, trace: Optional[Trace] = None):
+        self._last_event = event
+        self._last_fingerprint = event.fingerprint()
+        self._last_publish_time = TimeUtils.monotonic()
+        self._last_payload = self._serializer.serialize(event)
+        if trace is not None:
+            LatencyTracer.stamp(trace, LatencyTracer.TO_DATA)
+
         self._add_state_message(StateMessage(
             topic=self._state_topic,
-            payload=event.to_data(),
-            retain=self._retain
+            payload=self._last_payload,
+            retain=self._retain,
+            qos=self._qos,
+            source=source,
+            trace=trace
         ))
+
+    def check_heartbeat(self):
+        """Republishes the last state, if nothing was sent within the heartbeat interval."""
+        interval = self._publish_policy.heartbeat_interval
+        if self._closed or interval <= 0 or self._last_event is None or self._pending_event is not None:
+            return
+        if TimeUtils.monotonic() - self._last_publish_time >= interval:
+            self._publish(self._last_event, StateMessage.SOURCE_HEARTBEAT)
@@ -1,32 +1,95 @@
 
 DEFAULT_TOPIC_KEY_PATTERN = "{THING_KEY}"
+STATE_FIELDS = ["brightness", "name", "status", "timestamp"]
 _thing_key_info = f"May contain '{DEFAULT_TOPIC_KEY_PATTERN}', which will be replaced with the thing key."
 
 
 class ThingDefaults:
+    HEARTBEAT_INTERVAL = 0  # seconds, 0 == off
+    MIN_PUBLISH_INTERVAL = 0  # milliseconds
     STATE_DEBOUNCE_TIME = 300  # milliseconds
+    SUPPRESS_UNCHANGED = False
 
 
 class ThingDefaultConfKey:
     CMD_TOPIC = "cmd_topic"
+    HEARTBEAT_INTERVAL = "heartbeat_interval"
     LAST_WILL = "last_will"
+    LAST_WILL_QOS = "last_will_qos"
     MIN_BRIGHTNESS = "min_brightness"
+    MIN_PUBLISH_INTERVAL = "min_publish_interval"
+    QOS = "qos"
     RETAIN = "retain"
     STATE_DEBOUNCE_TIME = "state_debounce_time"
+    STATE_FIELDS = "state_fields"
     STATE_TOPIC = "state_topic"
+    SUPPRESS_UNCHANGED = "suppress_unchanged"
 
 
 class ThingConfKey:
+    BRIDGE = "bridge"
     CMD_TOPIC = "cmd_topic"
+    HEARTBEAT_INTERVAL = "heartbeat_interval"
     HUE_ID = "hue_id"
     LAST_WILL = "last_will"
+    LAST_WILL_QOS = "last_will_qos"
     MIN_BRIGHTNESS = "min_brightness"
+    MIN_PUBLISH_INTERVAL = "min_publish_interval"
+    QOS = "qos"
     RETAIN = "retain"
     STATE_TOPIC = "state_topic"
     STATE_DEBOUNCE_TIME = "state_debounce_time"
+    STATE_FIELDS = "state_fields"
+    SUPPRESS_UNCHANGED = "suppress_unchanged"
     TYPE = "type"
 
 
+_STATE_FORMAT_JSONSCHEMA = {
+    ThingDefaultConfKey.STATE_FIELDS: {
+        "type": "array",
+        "items": {"type": "string", "enum": STATE_FIELDS},
+        "uniqueItems": True,
+        "description": "Fields of the state messages. Default: all (" + ", ".join(STATE_FIELDS) + ")"
+    },
+}
+
+
+_QOS_JSONSCHEMA = {
+    ThingDefaultConfKey.QOS: {
+        "type": "integer",
+        "enum": [0, 1, 2],
+        "description": "QoS of state messages. Default: MQTT state_qos"
+    },
+    ThingDefaultConfKey.LAST_WILL_QOS: {
+        "type": "integer",
+        "enum": [0, 1, 2],
+        "description": "QoS of the last will. Default: MQTT last_will_qos"
+    },
+}
+
+
+_PUBLISH_POLICY_JSONSCHEMA = {
+    ThingDefaultConfKey.SUPPRESS_UNCHANGED: {
+        "type": "boolean",
+        "description": "Don't publish states, which are unchanged (apart from the timestamp). Default is "
+                       f"{str(ThingDefaults.SUPPRESS_UNCHANGED).lower()}."
+    },
+    ThingDefaultConfKey.HEARTBEAT_INTERVAL: {
+        "type": "number",
+        "minimum": 0,
+        "description": "Republish an unchanged state after this time (seconds; checked about every minute). Default is "
+                       f"{ThingDefaults.HEARTBEAT_INTERVAL} (off)."
+    },
+    ThingDefaultConfKey.MIN_PUBLISH_INTERVAL: {
+        "type": "number",
+        "minimum": 0,
+        "maximum": 60000,
+        "description": "Min. time between two state messages (milliseconds). The last state is sent delayed. Default is "
+                       f"{ThingDefaults.MIN_PUBLISH_INTERVAL}."
+    },
+}
+
+
 THING_DEFAULTS_JSONSCHEMA = {
     "additionalProperties": False,
     "required": [],
@@ -41,7 +104,8 @@ THING_DEFAULTS_JSONSCHEMA = {
         ThingDefaultConfKey.CMD_TOPIC: {
             "type": "string",
             "minLength": 1,
-            "description": "Default MQTT command topic (listen to). " + _thing_key_info
+            "description": "Default MQTT command topic (listen to). " + _thing_key_info + " Things using it share one wildcard "
+                           "subscription, if the key occupies a whole topic level."
         },
         ThingDefaultConfKey.LAST_WILL: {
             "type": "string",
@@ -60,7 +124,10 @@ THING_DEFAULTS_JSONSCHEMA = {
             "maximum": 5000,
             "description": "State messages are hold back for this time. The last state message gets sent. Default is "
                            f"{ThingDefaults.STATE_DEBOUNCE_TIME} milliseconds."
-        }
+        },
+        **_PUBLISH_POLICY_JSONSCHEMA,
+        **_STATE_FORMAT_JSONSCHEMA,
+        **_QOS_JSONSCHEMA,
     },
 }
 
@@ -70,10 +137,19 @@ THING_JSONSCHEMA = {
     "required": [ThingConfKey.HUE_ID],
     "type": "object",
     "properties": {
-        ThingConfKey.CMD_TOPIC: {"type": "string", "minLength": 1, "description": "MQTT command topic (listen to)"},
+        ThingConfKey.CMD_TOPIC: {
+            "type": "string",
+            "minLength": 1,
+            "description": "MQTT command topic (listen to). May contain the wildcards '+' and '#'."
+        },
         ThingConfKey.STATE_TOPIC: {"type": "string", "minLength": 1, "description": "MQTT state topic (send to)"},
 
         ThingConfKey.HUE_ID: {"type": "string", "minLength": 1, "description": "Hue ID (UUID)"},
+        ThingConfKey.BRIDGE: {
+            "type": "string",
+            "minLength": 1,
+            "description": "Name of the Hue bridge (see 'hue_bridges'). Optional, if only one bridge is configured."
+        },
 
         ThingConfKey.RETAIN: {"type": "boolean"},
 
@@ -95,7 +171,10 @@ THING_JSONSCHEMA = {
             "maximum": 5000,
             "description": "State messages are hold back for this time. The last state message gets sent. Default is "
                            f"{ThingDefaults.STATE_DEBOUNCE_TIME} milliseconds."
-        }
+        },
+        **_PUBLISH_POLICY_JSONSCHEMA,
+        **_STATE_FORMAT_JSONSCHEMA,
+        **_QOS_JSONSCHEMA,
     },
 }
 
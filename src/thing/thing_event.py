@@ -25,6 +25,14 @@ class ThingEvent:
 
     # later: color: Optional[str] = None  # missing color transformations
 
+    def fingerprint(self) -> tuple:
+        """compact representation of the published state (without timestamp)"""
+        return (
+            self.name,
+            self.status,
+            int(round(self.brightness)) if self.brightness is not None else None,
+        )
+
     def to_data(self) -> Dict[str, any]:
         data = {
             "name": self.name
@@ -1,28 +1,72 @@
-from typing import List, Dict
+import logging
+from typing import List, Dict, Optional
 
 from src.app_config import ConfigException
-from src.thing.thing import Thing
+from src.app_config_cache import AppConfigCache
+from src.mqtt.topic_router import TopicRouter
+from src.thing.thing import PublishPolicy, Thing
 from src.thing.thing_config import ThingConfKey, ThingDefaultConfKey, DEFAULT_TOPIC_KEY_PATTERN, ThingDefaults
 
+_logger = logging.getLogger(__name__)
+
 
 class ThingFactory:
 
     @classmethod
-    def create_things(cls, thing_configs: Dict[str, any], default_config: Dict[str, any]) -> List[Thing]:
+    def create_things(cls, thing_configs: Dict[str, any], default_config: Dict[str, any],
+                      config_cache: Optional[AppConfigCache] = None) -> List[Thing]:
+        """The resolved thing parameters are taken from the config cache, if available (unchanged config file)."""
+        thing_params = config_cache.get(AppConfigCache.THING_PARAMS) if config_cache else None
+        if thing_params is None:
+            thing_params = cls.resolve_thing_params(thing_configs, default_config)
+            if config_cache:
+                config_cache.put(AppConfigCache.THING_PARAMS, thing_params)
+
+        return [cls.create_thing(params) for params in thing_params]
+
+    @classmethod
+    def create_thing(cls, params: Dict[str, any]) -> Thing:
+        params = dict(params)
+        params["publish_policy"] = PublishPolicy(**params["publish_policy"])
+        return Thing(**params)
+
+    @classmethod
+    def resolve_thing_params(cls, thing_configs: Dict[str, any], default_config: Dict[str, any]) -> List[Dict[str, any]]:
+        """:return: Thing constructor arguments with all defaults applied (plain data, cacheable)"""
 
         default_cmd_topic = default_config.get(ThingDefaultConfKey.CMD_TOPIC)
+        default_cmd_subscription = cls.get_key_pattern_filter(default_cmd_topic)
         default_state_topic = default_config.get(ThingDefaultConfKey.STATE_TOPIC)
         default_retain = default_config.get(ThingDefaultConfKey.RETAIN)
         default_last_will = default_config.get(ThingDefaultConfKey.LAST_WILL)
         default_min_brightness = default_config.get(ThingDefaultConfKey.MIN_BRIGHTNESS)
         default_state_debounce_time = default_config.get(ThingDefaultConfKey.STATE_DEBOUNCE_TIME, ThingDefaults.STATE_DEBOUNCE_TIME)
+        default_state_fields = default_config.get(ThingDefaultConfKey.STATE_FIELDS)
+        default_qos = default_config.get(ThingDefaultConfKey.QOS)
+        default_last_will_qos = default_config.get(ThingDefaultConfKey.LAST_WILL_QOS)
+        default_suppress_unchanged = default_config.get(ThingDefaultConfKey.SUPPRESS_UNCHANGED, ThingDefaults.SUPPRESS_UNCHANGED)
+        default_heartbeat_interval = default_config.get(ThingDefaultConfKey.HEARTBEAT_INTERVAL, ThingDefaults.HEARTBEAT_INTERVAL)
+        default_min_publish_interval = default_config.get(ThingDefaultConfKey.MIN_PUBLISH_INTERVAL, ThingDefaults.MIN_PUBLISH_INTERVAL)
 
-        things: List[Thing] = []
+        thing_params: List[Dict[str, any]] = []
 
         for name, thing_config in thing_configs.items():
             cmd_topic = thing_config.get(ThingConfKey.CMD_TOPIC)
-            if cmd_topic is None and default_cmd_topic is not None:
-                cmd_topic = default_cmd_topic.replace(DEFAULT_TOPIC_KEY_PATTERN, name.lower())
+            cmd_subscription = None
+            if cmd_topic is not None:
+                try:
+                    TopicRouter.validate_filter(cmd_topic)
+                except ValueError as ex:
+                    raise ConfigException(f"Thing '{name}' has an invalid command topic: {ex}")
+            elif default_cmd_topic is not None:
+                if TopicRouter.has_wildcards(name):
+                    # no topic can match; kept loadable, as before the topic validation
+                    _logger.warning("Thing '%s' gets no default command topic, its name contains MQTT wildcards ('+', '#'). "
+                                    "Configure '%s' explicitly to send commands.", name, ThingConfKey.CMD_TOPIC)
+                else:
+                    cmd_topic = default_cmd_topic.replace(DEFAULT_TOPIC_KEY_PATTERN, name.lower())
+                    if default_cmd_subscription and TopicRouter.covers(default_cmd_subscription, cmd_topic):
+                        cmd_subscription = default_cmd_subscription
 
             state_topic = thing_config.get(ThingConfKey.STATE_TOPIC)
             if state_topic is None and default_state_topic is not None:
@@ -45,15 +89,56 @@ class ThingFactory:
             if retain is None and default_retain is not None:
                 retain = default_retain
 
+            publish_policy = dict(  # PublishPolicy
+                suppress_unchanged=bool(thing_config.get(ThingConfKey.SUPPRESS_UNCHANGED, default_suppress_unchanged)),
+                heartbeat_interval=thing_config.get(ThingConfKey.HEARTBEAT_INTERVAL, default_heartbeat_interval),
+                min_publish_interval=thing_config.get(ThingConfKey.MIN_PUBLISH_INTERVAL, default_min_publish_interval) / 1000,  # ms => s
+            )
+
+            state_fields = thing_config.get(ThingConfKey.STATE_FIELDS, default_state_fields)
+            qos = thing_config.get(ThingConfKey.QOS, default_qos)
+            last_will_qos = thing_config.get(ThingConfKey.LAST_WILL_QOS, default_last_will_qos)
+
             hue_id = thing_config.get(ThingConfKey.HUE_ID)
+            bridge = thing_config.get(ThingConfKey.BRIDGE)
 
             if not cmd_topic and not state_topic:
                 raise ConfigException(f"Thing '{name}' has no MQTT topics!")
 
-            thing = Thing(
+            thing_params.append(dict(
                 hue_id=hue_id, name=name, cmd_topic=cmd_topic, state_topic=state_topic, last_will=last_will, retain=bool(retain),
-                min_brightness=min_brightness, state_debounce_time=state_debounce_time
-            )
-            things.append(thing)
+                min_brightness=min_brightness, state_debounce_time=state_debounce_time, publish_policy=publish_policy,
+                state_fields=state_fields, qos=qos, last_will_qos=last_will_qos, cmd_subscription=cmd_subscription, bridge=bridge
+            ))
+
+        return thing_params
 
-        return things
+    @classmethod
+    def assign_bridges(cls, things: List[Thing], bridge_names: List[Optional[str]]) -> Dict[Optional[str], List[Thing]]:
+        """:return: bridge name: things; things without bridge reference belong to the only bridge"""
+        bridge_things: Dict[Optional[str], List[Thing]] = {name: [] for name in bridge_names}
+        for thing in things:
+            bridge = thing.bridge
+            if bridge is None:
+                if len(bridge_names) != 1:
+                    raise ConfigException(f"Thing '{thing.name}' has to reference a Hue bridge ({ThingConfKey.BRIDGE})!")
+                bridge = bridge_names[0]
+            elif bridge not in bridge_things:
+                raise ConfigException(f"Thing '{thing.name}' references an unknown Hue bridge ('{bridge}')!")
+            bridge_things[bridge].append(thing)
+        return bridge_things
+
+    @classmethod
+    def get_key_pattern_filter(cls, topic_pattern: Optional[str]) -> Optional[str]:
+        """
+        Converts a topic pattern like "home/{THING_KEY}/cmd" into the wildcard filter "home/+/cmd", which covers the topics
+        of all things at once. Not possible, if the key doesn't occupy a whole topic level.
+        """
+        if not topic_pattern:
+            return None
+        levels = topic_pattern.split(TopicRouter.SEPARATOR)
+        key_levels = [level for level in levels if DEFAULT_TOPIC_KEY_PATTERN in level]
+        if not key_levels or any(level != DEFAULT_TOPIC_KEY_PATTERN for level in key_levels):
+            return None
+        levels = [TopicRouter.SINGLE_LEVEL if level == DEFAULT_TOPIC_KEY_PATTERN else level for level in levels]
+        return TopicRouter.SEPARATOR.join(levels)
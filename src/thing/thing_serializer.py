@@ -0,0 +1,47 @@
+from typing import Dict, List, Optional
+
+from src.thing.thing_config import STATE_FIELDS
+from src.thing.thing_event import ThingEvent, ThingStatus
+from src.utils.json_utils import JsonUtils
+from src.utils.time_utils import TimeUtils
+
+
+class ThingSerializer:
+    """
+    Precompiled JSON serializer for the state messages of one thing. Constant parts (name, field order, status values)
+    are prepared once, only the variable fields get filled in. The output equals `JsonUtils.dumps(event.to_data())`.
+    """
+
+    FIELDS = sorted(STATE_FIELDS)  # sorted like JsonUtils.dumps
+    BRIGHTNESS_KEY = '"brightness"' + JsonUtils.KEY_SEPARATOR
+    TIMESTAMP_KEY = '"timestamp"' + JsonUtils.KEY_SEPARATOR
+
+    def __init__(self, name: str, fields: Optional[List[str]] = None):
+        if fields is None:
+            fields = self.FIELDS
+        unknown_fields = set(fields) - set(self.FIELDS)
+        if unknown_fields:
+            raise ValueError(f"unknown state fields: {sorted(unknown_fields)}")
+
+        self._with_brightness = "brightness" in fields
+        self._with_timestamp = "timestamp" in fields
+
+        # name and status are neighbours and get precomputed together
+        prefix = '"name"' + JsonUtils.KEY_SEPARATOR + JsonUtils.dumps(name) if "name" in fields else None
+        self._constant_parts: Dict[Optional[ThingStatus], Optional[str]] = {}
+        for status in [None, *ThingStatus]:
+            status_part = None
+            if "status" in fields:
+                status_part = '"status"' + JsonUtils.KEY_SEPARATOR + JsonUtils.dumps(status.value if status else "error")
+            self._constant_parts[status] = JsonUtils.ITEM_SEPARATOR.join(p for p in [prefix, status_part] if p) or None
+
+    def serialize(self, event: ThingEvent) -> str:
+        parts = []
+        if self._with_brightness and event.brightness is not None:
+            parts.append(self.BRIGHTNESS_KEY + str(int(round(event.brightness))))
+        constant_part = self._constant_parts[event.status]
+        if constant_part:
+            parts.append(constant_part)
+        if self._with_timestamp:
+            parts.append(self.TIMESTAMP_KEY + '"' + TimeUtils.timestamp_text() + '"')
+        return "{" + JsonUtils.ITEM_SEPARATOR.join(parts) + "}"
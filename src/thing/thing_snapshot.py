@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+from typing import Dict, Iterable, Optional
+
+from src.thing.thing import Thing
+from src.thing.thing_event import ThingStatus
+from src.utils.json_utils import JsonUtils
+from src.utils.time_utils import TimeUtils
+
+_logger = logging.getLogger(__name__)
+
+
+class ThingSnapshot:
+    """
+    Compact on-disk snapshot of the last published thing states (warm start). The file gets replaced atomically, at most once
+    per `min_interval` and only if the content has changed.
+    """
+
+    VERSION = 1
+
+    def __init__(self, file_path: str, min_interval: float):
+        self._file_path = file_path
+        self._min_interval = min_interval
+
+        self._thing_states: Dict[str, list] = {}  # hue id: [payload, name, status, brightness]
+        self._last_content: Optional[str] = None
+        self._last_write_time: Optional[float] = None  # monotonic
+
+    @property
+    def file_path(self) -> str:
+        return self._file_path
+
+    def load(self, things: Dict[str, Thing]) -> int:
+        """
+        Restores the published states of the things.
+        :return: number of restored states (0: missing, unreadable or outdated snapshot)
+        """
+        try:
+            with open(self._file_path, "r") as stream:
+                content = stream.read()
+            data = json.loads(content)
+            if data.get("version") != self.VERSION:
+                raise ValueError(f"unsupported version ({data.get('version')})")
+
+            thing_states = data["things"]
+            restored = {}
+            for hue_id, (payload, name, status, brightness) in thing_states.items():
+                thing = things.get(hue_id)
+                if thing:
+                    restored[thing] = (payload, (name, ThingStatus(status) if status else None, brightness))
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as ex:
+            _logger.warning("snapshot (%s) ignored: %s", self._file_path, ex)
+            return 0
+
+        for thing, (payload, fingerprint) in restored.items():
+            thing.restore_state(payload, fingerprint)
+        self._thing_states = thing_states
+        self._last_content = content
+        return sum(1 for thing in restored if thing.awaits_retained_state)
+
+    def save(self, things: Iterable[Thing], force: bool = False) -> bool:
+        """:return: True, if the file was written"""
+        now = TimeUtils.monotonic()
+        if not force and self._last_write_time is not None and now - self._last_write_time < self._min_interval:
+            return False
+
+        for thing in things:
+            published_state = thing.published_state
+            if published_state is not None:
+                payload, (name, status, brightness) = published_state
+                self._thing_states[thing.hue_id] = [payload, name, status.value if status else None, brightness]
+
+        content = JsonUtils.dumps({"version": self.VERSION, "things": self._thing_states})
+        if content == self._last_content:
+            return False
+
+        temp_path = self._file_path + ".tmp"
+        try:
+            with open(temp_path, "w") as stream:
+                stream.write(content)
+                stream.flush()
+                os.fsync(stream.fileno())
+            os.replace(temp_path, self._file_path)  # atomic, readers never see a partial file
+        except OSError as ex:
+            _logger.warning("couldn't write snapshot (%s): %s", self._file_path, ex)
+            return False
+
+        self._last_content = content
+        self._last_write_time = now
+        return True
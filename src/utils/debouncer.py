@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set
+
+_logger = logging.getLogger(__name__)
+
+
+class _DebounceEntry:
+
+    __slots__ = ("tick", "callback", "value")
+
+    def __init__(self, tick: int, callback: Callable[[Any], None], value: Any):
+        self.tick = tick
+        self.callback = callback
+        self.value = value
+
+
+class Debouncer:
+    """
+    Trailing edge debouncing for any number of keys, driven by one hashed timer wheel on the asyncio event loop.
+
+    Each `trigger` (re)schedules the key in O(1); the callback gets called once with the last value after no further
+    trigger arrived for `delay` seconds. Callbacks run within the event loop, no threads are involved. The loop timer is
+    only armed for the next occupied tick, so a pending key doesn't cause a wakeup per tick.
+    """
+
+    DEFAULT_TICK = 0.005  # seconds
+    DEFAULT_SLOTS = 512
+
+    def __init__(self, tick: float = DEFAULT_TICK, slot_count: int = DEFAULT_SLOTS):
+        self._tick = tick
+        self._slot_count = slot_count
+        self._slots: List[Set[Hashable]] = [set() for _ in range(slot_count)]
+        self._entries: Dict[Hashable, _DebounceEntry] = {}
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_tick = 0
+        self._processed_tick = 0  # all ticks up to this one are processed
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _current_tick(self) -> int:
+        return int(time.monotonic() / self._tick)
+
+    def trigger(self, key: Hashable, delay: float, callback: Callable[[Any], None], value: Any = None):
+        """(Re)starts the debounce time for key. Has to be called from within the event loop."""
+        if self._timer is None:
+            if self._loop is None:
+                self._loop = asyncio.get_running_loop()
+            if not self._entries:
+                self._processed_tick = self._current_tick()
+
+        tick = max(math.ceil((time.monotonic() + delay) / self._tick), self._current_tick() + 1)
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self._entries[key] = _DebounceEntry(tick, callback, value)
+        else:
+            if entry.tick % self._slot_count != tick % self._slot_count:
+                self._slots[entry.tick % self._slot_count].discard(key)
+            entry.tick = tick
+            entry.callback = callback
+            entry.value = value
+        self._slots[tick % self._slot_count].add(key)
+
+        if self._timer is None or tick < self._timer_tick:
+            self._schedule(tick)
+
+    def cancel(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._slots[entry.tick % self._slot_count].discard(key)
+
+    def clear(self):
+        for slot in self._slots:
+            slot.clear()
+        self._entries = {}
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _schedule(self, tick: int):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer_tick = tick
+        self._timer = self._loop.call_later(max(tick * self._tick - time.monotonic(), 0), self._on_timer)
+
+    def _next_due_tick(self, current_tick: int) -> int:
+        for tick in range(current_tick + 1, current_tick + self._slot_count + 1):
+            slot = self._slots[tick % self._slot_count]
+            if slot and any(self._entries[key].tick <= tick for key in slot):
+                return tick
+        return min(entry.tick for entry in self._entries.values())  # beyond one revolution
+
+    def _on_timer(self):
+        self._timer = None
+
+        current_tick = self._current_tick()
+        first_tick = max(self._processed_tick + 1, current_tick - self._slot_count + 1)  # one revolution covers all slots
+
+        for tick in range(first_tick, current_tick + 1):
+            slot = self._slots[tick % self._slot_count]
+            if not slot:
+                continue
+
+            due_keys = [key for key in slot if self._entries[key].tick <= current_tick]
+            for key in due_keys:
+                entry = self._entries.get(key)
+                if entry is None or entry.tick > current_tick:
+                    continue  # cancelled or re-triggered by a previous callback
+                slot.discard(key)
+                del self._entries[key]
+                try:
+                    entry.callback(entry.value)
+                except Exception:
+                    _logger.exception("debounce callback failed (%s)", key)
+
+        self._processed_tick = current_tick
+
+        if self._entries:
+            next_tick = self._next_due_tick(current_tick)
+            if self._timer is None or next_tick < self._timer_tick:  # callbacks may have triggered already
+                self._schedule(next_tick)
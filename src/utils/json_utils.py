@@ -1,9 +1,18 @@
 import datetime
 import json
 
+try:
+    import orjson  # optional fast backend (parsing only)
+except ImportError:  # pragma: no cover
+    orjson = None
+
 
 class JsonUtils:
 
+    # published payloads keep the `json.dumps` format (subscribers may compare payloads or retained messages)
+    ITEM_SEPARATOR = ", "
+    KEY_SEPARATOR = ": "
+
     @classmethod
     def _default_json_serial(cls, obj):
         """JSON serializer for objects not serializable by default json code"""
@@ -15,3 +24,10 @@ class JsonUtils:
     @classmethod
     def dumps(cls, data, sort_keys=True, indent=None) -> str:
         return json.dumps(data, indent=indent, sort_keys=sort_keys, default=cls._default_json_serial)
+
+    @classmethod
+    def loads(cls, text: str):
+        """raises ValueError for invalid JSON"""
+        if orjson is not None:
+            return orjson.loads(text)
+        return json.loads(text)
@@ -0,0 +1,177 @@
+import bisect
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+_logger = logging.getLogger(__name__)
+
+
+class LatencyHistogram:
+    """Log-scaled buckets (50µs, doubling up to ~26s): constant memory, O(log buckets) per value, approximate percentiles."""
+
+    BOUNDS = [0.00005 * 2 ** i for i in range(20)]  # upper bucket bounds (seconds); plus one open bucket
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float):
+        self.counts[bisect.bisect_left(self.BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction: float) -> float:
+        """:return: upper bound of the bucket containing the percentile (not above the max value)"""
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(self.BOUNDS[index], self.max) if index < len(self.BOUNDS) else self.max
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """seconds"""
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+class Trace:
+    """Stages of one command or state change, stamped with the monotonic clock."""
+
+    __slots__ = ("kind", "key", "stages")
+
+    def __init__(self, kind: str, key: str, stage: str, start_time: float):
+        self.kind = kind
+        self.key = key  # hue id
+        self.stages: List[Tuple[str, float]] = [(stage, start_time)]
+
+    @property
+    def start_time(self) -> float:
+        return self.stages[0][1]
+
+    @property
+    def last_time(self) -> float:
+        return self.stages[-1][1]
+
+    def __str__(self):
+        previous_time = self.start_time
+        stages = [self.stages[0][0]]
+        for stage, stage_time in self.stages[1:]:
+            stages.append(f"{stage} +{(stage_time - previous_time) * 1000:.2f}ms")
+            previous_time = stage_time
+        return f"{self.kind} '{self.key}': {', '.join(stages)} (total {(self.last_time - self.start_time) * 1000:.2f}ms)"
+
+
+class LatencyTracer:
+    """
+    Trace spans of commands (MQTT => Hue bridge => published state) and state changes (Hue event => published state).
+    Each stamp records the latency since the previous stage into an in-memory histogram per kind and stage; finished
+    traces add their total latency. Tracing is switched on demand (SIGUSR1), together with the sampled trace log (every
+    nth finished trace); while it is off, `start` returns None and nothing gets allocated or recorded.
+    Stamps happen within the event loop only, so there is no locking. All functions are class methods (one tracer per process).
+    """
+
+    COMMAND = "command"
+    EVENT = "event"
+
+    # stages
+    MQTT_RECEIVED = "mqtt_received"  # MqttClient._on_message
+    PROCESS_COMMAND = "process_mqtt_command"
+    FETCH_COMMANDS = "fetch_commands"
+    SET_LIGHT_START = "set_light_start"  # after waiting for the dispatcher (rate limits)
+    SET_LIGHT_END = "set_light_end"
+    HUE_EVENT = "hue_event"
+    DEBOUNCE_RELEASE = "debounce_release"
+    TO_DATA = "to_data"  # serialized
+    PUBLISH = "publish"  # handed over to the MQTT client
+    TOTAL = "total"
+
+    DEFAULT_LOG_SAMPLE = 10  # every nth finished trace gets logged
+
+    _histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+    _log_sample = 0  # 0 == tracing off
+    _finished_count = 0
+
+    @classmethod
+    def now(cls) -> float:
+        return time.monotonic()
+
+    @classmethod
+    def is_enabled(cls) -> bool:
+        return cls._log_sample > 0
+
+    @classmethod
+    def start(cls, kind: str, key: str, stage: str, start_time: Optional[float] = None) -> Optional[Trace]:
+        """:return: None, if tracing is off"""
+        if not cls._log_sample:
+            return None
+        return Trace(kind, key, stage, start_time if start_time is not None else time.monotonic())
+
+    @classmethod
+    def stamp(cls, trace: Trace, stage: str):
+        now = time.monotonic()
+        cls._record(trace.kind, stage, now - trace.last_time)
+        trace.stages.append((stage, now))
+
+    @classmethod
+    def finish(cls, trace: Trace, stage: str):
+        cls.stamp(trace, stage)
+        cls._record(trace.kind, cls.TOTAL, trace.last_time - trace.start_time)
+
+        if cls._log_sample:  # traces started before tracing was switched off are recorded, but not logged
+            cls._finished_count += 1
+            if cls._finished_count % cls._log_sample == 0:
+                _logger.info("trace %s", trace)
+
+    @classmethod
+    def _record(cls, kind: str, stage: str, latency: float):
+        histogram = cls._histograms.get((kind, stage))
+        if histogram is None:
+            histogram = cls._histograms[(kind, stage)] = LatencyHistogram()
+        histogram.record(latency)
+
+    @classmethod
+    def get_summary(cls) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """:return: kind: stage: latency summary (seconds; stages: since the previous stage)"""
+        summary = {}
+        for (kind, stage), histogram in cls._histograms.items():
+            summary.setdefault(kind, {})[stage] = histogram.summary()
+        return summary
+
+    @classmethod
+    def log_summary(cls):
+        for kind, stages in cls.get_summary().items():
+            _logger.info("latencies (%s): %s", kind, ", ".join(
+                f"{stage} n={s['count']} p50={s['p50'] * 1000:.2f}ms p95={s['p95'] * 1000:.2f}ms max={s['max'] * 1000:.2f}ms"
+                for stage, s in stages.items()
+            ))
+
+    @classmethod
+    def set_trace_log(cls, sample: int):
+        """switches tracing on and logs every `sample`th finished trace; 0 == off"""
+        cls._log_sample = sample
+        cls._finished_count = 0
+
+    @classmethod
+    def toggle_trace_log(cls) -> bool:
+        """:return: True, if tracing is switched on"""
+        cls.set_trace_log(0 if cls._log_sample else cls.DEFAULT_LOG_SAMPLE)
+        return bool(cls._log_sample)
+
+    @classmethod
+    def reset(cls):
+        cls._histograms = {}
+        cls.set_trace_log(0)
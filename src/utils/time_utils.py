@@ -1,19 +1,50 @@
 import asyncio
 import datetime
+import time
+from typing import Optional
 
 from tzlocal import get_localzone
 
 
 class TimeUtils:
+    """
+    Clock service: wall clock for timestamps (local zone resolved once) and a monotonic clock for scheduling.
+    All functions are class methods, so they can be overwritten/mocked in tests.
+    """
+
+    _local_zone: Optional[datetime.tzinfo] = None
+
+    _timestamp_second: Optional[int] = None
+    _timestamp_text: Optional[str] = None
+
+    @classmethod
+    def local_zone(cls) -> datetime.tzinfo:
+        if cls._local_zone is None:
+            cls._local_zone = get_localzone()
+        return cls._local_zone
 
     @classmethod
     def now(cls, no_ms=False) -> datetime.datetime:
         """overwrite/mock in test"""
-        now = datetime.datetime.now(tz=get_localzone())
+        now = datetime.datetime.now(tz=cls.local_zone())
         if no_ms:
             now = now.replace(microsecond=0)
         return now
 
+    @classmethod
+    def timestamp_text(cls) -> str:
+        """ISO timestamp (second resolution, local zone) of now; formatted once per second. Overwrite/mock in test."""
+        second = int(time.time())
+        if second != cls._timestamp_second:
+            cls._timestamp_text = datetime.datetime.fromtimestamp(second, tz=cls.local_zone()).isoformat()
+            cls._timestamp_second = second
+        return cls._timestamp_text
+
+    @classmethod
+    def monotonic(cls) -> float:
+        """seconds, for scheduling (not affected by clock changes); overwrite/mock in test"""
+        return time.monotonic()
+
     @classmethod
     async def sleep(cls, seconds: float) -> int:
         await asyncio.sleep(seconds)
@@ -0,0 +1,301 @@
+import asyncio
+import copy
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Union
+from unittest.mock import MagicMock
+
+import attr
+import click
+from aiohue.v2 import EventType, HueBridgeV2
+from aiohue.v2.models.feature import OnFeature
+from aiohue.v2.models.light import Light
+from aiohue.v2.models.room import Room
+from paho.mqtt.client import MQTTMessage
+
+from src.hue.hue_config import HueBridgeConfKey
+from src.hue.hue_connector import HueConnector
+from src.mqtt.mqtt_client import MqttClient
+from src.mqtt.mqtt_config import MqttConfKey
+from src.mqtt.mqtt_proxy import MqttProxy
+from src.runner import Runner
+from src.thing.thing import Thing
+from test.hue.hue_bridge_simu import HueBridgeSimu
+from test.mqtt.mqtt_broker_simu import MqttBrokerSimu
+
+
+class BenchmarkConnector(HueConnector):
+    """real connector code paths; only the bridge (synthetic) and `set_state` calls (recorded) are replaced"""
+
+    def __init__(self, bridge: HueBridgeV2, things: List[Thing], group_debounce_time: int):
+        config = {
+            HueBridgeConfKey.HOST: "benchmark_host",
+            HueBridgeConfKey.APP_KEY: "benchmark_app_key",
+            HueBridgeConfKey.GROUP_DEBOUNCE_TIME: group_debounce_time,  # milliseconds
+            HueBridgeConfKey.LIGHT_RATE_LIMIT: 100000,  # measure the bridge, not the rate limits
+            HueBridgeConfKey.GROUP_RATE_LIMIT: 100000,
+        }
+        super().__init__(config, things)
+        self._simu_bridge = bridge
+        self.set_state_times: Dict[str, float] = {}  # hue id: perf counter
+
+    async def _initialize_hue_bridge(self):
+        self._bridge = self._simu_bridge
+
+    async def _set_light(self, hue_item: Union[Light, Room], on: Optional[bool], brightness: Optional[float]):
+        self.set_state_times[hue_item.id] = time.perf_counter()
+
+
+@attr.frozen
+class BenchmarkParams:
+
+    lights: int = 500
+    rooms: int = 25
+    zones: int = 10
+    events: int = 5000  # throughput run
+    samples: int = 200  # latency runs
+    mqtt_messages: int = 2000  # MQTT throughput runs (per QoS)
+    state_debounce_time: int = 0  # milliseconds
+    group_debounce_time: int = 20  # milliseconds
+
+
+class HueBenchmark:
+    """
+    Drives `HueConnector` and `MqttProxy` (with a `Runner`) on a synthetic bridge (see
+    `HueBridgeSimu.create_scaled_hue_bridge`), and real MQTT clients against the broker stand-in. The results are a JSON
+    document, which can be compared across releases. Times are in seconds, memory in bytes.
+    """
+
+    VERSION = 2
+    TIMEOUT = 5.0  # seconds per sample
+
+    def __init__(self, params: BenchmarkParams):
+        self._params = params
+        self._bridge = HueBridgeSimu.create_scaled_hue_bridge(params.lights, params.rooms, params.zones)
+
+    def create_things(self) -> List[Thing]:
+        hue_ids = [light.id for light in self._bridge.lights]
+        hue_ids.extend(g.id for g in self._bridge.groups if isinstance(g, Room))
+        return [
+            Thing(
+                hue_id=hue_id, name=hue_id, cmd_topic=f"{hue_id}/cmd", state_topic=f"{hue_id}/state", last_will=None, retain=True,
+                min_brightness=10.0, state_debounce_time=self._params.state_debounce_time / 1000
+            )
+            for hue_id in hue_ids
+        ]
+
+    async def run(self) -> Dict[str, any]:
+        results = {
+            "memory_per_thing": await self.measure_memory(),
+        }
+
+        things = self.create_things()
+        connector = BenchmarkConnector(self._bridge, things, self._params.group_debounce_time)
+        client = MagicMock(MqttClient, autospec=True)
+        received_messages: List[MQTTMessage] = []
+        client.get_messages.side_effect = lambda: [received_messages.pop() for _ in range(len(received_messages))]
+        client.queue_depth = 0
+        publish_times: Dict[str, float] = {}
+        client.publish.side_effect = lambda topic, **_kwargs: publish_times.__setitem__(topic, time.perf_counter())
+        proxy = MqttProxy(client, things)
+
+        runner = Runner([connector], proxy)
+        runner_task = asyncio.create_task(runner.run())
+        try:
+            await self._wait_for(lambda: len(publish_times) >= len(things))  # initial states
+
+            results["rebuild_caches"] = await self.measure_rebuild_caches(connector)
+            results["events_per_second"] = await self.measure_event_throughput(connector)
+            results["event_latency"] = await self.measure_event_latency(connector, publish_times)
+            results["command_latency"] = await self.measure_command_latency(connector, received_messages, runner)
+        finally:
+            runner.shutdown()
+            await runner_task
+            await proxy.close()
+            await connector.close()
+
+        results["mqtt_messages_per_second"] = await self.measure_mqtt_throughput()
+
+        return {
+            "version": self.VERSION,
+            "params": attr.asdict(self._params),
+            "environment": {"python": platform.python_version(), "platform": platform.platform()},
+            "results": results,
+        }
+
+    async def measure_memory(self) -> float:
+        """:return: bytes per thing (things, connector caches, topology, MQTT routing; without the aiohue resources)"""
+        gc.collect()
+        tracemalloc.start()
+        try:
+            base_size, _ = tracemalloc.get_traced_memory()
+            things = self.create_things()
+            connector = BenchmarkConnector(self._bridge, things, self._params.group_debounce_time)
+            proxy = MqttProxy(None, things)
+            await connector.connect()
+            gc.collect()
+            size, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        await connector.close()
+        del proxy
+        return (size - base_size) / len(things)
+
+    async def measure_rebuild_caches(self, connector: HueConnector, rounds: int = 5) -> Dict[str, float]:
+        durations = []
+        for _ in range(rounds):
+            time_start = time.perf_counter()
+            connector._rebuild_caches()
+            durations.append(time.perf_counter() - time_start)
+            await asyncio.sleep(self._settle_time)  # the rebuild feeds all states again
+        return self.summarize(durations)
+
+    async def measure_event_throughput(self, connector: HueConnector) -> float:
+        """events per second through `_on_state_changed` (caches, group aggregates, debouncing)"""
+        events = self.create_events(self._params.events)
+
+        time_start = time.perf_counter()
+        for item in events:
+            connector._on_state_changed(EventType.RESOURCE_UPDATED, item)
+        duration = time.perf_counter() - time_start
+
+        await asyncio.sleep(self._settle_time)
+        return len(events) / duration
+
+    async def measure_event_latency(self, connector: HueConnector, publish_times: Dict[str, float]) -> Dict[str, float]:
+        """Hue event => published state message"""
+        latencies = []
+        for item in self.create_events(self._params.samples):
+            topic = f"{item.id}/state"
+            publish_times.pop(topic, None)
+            time_start = time.perf_counter()
+            connector._on_state_changed(EventType.RESOURCE_UPDATED, item)
+            await self._wait_for(lambda: topic in publish_times)
+            latencies.append(publish_times[topic] - time_start)
+        await asyncio.sleep(self._settle_time)
+        return self.summarize(latencies)
+
+    async def measure_command_latency(
+        self, connector: BenchmarkConnector, received_messages: List[MQTTMessage], runner: Runner
+    ) -> Dict[str, float]:
+        """MQTT command (as received by the client) => `set_state` call"""
+        lights = self._bridge.lights
+        latencies = []
+        for index in range(self._params.samples):
+            light_id = lights[index % len(lights)].id
+            message = MQTTMessage(topic=f"{light_id}/cmd".encode())
+            message.payload = b"toggle"
+            received_messages.append(message)
+            connector.set_state_times.pop(light_id, None)
+
+            time_start = time.perf_counter()
+            runner.wakeup()  # the MQTT client thread wakes up the runner
+            await self._wait_for(lambda: light_id in connector.set_state_times)
+            latencies.append(connector.set_state_times[light_id] - time_start)
+        return self.summarize(latencies)
+
+    async def measure_mqtt_throughput(self) -> Dict[str, float]:
+        """messages per second through paho and `MqttBrokerSimu` (publisher => broker => subscriber), per QoS"""
+        broker = MqttBrokerSimu()
+        await broker.start()
+        try:
+            return {f"qos{qos}": await self._measure_mqtt_rate(broker, qos) for qos in [0, 1, 2]}
+        finally:
+            await broker.stop()
+
+    async def _measure_mqtt_rate(self, broker: MqttBrokerSimu, qos: int) -> float:
+        count = self._params.mqtt_messages
+        config = {MqttConfKey.HOST: "127.0.0.1", MqttConfKey.PORT: broker.port, MqttConfKey.MAX_QUEUED: count, MqttConfKey.CMD_QOS: qos}
+        subscriber = MqttClient(config)
+        publisher = MqttClient(config)
+        try:
+            for client in [subscriber, publisher]:
+                client.connect()
+                await self._wait_for(client.is_connected)
+            subscribe_count = broker.subscribe_count
+            subscriber.subscribe(["benchmark/+/state"])
+            await self._wait_for(lambda: broker.subscribe_count > subscribe_count)
+
+            received = []
+            time_start = time.perf_counter()
+            for index in range(count):
+                publisher.publish(f"benchmark/{index % 100}/state", f'{{"status":"on","brightness":{index % 100}}}', qos=qos)
+
+            def collect() -> bool:
+                received.extend(subscriber.get_messages())
+                return len(received) >= count
+
+            await self._wait_for(collect)
+            return count / (time.perf_counter() - time_start)
+        finally:
+            for client in [subscriber, publisher]:
+                await asyncio.get_running_loop().run_in_executor(None, client.close)
+
+    def create_events(self, count: int) -> List[Light]:
+        """toggles the lights round-robin (copies, like aiohue delivers updated resources)"""
+        lights = self._bridge.lights
+        events = []
+        for index in range(count):
+            item = copy.copy(lights[index % len(lights)])
+            item.on = OnFeature(on=(index // len(lights)) % 2 == 0)
+            events.append(item)
+        return events
+
+    @property
+    def _settle_time(self) -> float:
+        """all debounced states are through"""
+        return (max(self._params.state_debounce_time, self._params.group_debounce_time) + 50) / 1000
+
+    @classmethod
+    async def _wait_for(cls, condition):
+        deadline = time.perf_counter() + cls.TIMEOUT
+        while not condition():
+            if time.perf_counter() > deadline:
+                raise TimeoutError("benchmark sample timed out")
+            await asyncio.sleep(0)
+
+    @classmethod
+    def summarize(cls, values: List[float]) -> Dict[str, float]:
+        """seconds"""
+        values = sorted(values)
+        return {
+            "count": len(values),
+            "median": statistics.median(values),
+            "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+            "max": values[-1],
+        }
+
+
+_DEFAULT_PARAMS = BenchmarkParams()
+
+
+@click.command()
+@click.option("--lights", type=int, default=_DEFAULT_PARAMS.lights, show_default=True)
+@click.option("--rooms", type=int, default=_DEFAULT_PARAMS.rooms, show_default=True)
+@click.option("--zones", type=int, default=_DEFAULT_PARAMS.zones, show_default=True)
+@click.option("--events", type=int, default=_DEFAULT_PARAMS.events, show_default=True, help="Events of the throughput run.")
+@click.option("--samples", type=int, default=_DEFAULT_PARAMS.samples, show_default=True, help="Samples per latency run.")
+@click.option("--mqtt-messages", type=int, default=_DEFAULT_PARAMS.mqtt_messages, show_default=True,
+              help="Messages per MQTT throughput run.")
+@click.option("--output", help="Result file (JSON); default: stdout")
+def _main(lights, rooms, zones, events, samples, mqtt_messages, output):
+    """Benchmarks the bridge side on a synthetic Hue bridge (run from the project dir: python -m test.benchmark.hue_benchmark)"""
+    params = BenchmarkParams(lights=lights, rooms=rooms, zones=zones, events=events, samples=samples, mqtt_messages=mqtt_messages)
+    result = asyncio.run(HueBenchmark(params).run())
+
+    content = json.dumps(result, indent=2)
+    if output:
+        with open(output, "w") as stream:
+            stream.write(content)
+    else:
+        sys.stdout.write(content + "\n")
+
+
+if __name__ == '__main__':
+    _main()
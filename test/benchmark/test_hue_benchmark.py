@@ -0,0 +1,46 @@
+import json
+from unittest import IsolatedAsyncioTestCase
+
+from aiohue.v2.models.room import Room
+from aiohue.v2.models.zone import Zone
+
+from src.hue.hue_topology import HueTopology
+from test.benchmark.hue_benchmark import BenchmarkParams, HueBenchmark
+from test.hue.hue_bridge_simu import HueBridgeSimu
+
+
+class TestHueBenchmark(IsolatedAsyncioTestCase):
+    """small benchmark run; sizes and measurements of the real runs are given by the command line"""
+
+    def test_scaled_hue_bridge(self):
+        bridge = HueBridgeSimu.create_scaled_hue_bridge(light_count=12, room_count=3, zone_count=4)
+        topology = HueTopology()
+        topology.sync(bridge.devices, bridge.groups)
+
+        rooms = [g for g in bridge.groups if isinstance(g, Room) and not isinstance(g, Zone)]
+        zones = [g for g in bridge.groups if isinstance(g, Zone)]
+        self.assertEqual((len(bridge.lights), len(rooms), len(zones)), (12, 3, 4))
+
+        memberships = {}
+        for group in rooms + zones:
+            for light_id in topology.get_group_lights(group.id):
+                memberships.setdefault(light_id, []).append(group.id)
+        self.assertTrue(all(len(group_ids) == 3 for group_ids in memberships.values()))  # one room, two zones
+        self.assertEqual(len(memberships), 12)
+
+    async def test_run(self):
+        params = BenchmarkParams(lights=40, rooms=4, zones=3, events=400, samples=10, mqtt_messages=200)
+
+        result = await HueBenchmark(params).run()
+
+        result = json.loads(json.dumps(result))  # machine-readable
+        self.assertEqual(result["params"]["lights"], 40)
+        results = result["results"]
+        self.assertGreater(results["events_per_second"], 0)
+        self.assertGreater(results["memory_per_thing"], 0)
+        for name in ["rebuild_caches", "event_latency", "command_latency"]:
+            self.assertGreater(results[name]["median"], 0)
+            self.assertLessEqual(results[name]["median"], results[name]["max"])
+        self.assertEqual(results["event_latency"]["count"], 10)
+        self.assertEqual(set(results["mqtt_messages_per_second"]), {"qos0", "qos1", "qos2"})
+        self.assertTrue(all(rate > 0 for rate in results["mqtt_messages_per_second"].values()))
@@ -0,0 +1,90 @@
+import asyncio
+import json
+from unittest import IsolatedAsyncioTestCase, mock
+
+from src.thing.thing import PublishPolicy, Thing
+from src.thing.thing_event import ThingEvent, ThingStatus
+
+
+class TestThing(IsolatedAsyncioTestCase):
+
+    @classmethod
+    def create_thing(cls, publish_policy: PublishPolicy) -> Thing:
+        return Thing(
+            hue_id="id", name="name", cmd_topic="cmd", state_topic="state", last_will=None, retain=True, min_brightness=1,
+            publish_policy=publish_policy
+        )
+
+    @classmethod
+    def create_event(cls, status: ThingStatus, brightness=None) -> ThingEvent:
+        return ThingEvent(status=status, id="id", name="name", type="light", brightness=brightness)
+
+    @classmethod
+    def get_states(cls, thing: Thing):
+        payloads = [json.loads(m.payload) for m in thing.get_state_messages() or []]
+        return [(p["status"], p.get("brightness")) for p in payloads]
+
+    async def test_publish_all(self):
+        thing = self.create_thing(PublishPolicy())
+        thing.process_state_change(self.create_event(ThingStatus.ON, 50))
+        thing.process_state_change(self.create_event(ThingStatus.ON, 50))
+        self.assertEqual(self.get_states(thing), [("on", 50), ("on", 50)])
+
+    async def test_suppress_unchanged(self):
+        thing = self.create_thing(PublishPolicy(suppress_unchanged=True))
+        thing.process_state_change(self.create_event(ThingStatus.ON, 50))
+        thing.process_state_change(self.create_event(ThingStatus.ON, 50.2))  # rounded == unchanged
+        thing.process_state_change(self.create_event(ThingStatus.ON, 60))
+        self.assertEqual(self.get_states(thing), [("on", 50), ("on", 60)])
+
+    @mock.patch("src.utils.time_utils.TimeUtils.monotonic")
+    async def test_heartbeat(self, mocked_monotonic):
+        mocked_monotonic.return_value = 1000.0
+        thing = self.create_thing(PublishPolicy(suppress_unchanged=True, heartbeat_interval=60))
+        thing.check_heartbeat()
+        self.assertEqual(self.get_states(thing), [])  # nothing to repeat
+
+        thing.process_state_change(self.create_event(ThingStatus.OFF))
+        thing.check_heartbeat()
+        self.assertEqual(self.get_states(thing), [("off", None)])
+
+        mocked_monotonic.return_value = 1061.0
+        thing.check_heartbeat()
+        self.assertEqual(self.get_states(thing), [("off", None)])
+
+    async def test_min_publish_interval(self):
+        thing = self.create_thing(PublishPolicy(min_publish_interval=0.05))
+        thing.process_state_change(self.create_event(ThingStatus.ON, 10))
+        thing.process_state_change(self.create_event(ThingStatus.ON, 20))
+        thing.process_state_change(self.create_event(ThingStatus.ON, 30))
+        self.assertEqual(self.get_states(thing), [("on", 10)])
+
+        await asyncio.sleep(0.1)  # last one is sent delayed
+        self.assertEqual(self.get_states(thing), [("on", 30)])
+
+    async def test_restored_state(self):
+        thing = self.create_thing(PublishPolicy())
+        thing.process_state_change(self.create_event(ThingStatus.ON, 50))
+        payload, fingerprint = thing.published_state
+        self.assertEqual(fingerprint, ("name", ThingStatus.ON, 50))
+
+        # retained by the broker => the first unchanged state is skipped
+        thing = self.create_thing(PublishPolicy())
+        thing.restore_state(payload, fingerprint)
+        self.assertTrue(thing.awaits_retained_state)
+        thing.process_retained_state(payload)
+        thing.process_state_change(self.create_event(ThingStatus.ON, 50))
+        thing.process_state_change(self.create_event(ThingStatus.ON, 50))
+        thing.process_state_change(self.create_event(ThingStatus.OFF))
+        thing.process_state_change(self.create_event(ThingStatus.ON, 50))
+        self.assertEqual(self.get_states(thing), [("off", None), ("on", 50)])
+
+        # broker retains something else or nothing (yet)
+        for retained in ["other", None]:
+            thing = self.create_thing(PublishPolicy())
+            thing.restore_state(payload, fingerprint)
+            if retained:
+                thing.process_retained_state(retained)
+            thing.process_state_change(self.create_event(ThingStatus.ON, 50))
+            self.assertEqual(self.get_states(thing), [("on", 50)])
+            self.assertFalse(thing.awaits_retained_state)
@@ -3,7 +3,10 @@ import unittest
 
 from jsonschema import validate
 
+from src.app_config import ConfigException
+
 from src.thing.thing_config import DEFAULT_TOPIC_KEY_PATTERN, THING_DEFAULTS_JSONSCHEMA, THINGS_JSONSCHEMA
+from src.thing.thing import PublishPolicy
 from src.thing.thing_factory import ThingFactory
 
 
@@ -16,6 +19,9 @@ class TestThingFactory(unittest.TestCase):
             "last_will": '{"status": "offline"}',
             "retain": True,
             "min_brightness": 15,
+            "suppress_unchanged": True,
+            "heartbeat_interval": 600,
+            "qos": 1,
         }
         default_thing_config = {"hue_id": "default_thing"}
         specialized_thing_config = {
@@ -25,6 +31,10 @@ class TestThingFactory(unittest.TestCase):
             "last_will": "specialized_thing is offline",
             "retain": False,
             "min_brightness": 45,
+            "suppress_unchanged": False,
+            "min_publish_interval": 500,
+            "qos": 0,
+            "last_will_qos": 2,
         }
 
         things_config = {
@@ -55,3 +65,70 @@ class TestThingFactory(unittest.TestCase):
         self.assertEqual(specialized_thing.min_brightness, specialized_thing_config["min_brightness"])
         self.assertEqual(specialized_thing.retain, specialized_thing_config["retain"])
         self.assertEqual(specialized_thing.state_topic, specialized_thing_config["state_topic"])
+
+        self.assertEqual(default_thing.publish_policy, PublishPolicy(suppress_unchanged=True, heartbeat_interval=600))
+        self.assertEqual(
+            specialized_thing.publish_policy, PublishPolicy(suppress_unchanged=False, heartbeat_interval=600, min_publish_interval=0.5)
+        )
+
+        self.assertEqual((default_thing.qos, default_thing.last_will_qos), (1, None))
+        self.assertEqual((specialized_thing.qos, specialized_thing.last_will_qos), (0, 2))
+
+    def test_cmd_subscriptions(self):
+        thing_defaults_config = {"cmd_topic": f"test/hue/{DEFAULT_TOPIC_KEY_PATTERN}/cmd"}
+        things_config = {
+            "default_thing": {"hue_id": "1"},
+            "explicit_thing": {"hue_id": "2", "cmd_topic": "explicit/cmd"},
+        }
+        things = {t.name: t for t in ThingFactory.create_things(things_config, thing_defaults_config)}
+        self.assertEqual(things["default_thing"].mqtt_subscriptions, ["test/hue/+/cmd"])
+        self.assertEqual(things["explicit_thing"].mqtt_subscriptions, ["explicit/cmd"])
+
+        # key not occupying a whole level => exact subscriptions
+        thing_defaults_config = {"cmd_topic": f"test/hue/thing-{DEFAULT_TOPIC_KEY_PATTERN}/cmd"}
+        things = ThingFactory.create_things({"default_thing": {"hue_id": "1"}}, thing_defaults_config)
+        self.assertEqual(things[0].mqtt_subscriptions, ["test/hue/thing-default_thing/cmd"])
+
+        with self.assertRaises(ConfigException):
+            ThingFactory.create_things({"invalid_thing": {"hue_id": "3", "cmd_topic": "invalid/#/cmd"}}, {})
+
+    def test_wildcard_names(self):
+        thing_defaults_config = {
+            "cmd_topic": f"test/hue/{DEFAULT_TOPIC_KEY_PATTERN}/cmd",
+            "state_topic": f"test/hue/{DEFAULT_TOPIC_KEY_PATTERN}/state",
+        }
+        things_config = {
+            "light+1": {"hue_id": "1"},
+            "#": {"hue_id": "2"},
+            "explicit+": {"hue_id": "3", "cmd_topic": "explicit/cmd"},
+        }
+        with self.assertLogs("src.thing.thing_factory", "WARNING") as logs:
+            things = {t.name: t for t in ThingFactory.create_things(things_config, thing_defaults_config)}
+        self.assertEqual(len(logs.records), 2)
+
+        # valid before the command topics got validated: loaded, but without command topic
+        self.assertIsNone(things["light+1"].cmd_topic)
+        self.assertEqual(things["light+1"].mqtt_subscriptions, [])
+        self.assertEqual(things["light+1"].state_topic, "test/hue/light+1/state")
+        self.assertIsNone(things["#"].cmd_topic)
+        self.assertEqual(things["explicit+"].cmd_topic, "explicit/cmd")
+
+    def test_assign_bridges(self):
+        things_config = {
+            "a": {"hue_id": "1", "state_topic": "a", "bridge": "upstairs"},
+            "b": {"hue_id": "1", "state_topic": "b", "bridge": "ground"},
+            "c": {"hue_id": "2", "state_topic": "c"},
+        }
+        validate(things_config, THINGS_JSONSCHEMA)
+        things = ThingFactory.create_things(things_config, {})
+
+        bridge_things = ThingFactory.assign_bridges(things[:2], ["ground", "upstairs"])
+        self.assertEqual({k: [t.name for t in v] for k, v in bridge_things.items()}, {"ground": ["b"], "upstairs": ["a"]})
+
+        bridge_things = ThingFactory.assign_bridges(things[2:], [None])  # the only bridge
+        self.assertEqual(bridge_things[None], things[2:])
+
+        with self.assertRaises(ConfigException):
+            ThingFactory.assign_bridges(things, ["ground", "upstairs"])  # "c" without bridge
+        with self.assertRaises(ConfigException):
+            ThingFactory.assign_bridges(things[:1], ["ground"])  # unknown bridge
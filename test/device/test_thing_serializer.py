@@ -0,0 +1,65 @@
+import datetime
+import json
+import time
+import unittest
+from unittest import mock
+
+from tzlocal import get_localzone
+
+from src.thing.thing_event import ThingEvent, ThingStatus
+from src.thing.thing_serializer import ThingSerializer
+from src.utils.json_utils import JsonUtils
+
+
+class TestThingSerializer(unittest.TestCase):
+
+    @classmethod
+    def create_events(cls):
+        events = [ThingEvent(status=s, name="hue name", brightness=b) for s in [None, *ThingStatus] for b in [None, 0, 33.5, 100]]
+        events.append(ThingEvent(status=ThingStatus.ON, name='quoted "name" ä'))
+        events.append(ThingEvent(status=ThingStatus.ON))
+        return events
+
+    @mock.patch("src.utils.time_utils.TimeUtils.timestamp_text")
+    @mock.patch("src.utils.time_utils.TimeUtils.now")
+    def test_equals_to_data(self, mocked_now, mocked_timestamp_text):
+        mocked_now.return_value = datetime.datetime(2022, 1, 30, 10, 0, 0, tzinfo=get_localzone())
+        mocked_timestamp_text.return_value = mocked_now.return_value.isoformat()
+
+        for event in self.create_events():
+            serializer = ThingSerializer(event.name)
+            expected = JsonUtils.dumps(event.to_data())
+            self.assertEqual(serializer.serialize(event), expected)
+            self.assertEqual(json.loads(serializer.serialize(event)), json.loads(expected))
+
+    def test_fields(self):
+        event = ThingEvent(status=ThingStatus.ON, name="hue name", brightness=40)
+
+        serializer = ThingSerializer(event.name, ["status", "brightness"])
+        self.assertEqual(serializer.serialize(event), '{"brightness": 40, "status": "on"}')
+
+        serializer = ThingSerializer(event.name, ["timestamp"])
+        self.assertEqual(list(json.loads(serializer.serialize(event)).keys()), ["timestamp"])
+
+        with self.assertRaises(ValueError):
+            ThingSerializer(event.name, ["status", "color"])
+
+    def test_faster_than_dumps(self):
+        event = ThingEvent(status=ThingStatus.ON, name="hue name", brightness=40)
+        serializer = ThingSerializer(event.name)
+        count = 5000
+
+        def measure(func):
+            best = None
+            for _ in range(3):
+                start = time.perf_counter()
+                for _ in range(count):
+                    func()
+                duration = time.perf_counter() - start
+                best = duration if best is None else min(best, duration)
+            return best
+
+        generic = measure(lambda: JsonUtils.dumps(event.to_data()))
+        precompiled = measure(lambda: serializer.serialize(event))
+
+        self.assertLess(precompiled, generic)
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.thing.thing import Thing
+from src.thing.thing_event import ThingStatus
+from src.thing.thing_snapshot import ThingSnapshot
+
+
+class TestThingSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, "snapshot.json")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @classmethod
+    def create_thing(cls, hue_id: str, payload=None, fingerprint=None) -> Thing:
+        thing = Thing(hue_id=hue_id, name=hue_id, cmd_topic=None, state_topic=hue_id, last_will=None, retain=True, min_brightness=1)
+        if payload:
+            thing._last_payload = payload
+            thing._last_fingerprint = fingerprint
+        return thing
+
+    def test_save_load(self):
+        snapshot = ThingSnapshot(self.file_path, 60)
+        things = [self.create_thing("a", '{"status":"on"}', ("a", ThingStatus.ON, 50)), self.create_thing("b")]
+        self.assertTrue(snapshot.save(things))
+        self.assertEqual(os.listdir(self.temp_dir.name), ["snapshot.json"])
+
+        things = {t.hue_id: t for t in [self.create_thing("a"), self.create_thing("b")]}
+        self.assertEqual(ThingSnapshot(self.file_path, 60).load(things), 1)
+        self.assertEqual(things["a"]._restored_state, ('{"status":"on"}', ("a", ThingStatus.ON, 50)))
+        self.assertFalse(things["b"].awaits_retained_state)
+
+    @mock.patch("src.utils.time_utils.TimeUtils.monotonic")
+    def test_rate_limit(self, mocked_monotonic):
+        mocked_monotonic.return_value = 1000.0
+        snapshot = ThingSnapshot(self.file_path, 60)
+        thing = self.create_thing("a", "on", ("a", ThingStatus.ON, None))
+        self.assertTrue(snapshot.save([thing]))
+
+        thing._last_payload = "off"
+        mocked_monotonic.return_value = 1030.0
+        self.assertFalse(snapshot.save([thing]))  # too early
+        self.assertTrue(snapshot.save([thing], force=True))  # shutdown
+
+        mocked_monotonic.return_value = 1100.0
+        self.assertFalse(snapshot.save([thing]))  # unchanged
+
+    def test_invalid_file(self):
+        things = {"a": self.create_thing("a")}
+        self.assertEqual(ThingSnapshot(self.file_path, 60).load(things), 0)  # missing
+
+        for content in ["{broken", '{"version": 0}', '{"version": 1, "things": {"a": []}}']:
+            with open(self.file_path, "w") as stream:
+                stream.write(content)
+            with self.assertLogs("src.thing.thing_snapshot", "WARNING"):
+                self.assertEqual(ThingSnapshot(self.file_path, 60).load(things), 0)
+        self.assertFalse(things["a"].awaits_retained_state)
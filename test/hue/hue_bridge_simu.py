@@ -10,6 +10,7 @@ from aiohue.v2.models.grouped_light import GroupedLight
 from aiohue.v2.models.light import Light, LightMetaData, LightMode
 from aiohue.v2.models.resource import ResourceIdentifier, ResourceTypes
 from aiohue.v2.models.room import Room
+from aiohue.v2.models.zone import Zone
 
 from src.thing.thing import Thing
 
@@ -70,9 +71,12 @@ class HueBridgeSimu:
     Device structure:
     - switch
     - dimmer
-    - group
+    - group (room)
         - color1
         - color2
+    - zone (overlaps "group")
+        - dimmer
+        - color2
     """
 
     ID_SWITCH = "switch"  # single light
@@ -80,7 +84,9 @@ class HueBridgeSimu:
     ID_GROUP = "group"
     ID_GROUPED_LIGHT = "grouped_light"
     ID_COLOR1 = "color1"  # assigned to "group"
-    ID_COLOR2 = "color2"  # assigned to "group"
+    ID_COLOR2 = "color2"  # assigned to "group" and "zone"
+    ID_ZONE = "zone"
+    ID_ZONE_GROUPED_LIGHT = "zone_grouped_light"
 
     MIN_DIM_LIGHT = _SimuDefault.MIN_DIM_LIGHT
     MIN_DIM_GROUP = _SimuDefault.MIN_DIM_GROUP
@@ -112,6 +118,50 @@ class HueBridgeSimu:
 
         return bridge
 
+    @classmethod
+    def create_scaled_hue_bridge(cls, light_count: int, room_count: int, zone_count: int) -> HueBridgeV2:
+        """
+        Synthetic bridge (benchmarks): the lights are distributed round-robin over the rooms; each light is part of two
+        neighbouring zones, so zones overlap each other and the rooms.
+        """
+        bridge = MagicMock(HueBridgeV2, autospec=True)
+
+        hue_devices = []
+        hue_lights = []
+        for index in range(light_count):
+            light_id = f"light-{index:05d}"
+            device_id = f"device-{index:05d}"
+            if index % 3 == 0:
+                hue_light = cls.create_hue_color_light(light_id, device_id)
+            elif index % 3 == 1:
+                hue_light = cls.create_hue_dim_light(light_id, device_id)
+            else:
+                hue_light = cls.create_hue_switch_light(light_id, device_id)
+            hue_lights.append(hue_light)
+            hue_devices.append(cls.create_hue_device(device_id, light_id))
+
+        hue_groups = []
+        for index in range(room_count):
+            grouped_light = cls.create_hue_group_light(f"room-grouped-light-{index:04d}")
+            device_ids = [d.id for d in hue_devices[index::room_count]]
+            hue_groups.append(cls.create_hue_room(f"room-{index:04d}", device_ids, grouped_light.id))
+            hue_groups.append(grouped_light)
+        for index in range(zone_count):
+            grouped_light = cls.create_hue_group_light(f"zone-grouped-light-{index:04d}")
+            light_ids = [
+                light.id for light_index, light in enumerate(hue_lights)
+                if light_index % zone_count in (index, (index + 1) % zone_count)
+            ]
+            hue_groups.append(cls.create_hue_zone(f"zone-{index:04d}", light_ids, grouped_light.id))
+            hue_groups.append(grouped_light)
+
+        bridge.devices = hue_devices
+        bridge.lights = hue_lights
+        bridge.groups = hue_groups
+        bridge.sensors = []
+
+        return bridge
+
     @classmethod
     def configurable_things(cls) -> List[Thing]:
         switch_device_id = "thing-" + cls.ID_SWITCH
@@ -139,11 +189,19 @@ class HueBridgeSimu:
             grouped_light_id=hue_grouped_light.id
         )
 
+        hue_zone_grouped_light = cls.create_hue_group_light(cls.ID_ZONE_GROUPED_LIGHT)
+        hue_zone = cls.create_hue_zone(
+            cls.ID_ZONE,
+            light_ids=[simu_dimmer.hue_item.id, hue_color2.id],
+            grouped_light_id=hue_zone_grouped_light.id
+        )
+
         simu_room = RoomSimu(hue_room, [hue_color1, hue_color2], hue_grouped_light)
+        simu_zone = RoomSimu(hue_zone, [simu_dimmer.hue_item, hue_color2], hue_zone_grouped_light)
         simu_color1 = LightSimu(hue_color1, hue_device1, hue_room)
         simu_color2 = LightSimu(hue_color2, hue_device2, hue_room)
 
-        devices = [simu_switch, simu_dimmer, simu_room, simu_color1, simu_color2]
+        devices = [simu_switch, simu_dimmer, simu_room, simu_zone, simu_color1, simu_color2]
         return devices
 
     @classmethod
@@ -190,6 +248,21 @@ class HueBridgeSimu:
             children=children,
         )
 
+    @classmethod
+    def create_hue_zone(cls, test_id: str, light_ids: List[str], grouped_light_id: str):
+        """zones contain lights directly, not devices"""
+        children = [ResourceIdentifier(rid=light_id, rtype=ResourceTypes.LIGHT) for light_id in light_ids]
+        services = children + [ResourceIdentifier(rid=grouped_light_id, rtype=ResourceTypes.GROUPED_LIGHT)]
+
+        return Zone(
+            id=test_id,
+            id_v1=f"/groups/{test_id}",
+            metadata=LightMetaData(archetype="icon", name=test_id),
+            type=ResourceTypes.ZONE,
+            services=services,
+            children=children,
+        )
+
     @classmethod
     def create_hue_group_light(cls, test_id: str):
         return GroupedLight(
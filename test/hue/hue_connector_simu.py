@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import copy
+import json
 from typing import List, Optional
 from unittest.mock import MagicMock
 
+import attr
 from aiohue.v2 import EventType
 from aiohue.v2.models.feature import OnFeature
 from aiohue.v2.models.light import Light
@@ -17,14 +19,18 @@ from test.hue.hue_bridge_simu import HueBridgeSimu
 
 class HueConnectorSimu(HueConnector):
 
-    def __init__(self, things: Optional[List[Thing]] = None):
+    def __init__(self, things: Optional[List[Thing]] = None, local_group_state: bool = False, snapshot_file: Optional[str] = None):
         config = {
+            HueBridgeConfKey.LOCAL_GROUP_STATE: local_group_state,
             HueBridgeConfKey.HOST: "dummy_host",
             HueBridgeConfKey.APP_KEY: "dummy_app_key",
 
             # shorter time will blow the tests, because an intermediate group update wil be sent!
             HueBridgeConfKey.GROUP_DEBOUNCE_TIME: 20,  # milliseconds
+            HueBridgeConfKey.GROUP_RATE_LIMIT: 100,  # don't slow down the tests
         }
+        if snapshot_file:
+            config[HueBridgeConfKey.SNAPSHOT_FILE] = snapshot_file
         if things is None:
             things = HueBridgeSimu.configurable_things()
             for thing in things:
@@ -48,9 +54,10 @@ class HueConnectorSimu(HueConnector):
             messages = thing.get_state_messages()
             if messages:
                 for message in messages:
+                    payload = json.loads(message.payload)
                     if remove_timestamps:
-                        del message.payload["timestamp"]
-                    state_messages.append(message)
+                        del payload["timestamp"]
+                    state_messages.append(attr.evolve(message, payload=payload))
         return state_messages
 
     async def _initialize_hue_bridge(self):
@@ -73,6 +80,7 @@ class HueConnectorSimu(HueConnector):
             hue_item.on = OnFeature(on_state)
         else:
             raise Exception("Wrong test setup")
+        self._cache_hue_item(hue_item)  # update group aggregates
 
     def prepare_dim_state(self, device_key: str, brightness: float):
         hue_item = self._hue_items.get(device_key)
@@ -82,6 +90,7 @@ class HueConnectorSimu(HueConnector):
         if hue_item.dimming.min_dim_level is not None and brightness < hue_item.dimming.min_dim_level:
             raise RuntimeError("Wrong test setup: 'brightness' not adapted!")
         hue_item.dimming.brightness = brightness
+        self._cache_hue_item(hue_item)  # update group aggregates
 
     async def simu_command(self, device_key: str, command: str):
         thing = self._things[device_key]
@@ -91,13 +100,14 @@ class HueConnectorSimu(HueConnector):
         self.fetch_commands()
 
         await self.send_commands()
+        await self._dispatcher.join()
 
     async def _set_light(self, hue_item: Light, on: Optional[bool], brightness: Optional[float]):
         self.set_light(id=hue_item.id, on=on, brightness=brightness)
 
     @classmethod
-    async def create(cls, watch_initial_messages=False) -> HueConnectorSimu:
-        connector = HueConnectorSimu()
+    async def create(cls, watch_initial_messages=False, local_group_state=False) -> HueConnectorSimu:
+        connector = HueConnectorSimu(local_group_state=local_group_state)
         await connector.connect()
 
         await TimeUtils.sleep(0.1)  # wait until all debounce group observers have fired
@@ -1,9 +1,18 @@
 from __future__ import annotations
 
+import copy
+import os
+import tempfile
+
 from unittest import IsolatedAsyncioTestCase
 from unittest.mock import call
 
+import aiohttp
+from aiohue.v2 import EventType
+from aiohue.v2.models.feature import OnFeature
+
 from src.thing.thing import StateMessage
+from src.utils.time_utils import TimeUtils
 from test.hue.hue_bridge_simu import HueBridgeSimu
 from test.hue.hue_connector_simu import HueConnectorSimu
 
@@ -115,3 +124,219 @@ class TestHueConnector(IsolatedAsyncioTestCase):
         self.assertCountEqual(result_messages, [
             self.state_message(HueBridgeSimu.ID_GROUP, "on", brightness=69),
         ])
+
+    async def test_room_edited(self):
+        hue_room = copy.deepcopy(self.connector._hue_items[HueBridgeSimu.ID_GROUP])
+        hue_room.children = [c for c in hue_room.children if c.rid == "thing-" + HueBridgeSimu.ID_COLOR1]
+
+        self.connector._on_state_changed(EventType.RESOURCE_UPDATED, hue_room)
+        self.assertEqual(self.connector._group_children[HueBridgeSimu.ID_GROUP], [HueBridgeSimu.ID_COLOR1])
+        self.assertEqual(self.connector._light_to_groups[HueBridgeSimu.ID_COLOR2], {HueBridgeSimu.ID_ZONE})
+        await TimeUtils.sleep(0.1)
+        self.connector.reset_actions()
+
+        # color2 doesn't count for the group anymore
+        self.connector.prepare_on_state(HueBridgeSimu.ID_COLOR2, True)
+        self.connector.prepare_dim_state(HueBridgeSimu.ID_COLOR1, 40)
+        self.connector.prepare_on_state(HueBridgeSimu.ID_GROUPED_LIGHT, True)
+        await self.connector.simu_on_state_changed(HueBridgeSimu.ID_COLOR1, True)
+
+        result_messages = self.connector.get_state_message()
+        self.assertCountEqual(result_messages, [
+            self.state_message(HueBridgeSimu.ID_GROUP, "on", brightness=40),
+            self.state_message(HueBridgeSimu.ID_COLOR1, "on", brightness=40),
+        ])
+
+    async def test_light_in_room_and_zone(self):
+        self.assertEqual(self.connector._light_to_groups[HueBridgeSimu.ID_COLOR2], {HueBridgeSimu.ID_GROUP, HueBridgeSimu.ID_ZONE})
+
+        self.connector.prepare_dim_state(HueBridgeSimu.ID_COLOR1, 20)
+        self.connector.prepare_on_state(HueBridgeSimu.ID_COLOR1, True)
+        self.connector.prepare_dim_state(HueBridgeSimu.ID_DIMMER, 40)
+        self.connector.prepare_on_state(HueBridgeSimu.ID_DIMMER, True)
+        self.connector.prepare_dim_state(HueBridgeSimu.ID_COLOR2, 60)
+        self.connector.prepare_on_state(HueBridgeSimu.ID_GROUPED_LIGHT, True)
+        self.connector.prepare_on_state(HueBridgeSimu.ID_ZONE_GROUPED_LIGHT, True)
+
+        # both groups get updated
+        await self.connector.simu_on_state_changed(HueBridgeSimu.ID_COLOR2, True)
+
+        result_messages = self.connector.get_state_message()
+        self.assertCountEqual(result_messages, [
+            self.state_message(HueBridgeSimu.ID_COLOR2, "on", brightness=60),
+            self.state_message(HueBridgeSimu.ID_GROUP, "on", brightness=40),
+            self.state_message(HueBridgeSimu.ID_ZONE, "on", brightness=50),
+        ])
+
+    async def test_local_group_state(self):
+        await self.connector.close()
+        self.connector = await HueConnectorSimu.create(local_group_state=True)
+
+        self.connector.prepare_dim_state(HueBridgeSimu.ID_COLOR1, 30)
+        self.connector.prepare_on_state(HueBridgeSimu.ID_COLOR1, True)
+        # the grouped light is still reported as off, but the group state is derived from the lights
+        await self.connector.simu_on_state_changed(HueBridgeSimu.ID_COLOR2, True)
+
+        result_messages = self.connector.get_state_message()
+        self.assertCountEqual(result_messages, [
+            self.state_message(HueBridgeSimu.ID_COLOR2, "on", brightness=100),
+            self.state_message(HueBridgeSimu.ID_GROUP, "on", brightness=65),
+            self.state_message(HueBridgeSimu.ID_ZONE, "on", brightness=50),
+        ])
+
+    def prepare_full_state_events(self, *events):
+        """aiohue emits events for the differences of the fetched full state"""
+        bridge = self.connector._bridge
+        subscribers = [self.connector._on_state_changed]
+
+        def subscribe(callback):
+            subscribers.append(callback)
+            return lambda: subscribers.remove(callback)
+
+        def fetch_full_state():
+            for event_type, item in events:
+                for callback in list(subscribers):
+                    callback(event_type, item)
+
+        bridge.subscribe.side_effect = subscribe
+        bridge.fetch_full_state.side_effect = fetch_full_state
+        self.connector._next_refresh_time = TimeUtils.monotonic()
+
+    async def test_full_reload(self):
+        # nothing changed => nothing published, the caches are kept
+        self.prepare_full_state_events()
+        await self.connector.process_timer()
+        await TimeUtils.sleep(0.1)
+        self.assertEqual(self.connector.get_state_message(), [])
+        self.connector._bridge.fetch_full_state.assert_called_once()
+
+        hue_switch = copy.deepcopy(self.connector._hue_items[HueBridgeSimu.ID_SWITCH])
+        hue_switch.on = OnFeature(on=True)
+        self.prepare_full_state_events((EventType.RESOURCE_UPDATED, hue_switch))
+        with self.assertLogs("src.hue.hue_connector", "INFO") as logs:
+            await self.connector.process_timer()
+        self.assertIn("full refresh (dummy_host): 1 changes", logs.output[-1])
+        await TimeUtils.sleep(0.1)
+        self.assertEqual(self.connector.get_state_message(), [
+            self.state_message(HueBridgeSimu.ID_SWITCH, "on"),
+        ])
+
+    async def test_full_reload_deleted_light(self):
+        self.prepare_full_state_events((EventType.RESOURCE_DELETED, self.connector._hue_items[HueBridgeSimu.ID_SWITCH]))
+        await self.connector.process_timer()
+        await TimeUtils.sleep(0.1)
+        self.assertEqual(self.connector.get_state_message(), [
+            self.state_message(HueBridgeSimu.ID_SWITCH, "offline"),
+        ])
+        self.assertNotIn(HueBridgeSimu.ID_SWITCH, self.connector._hue_items)
+
+    async def test_full_reload_deleted_room(self):
+        self.prepare_full_state_events(
+            (EventType.RESOURCE_DELETED, self.connector._hue_items[HueBridgeSimu.ID_GROUPED_LIGHT]),
+            (EventType.RESOURCE_DELETED, self.connector._hue_items[HueBridgeSimu.ID_GROUP]),
+        )
+        await self.connector.process_timer()
+        await TimeUtils.sleep(0.1)
+        self.assertEqual(self.connector.get_state_message(), [
+            self.state_message(HueBridgeSimu.ID_GROUP, "offline"),
+        ])
+
+        # lights of the deleted room don't trigger the group anymore
+        await self.connector.simu_on_state_changed(HueBridgeSimu.ID_COLOR1, True)
+        self.assertEqual(self.connector.get_state_message(), [
+            self.state_message(HueBridgeSimu.ID_COLOR1, "on", brightness=100),
+        ])
+
+    async def test_deleted_event(self):
+        hue_switch = self.connector._hue_items[HueBridgeSimu.ID_SWITCH]
+        self.connector._on_state_changed(EventType.RESOURCE_DELETED, hue_switch)
+        await TimeUtils.sleep(0.1)
+
+        self.assertNotIn(HueBridgeSimu.ID_SWITCH, self.connector._hue_items)
+        self.assertEqual(self.connector.get_state_message(), [
+            self.state_message(HueBridgeSimu.ID_SWITCH, "offline"),
+        ])
+
+    def prepare_resync(self, switch_on: bool, failures: int = 0) -> list:
+        """bridge answers to resource type requests; :return: list of requested paths"""
+        requested = []
+
+        async def request(_method, path):
+            requested.append(path)
+            if len(requested) <= failures:
+                raise aiohttp.ClientError("bridge not reachable")
+            resource_type = path.rsplit("/", 1)[-1]
+            resources = [{"id": "unconfigured", "type": resource_type}]
+            for item in self.connector._hue_items.values():
+                if item.type.value == resource_type:
+                    on = switch_on if item.id == HueBridgeSimu.ID_SWITCH else item.on.on
+                    resources.append({"id": item.id, "type": resource_type, "on": {"on": on}})
+            return resources
+
+        self.connector._bridge.request = request
+        return requested
+
+    async def wait_for_resync(self):
+        await self.connector._resync_task
+        await TimeUtils.sleep(0.1)
+
+    def get_statuses(self):
+        return {m.payload["name"]: m.payload["status"] for m in self.connector.get_state_message()}
+
+    async def test_event_stream_short_gap(self):
+        self.connector._on_connection_changed(EventType.DISCONNECTED)
+        requested = self.prepare_resync(switch_on=True)
+        self.connector._on_connection_changed(EventType.RECONNECTED)  # before "offline_delay"
+        await self.wait_for_resync()
+
+        self.assertEqual(requested, ["clip/v2/resource/light", "clip/v2/resource/grouped_light"])
+        self.assertEqual(self.connector.get_state_message(), [
+            self.state_message(HueBridgeSimu.ID_SWITCH, "on"),  # missed event, the others didn't diverge
+        ])
+
+    async def test_event_stream_offline(self):
+        self.connector._offline_delay = 0.05
+        self.connector._on_connection_changed(EventType.DISCONNECTED)
+        await TimeUtils.sleep(0.15)
+        things = self.connector._things.keys()
+        self.assertEqual(self.get_statuses(), {t: "offline" for t in things})
+
+        # the full reload is skipped while disconnected
+        self.connector._next_refresh_time = TimeUtils.monotonic()
+        await self.connector.process_timer()
+        self.connector._bridge.fetch_full_state.assert_not_called()
+
+        self.connector.RESYNC_DELAY_MIN = 0.01
+        requested = self.prepare_resync(switch_on=True, failures=2)
+        self.connector._on_connection_changed(EventType.RECONNECTED)
+        await self.wait_for_resync()
+
+        self.assertEqual(len(requested), 4)  # 2 failed attempts
+        expected = {t: "off" for t in things}
+        expected[HueBridgeSimu.ID_SWITCH] = "on"
+        self.assertEqual(self.get_statuses(), expected)  # all things get republished after being offline
+
+    async def test_warm_start_snapshot(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            snapshot_file = os.path.join(temp_dir, "snapshot.json")
+            connector = HueConnectorSimu(snapshot_file=snapshot_file)
+            await connector.connect()
+            await TimeUtils.sleep(0.1)
+            published = {t.hue_id: t.published_state[0] for t in connector._things.values()}
+            await connector.close()
+            self.assertEqual(os.listdir(temp_dir), ["snapshot.json"])  # no temp file left
+
+            connector = HueConnectorSimu(snapshot_file=snapshot_file)
+            try:
+                # the broker retains the last published states, apart from one
+                for thing in connector._things.values():
+                    retained = published[thing.hue_id] if thing.hue_id != HueBridgeSimu.ID_DIMMER else "outdated"
+                    thing.process_retained_state(retained)
+
+                await connector.connect()
+                await TimeUtils.sleep(0.1)
+                self.assertEqual(connector.get_state_message(), [
+                    self.state_message(HueBridgeSimu.ID_DIMMER, "off", 0),  # only real differences
+                ])
+            finally:
+                await connector.close()
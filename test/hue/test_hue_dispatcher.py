@@ -0,0 +1,139 @@
+import asyncio
+import time
+from unittest import IsolatedAsyncioTestCase
+
+import aiohue
+
+from src.hue.hue_dispatcher import HueDispatcher, TokenBucket
+
+
+class TestHueDispatcher(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.dispatcher = HueDispatcher(rate_limits={"lights": 100, "groups": 10}, max_concurrency=3)
+        self.dispatcher.RETRY_BACKOFF = 0.01
+        self.sent = []
+        self.concurrent = 0
+        self.max_concurrent = 0
+
+    async def asyncTearDown(self):
+        await self.dispatcher.close()
+
+    def create_sender(self, name: str, failures: int = 0):
+        async def send():
+            nonlocal failures
+            self.concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self.concurrent)
+            try:
+                await asyncio.sleep(0.02)  # bridge round-trip
+                if failures > 0:
+                    failures -= 1
+                    raise aiohue.errors.BridgeBusy("busy")
+                self.sent.append(name)
+            finally:
+                self.concurrent -= 1
+        return send
+
+    async def test_token_bucket(self):
+        bucket = TokenBucket(rate=50, capacity=5)
+        time_start = time.monotonic()
+        for _ in range(15):
+            await bucket.acquire()
+        duration = time.monotonic() - time_start
+        self.assertGreater(duration, 0.15)  # 5 burst + 10 at 50/s
+        self.assertLess(duration, 0.5)
+
+    async def test_concurrent_within_limits(self):
+        for i in range(30):
+            self.dispatcher.submit("lights", f"light{i}", self.create_sender(f"light{i}"))
+        self.assertEqual(self.dispatcher.queue_depth, 30)
+
+        time_start = time.monotonic()
+        await self.dispatcher.join()
+        duration = time.monotonic() - time_start
+
+        self.assertEqual(len(self.sent), 30)
+        self.assertEqual(self.max_concurrent, 3)
+        self.assertLess(duration, 30 * 0.02)  # faster than sending sequentially
+
+        metrics = self.dispatcher.get_metrics()
+        self.assertEqual(metrics["queue_depth"], 0)
+        self.assertEqual(metrics["sent"], 30)
+        self.assertGreater(metrics["wait_time_max"], 0)
+
+    async def test_group_rate_limit(self):
+        for i in range(13):
+            self.dispatcher.submit("groups", f"group{i}", self.create_sender(f"group{i}"))
+
+        time_start = time.monotonic()
+        await self.dispatcher.join()
+        self.assertGreater(time.monotonic() - time_start, 0.25)  # 10 burst + 3 at 10/s
+        self.assertEqual(len(self.sent), 13)
+
+    async def test_coalesce_same_key(self):
+        self.dispatcher.submit("groups", "group", self.create_sender("first"))
+        self.dispatcher.submit("groups", "group", self.create_sender("second"))
+        await self.dispatcher.join()
+
+        self.assertEqual(self.sent, ["second"])
+        self.assertEqual(self.dispatcher.get_metrics()["coalesced"], 1)
+
+    async def test_retry_busy(self):
+        self.dispatcher.submit("lights", "light", self.create_sender("light", failures=2))
+        await self.dispatcher.join()
+
+        self.assertEqual(self.sent, ["light"])
+        self.assertEqual(self.dispatcher.get_metrics()["retries"], 2)
+
+    async def test_busy_pauses_bucket(self):
+        self.dispatcher.RETRY_BACKOFF = 0.1
+        self.dispatcher.submit("lights", "busy", self.create_sender("busy", failures=1))
+        await asyncio.sleep(0.05)  # busy answer received, backoff running
+        self.dispatcher.submit("lights", "other", self.create_sender("other"))
+
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.sent, [])  # paused bucket
+        self.assertEqual(self.max_concurrent, 1)
+
+        await self.dispatcher.join()
+        self.assertCountEqual(self.sent, ["busy", "other"])
+
+    async def test_newer_command_during_backoff(self):
+        self.dispatcher.RETRY_BACKOFF = 0.1
+        self.dispatcher.submit("lights", "light", self.create_sender("first", failures=1))
+        await asyncio.sleep(0.05)  # busy answer received, backoff running
+        self.dispatcher.submit("lights", "light", self.create_sender("second"))
+        await self.dispatcher.join()
+
+        self.assertEqual(self.sent, ["second"])  # the older command's retry got dropped
+        self.assertEqual(self.max_concurrent, 1)
+        self.assertEqual(self.dispatcher.get_metrics()["coalesced"], 1)
+
+    async def test_one_in_flight_per_key(self):
+        self.dispatcher.submit("lights", "light", self.create_sender("first"))
+        await asyncio.sleep(0.01)  # sending
+        self.dispatcher.submit("lights", "light", self.create_sender("second"))
+        self.dispatcher.submit("lights", "other", self.create_sender("other"))
+        await self.dispatcher.join()
+
+        self.assertEqual(self.sent, ["first", "other", "second"])  # other keys are not held up
+
+    async def test_unexpected_error(self):
+        async def fail():
+            raise ValueError("bug")
+
+        self.dispatcher.submit("lights", "bug", fail)
+        await self.dispatcher.join()
+
+        with self.assertRaises(ValueError):
+            self.dispatcher.raise_failure()
+        self.dispatcher.raise_failure()  # only once
+
+    async def test_expected_error(self):
+        async def fail():
+            raise aiohue.errors.AiohueException("failed")
+
+        self.dispatcher.submit("lights", "failed", fail)
+        with self.assertLogs("src.hue.hue_dispatcher", "ERROR"):
+            await self.dispatcher.join()
+        self.dispatcher.raise_failure()
@@ -0,0 +1,47 @@
+import unittest
+
+from aiohue.v2.models.feature import OnFeature
+
+from src.hue.hue_group_state import GroupAggregate, LightContribution
+from test.hue.hue_bridge_simu import HueBridgeSimu
+
+
+class TestHueGroupState(unittest.TestCase):
+
+    @classmethod
+    def create_light(cls, is_on: bool, brightness=None):
+        if brightness is None:
+            light = HueBridgeSimu.create_hue_switch_light("light", "device")
+        else:
+            light = HueBridgeSimu.create_hue_dim_light("light", "device")
+            light.dimming.brightness = brightness
+        light.on = OnFeature(on=is_on)
+        return light
+
+    def test_aggregate(self):
+        dimmer = LightContribution.from_light(self.create_light(True, 40))
+        switch = LightContribution.from_light(self.create_light(False))
+
+        aggregate = GroupAggregate()
+        self.assertIsNone(aggregate.average_brightness)
+        self.assertFalse(aggregate.is_on)
+
+        aggregate.add(switch)
+        self.assertIsNone(aggregate.average_brightness)  # no dimmable light
+
+        aggregate.add(dimmer)
+        self.assertTrue(aggregate.is_on)
+        self.assertEqual(aggregate.average_brightness, 20)
+
+        switch_on = LightContribution.from_light(self.create_light(True))
+        aggregate.replace(switch, switch_on)
+        self.assertEqual(aggregate.average_brightness, 70)
+
+        dimmer_off = LightContribution.from_light(self.create_light(False, 40))
+        aggregate.replace(dimmer, dimmer_off)
+        self.assertEqual(aggregate.on_count, 1)
+        self.assertEqual(aggregate.average_brightness, 50)
+
+        aggregate.remove(switch_on)
+        self.assertFalse(aggregate.is_on)
+        self.assertEqual(aggregate.average_brightness, 0)
@@ -0,0 +1,56 @@
+import unittest
+
+from aiohue.v2.models.resource import ResourceIdentifier, ResourceTypes
+from aiohue.v2.models.room import Room
+
+from src.hue.hue_topology import HueTopology
+from test.hue.hue_bridge_simu import HueBridgeSimu
+
+
+class TestHueTopology(unittest.TestCase):
+
+    def setUp(self):
+        self.bridge = HueBridgeSimu.create_hue_bridge()
+        self.topology = HueTopology()
+        self.topology.sync(self.bridge.devices, self.bridge.groups)
+
+    def get_room(self) -> Room:
+        return next(g for g in self.bridge.groups if g.id == HueBridgeSimu.ID_GROUP)
+
+    def test_sync(self):
+        self.assertEqual(self.topology.get_group_lights(HueBridgeSimu.ID_GROUP), [HueBridgeSimu.ID_COLOR1, HueBridgeSimu.ID_COLOR2])
+        self.assertEqual(self.topology.get_group_for_grouped_light(HueBridgeSimu.ID_GROUPED_LIGHT), HueBridgeSimu.ID_GROUP)
+
+        # unchanged resources => nothing to do
+        self.assertEqual(self.topology.sync(self.bridge.devices, self.bridge.groups), set())
+
+    def test_update_group(self):
+        room = self.get_room()
+        room.children = [c for c in room.children if c.rid == "thing-" + HueBridgeSimu.ID_COLOR2]
+
+        self.assertEqual(self.topology.update_group(room), {HueBridgeSimu.ID_GROUP})
+        self.assertEqual(self.topology.get_group_lights(HueBridgeSimu.ID_GROUP), [HueBridgeSimu.ID_COLOR2])
+
+        self.assertEqual(self.topology.update_group(room), set())
+
+    def test_zone_with_light_children(self):
+        zone = HueBridgeSimu.create_hue_room("zone", light_device_ids=[], grouped_light_id="zone_light")
+        zone.children = [ResourceIdentifier(rid=HueBridgeSimu.ID_DIMMER, rtype=ResourceTypes.LIGHT)]
+
+        self.assertEqual(self.topology.update_group(zone), {"zone"})
+        self.assertEqual(self.topology.get_group_lights("zone"), [HueBridgeSimu.ID_DIMMER])
+
+    def test_update_remove_device(self):
+        device = next(d for d in self.bridge.devices if d.id == "thing-" + HueBridgeSimu.ID_COLOR1)
+        device.services = [ResourceIdentifier(rid="new_light", rtype=ResourceTypes.LIGHT)]
+
+        self.assertEqual(self.topology.update_device(device), {HueBridgeSimu.ID_GROUP})
+        self.assertEqual(self.topology.get_group_lights(HueBridgeSimu.ID_GROUP), ["new_light", HueBridgeSimu.ID_COLOR2])
+
+        self.assertEqual(self.topology.remove_device(device.id), {HueBridgeSimu.ID_GROUP})
+        self.assertEqual(self.topology.get_group_lights(HueBridgeSimu.ID_GROUP), [HueBridgeSimu.ID_COLOR2])
+
+    def test_remove_group(self):
+        self.assertEqual(self.topology.remove_group(HueBridgeSimu.ID_GROUP), {HueBridgeSimu.ID_GROUP})
+        self.assertEqual(self.topology.get_group_lights(HueBridgeSimu.ID_GROUP), [])
+        self.assertIsNone(self.topology.get_group_for_grouped_light(HueBridgeSimu.ID_GROUPED_LIGHT))
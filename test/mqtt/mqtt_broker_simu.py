@@ -0,0 +1,365 @@
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+
+import attr
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+
+from src.mqtt.topic_router import TopicRouter
+
+
+class _ProtocolError(Exception):
+    pass
+
+
+@attr.frozen
+class BrokerMessage:
+    topic: str
+    payload: bytes
+    qos: int
+    retain: bool
+    properties: Optional[Properties] = None  # MQTT v5
+
+
+@attr.define(eq=False)
+class _Connection:
+    writer: asyncio.StreamWriter
+    protocol: int = 4  # 4 == 3.1.1, 5 == v5
+    client_id: str = ""
+    clean: bool = True
+    subscriptions: Dict[str, int] = attr.field(factory=dict)  # topic filter: granted qos
+    outgoing: asyncio.Queue = attr.field(factory=asyncio.Queue)  # messages to deliver
+    sender: Optional[asyncio.Task] = None
+    consumer_delay: float = 0.0  # seconds per delivered message
+    next_packet_id: int = 0
+    unacked: Set[int] = attr.field(factory=set)  # delivered QoS 1/2 packet ids
+
+
+class MqttBrokerSimu:
+    """
+    Minimal in-process MQTT 3.1.1/5 broker stand-in (asyncio): CONNECT, SUBSCRIBE, UNSUBSCRIBE, PUBLISH with QoS 0/1/2
+    handshakes (both directions), PINGREQ and DISCONNECT. Received messages are recorded (v5 topic aliases resolved) and
+    delivered to the subscribers of matching topic filters (wildcards; QoS downgraded to the granted one); retained messages
+    are kept and sent to new subscriptions. `publish` injects messages like a client would.
+
+    Each connection delivers through its own queue: `set_consumer_delay` makes a client a slow consumer, messages beyond
+    `max_queued` get dropped (`dropped_count`), like real brokers do. With `hold_acks` set, PUBLISH acknowledgements are held
+    back (slow broker) until `release_acks` is called. `byte_count` sums up all bytes received from clients. Sessions of
+    non-clean connects (subscriptions) are kept by client id (CONNACK "session present"); `disconnect_clients` drops all
+    connections (network failure).
+    """
+
+    DEFAULT_MAX_QUEUED = 10000  # messages per connection
+
+    def __init__(self, topic_alias_maximum: int = 0):
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Dict[asyncio.StreamWriter, _Connection] = {}
+        self._router: Optional[TopicRouter[Tuple[_Connection, str]]] = None  # rebuilt after subscription changes
+
+        self.topic_alias_maximum = topic_alias_maximum  # MQTT v5, announced in CONNACK
+        self.max_queued = self.DEFAULT_MAX_QUEUED
+
+        self.messages: List[BrokerMessage] = []
+        self.retained: Dict[str, BrokerMessage] = {}  # topic: message
+        self.subscriptions: Dict[str, int] = {}  # topic filter: granted qos (all connections)
+        self.consumer_delays: Dict[str, float] = {}  # client id: seconds per delivered message
+        self.connect_properties: Optional[Properties] = None  # of the last v5 CONNECT
+        self.connect_count = 0
+        self.subscribe_count = 0
+        self.packet_count = 0
+        self.byte_count = 0
+        self.protocol_errors: List[str] = []
+        self.delivered_count = 0
+        self.dropped_count = 0
+
+        self.hold_acks = False
+        self._held_acks: List[Tuple[asyncio.StreamWriter, bytes]] = []
+        self._sessions: Dict[str, Dict[str, int]] = {}  # client id: subscriptions
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_client, "127.0.0.1", 0)
+
+    async def stop(self):
+        for connection in list(self._connections.values()):
+            self._close_connection(connection)
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def publish(self, topic: str, payload: bytes, qos: int = 0, retain: bool = False):
+        """Sends a message to all subscribers, as if a client had published it."""
+        self._route(BrokerMessage(topic=topic, payload=payload, qos=qos, retain=retain))
+
+    def set_consumer_delay(self, client_id: str, delay: float):
+        """The client gets its messages delayed by `delay` seconds each (slow consumer); 0 == off"""
+        self.consumer_delays[client_id] = delay
+        for connection in self._connections.values():
+            if connection.client_id == client_id:
+                connection.consumer_delay = delay
+
+    def get_queue_depth(self, client_id: str) -> int:
+        """:return: messages waiting for delivery to the client"""
+        return sum(c.outgoing.qsize() for c in self._connections.values() if c.client_id == client_id)
+
+    def disconnect_clients(self):
+        """Closes all client connections without DISCONNECT; held acknowledgements get lost."""
+        self._held_acks.clear()
+        for connection in list(self._connections.values()):
+            connection.writer.close()
+
+    def release_acks(self):
+        self.hold_acks = False
+        held_acks, self._held_acks = self._held_acks, []
+        for writer, packet in held_acks:
+            writer.write(packet)
+
+    @classmethod
+    def _packet(cls, first_byte: int, body: bytes) -> bytes:
+        remaining = len(body)
+        length = bytearray()
+        while True:
+            byte = remaining % 128
+            remaining //= 128
+            length.append(byte | 0x80 if remaining else byte)
+            if not remaining:
+                break
+        return bytes([first_byte]) + bytes(length) + body
+
+    async def _read_packet(self, reader: asyncio.StreamReader):
+        first_byte = (await reader.readexactly(1))[0]
+        remaining, multiplier, header_size = 0, 1, 1
+        while True:
+            byte = (await reader.readexactly(1))[0]
+            header_size += 1
+            remaining += (byte & 0x7F) * multiplier
+            multiplier *= 128
+            if not byte & 0x80:
+                break
+        body = await reader.readexactly(remaining) if remaining else b""
+        self.byte_count += header_size + remaining
+        return first_byte, body
+
+    @classmethod
+    def _read_properties(cls, packet_type: int, body: bytes, pos: int) -> Tuple[Properties, int]:
+        """:return: properties and the position behind them"""
+        properties = Properties(packet_type)
+        _, length = properties.unpack(body[pos:])
+        return properties, pos + length
+
+    def _on_connect(self, connection: _Connection, body: bytes):
+        self.connect_count += 1
+        name_length = int.from_bytes(body[0:2], "big")
+        pos = 2 + name_length
+        protocol, flags = body[pos], body[pos + 1]
+        pos += 4  # protocol level, flags, keepalive
+        connection.protocol = protocol
+        if protocol == 5:
+            self.connect_properties, pos = self._read_properties(PacketTypes.CONNECT, body, pos)
+
+        client_id_length = int.from_bytes(body[pos:pos + 2], "big")
+        client_id = body[pos + 2:pos + 2 + client_id_length].decode()
+        clean = bool(flags & 0x02)
+        session_present = not clean and client_id in self._sessions
+        if clean:
+            self._sessions.pop(client_id, None)
+        elif session_present:
+            connection.subscriptions = dict(self._sessions[client_id])
+            self._router = None
+        connection.client_id = client_id
+        connection.clean = clean or not client_id
+        connection.consumer_delay = self.consumer_delays.get(client_id, 0.0)
+        connection.sender = asyncio.create_task(self._send_messages(connection))
+
+        if protocol == 5:
+            properties = Properties(PacketTypes.CONNACK)
+            if self.topic_alias_maximum:
+                properties.TopicAliasMaximum = self.topic_alias_maximum
+            connection.writer.write(self._packet(0x20, bytes([session_present, 0]) + properties.pack()))
+        else:
+            connection.writer.write(self._packet(0x20, bytes([session_present, 0])))
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connection = _Connection(writer)
+        self._connections[writer] = connection
+        topic_aliases: Dict[int, str] = {}  # alias: topic, per connection
+        try:
+            while True:
+                first_byte, body = await self._read_packet(reader)
+                self.packet_count += 1
+                packet_type = first_byte >> 4
+
+                if packet_type == 1:  # CONNECT
+                    self._on_connect(connection, body)
+                elif packet_type == 3:  # PUBLISH
+                    self._on_publish(connection, first_byte, body, topic_aliases)
+                elif packet_type == 4 or packet_type == 7:  # PUBACK, PUBCOMP (delivered messages)
+                    connection.unacked.discard(int.from_bytes(body[:2], "big"))
+                elif packet_type == 5:  # PUBREC (delivered QoS 2 message)
+                    writer.write(self._packet(0x62, body[:2]))  # PUBREL
+                elif packet_type == 6:  # PUBREL
+                    writer.write(self._packet(0x70, body[:2]))  # PUBCOMP
+                elif packet_type == 8:  # SUBSCRIBE
+                    self._on_subscribe(connection, body)
+                elif packet_type == 10:  # UNSUBSCRIBE
+                    self._on_unsubscribe(connection, body)
+                elif packet_type == 12:  # PINGREQ
+                    writer.write(b"\xd0\x00")
+                elif packet_type == 14:  # DISCONNECT
+                    break
+                await writer.drain()
+        except _ProtocolError as ex:
+            self.protocol_errors.append(str(ex))  # the connection gets closed, like a real broker does
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._close_connection(connection)
+
+    def _close_connection(self, connection: _Connection):
+        if self._connections.pop(connection.writer, None) is not None:
+            if not connection.clean:
+                self._sessions[connection.client_id] = connection.subscriptions
+            if connection.subscriptions:
+                self._router = None
+        if connection.sender:
+            connection.sender.cancel()
+            connection.sender = None
+        connection.writer.close()
+
+    def _read_topic_filters(self, connection: _Connection, packet_type: int, body: bytes, with_options: bool) -> List[Tuple[str, int]]:
+        """:return: topic filters with the requested qos (SUBSCRIBE) of a (UN)SUBSCRIBE packet"""
+        pos = 2
+        if connection.protocol == 5:
+            _, pos = self._read_properties(packet_type, body, pos)
+        topic_filters = []
+        while pos < len(body):
+            length = int.from_bytes(body[pos:pos + 2], "big")
+            topic_filter = body[pos + 2:pos + 2 + length].decode()
+            pos += 2 + length
+            if with_options:
+                topic_filters.append((topic_filter, body[pos] & 0x03))
+                pos += 1
+            else:
+                topic_filters.append((topic_filter, 0))
+        return topic_filters
+
+    def _on_subscribe(self, connection: _Connection, body: bytes):
+        self.subscribe_count += 1
+        granted = bytearray()
+        if connection.protocol == 5:
+            granted.append(0)  # no SUBACK properties
+        topic_filters = self._read_topic_filters(connection, PacketTypes.SUBSCRIBE, body, with_options=True)
+        for topic_filter, qos in topic_filters:
+            self.subscriptions[topic_filter] = qos
+            connection.subscriptions[topic_filter] = qos
+            granted.append(qos)
+        self._router = None
+        connection.writer.write(self._packet(0x90, body[:2] + bytes(granted)))
+
+        for topic_filter, qos in topic_filters:  # retained messages follow the SUBACK
+            for message in self.retained.values():
+                if TopicRouter.covers(topic_filter, message.topic):
+                    self._enqueue(connection, attr.evolve(message, qos=min(message.qos, qos), properties=None))
+
+    def _on_unsubscribe(self, connection: _Connection, body: bytes):
+        topic_filters = self._read_topic_filters(connection, PacketTypes.UNSUBSCRIBE, body, with_options=False)
+        for topic_filter, _ in topic_filters:
+            connection.subscriptions.pop(topic_filter, None)
+            if not any(topic_filter in c.subscriptions for c in self._connections.values()):
+                self.subscriptions.pop(topic_filter, None)
+        self._router = None
+        if connection.protocol == 5:  # no properties, reason code "success" per filter
+            connection.writer.write(self._packet(0xb0, body[:2] + b"\x00" + bytes(len(topic_filters))))
+        else:
+            connection.writer.write(self._packet(0xb0, body[:2]))
+
+    def _on_publish(self, connection: _Connection, first_byte: int, body: bytes, topic_aliases: Dict[int, str]):
+        qos = (first_byte >> 1) & 0x03
+        retain = bool(first_byte & 0x01)
+        length = int.from_bytes(body[0:2], "big")
+        topic = body[2:2 + length].decode()
+        pos = 2 + length
+        packet_id = body[pos:pos + 2] if qos else None
+        if qos:
+            pos += 2
+
+        properties = None
+        if connection.protocol == 5:
+            properties, pos = self._read_properties(PacketTypes.PUBLISH, body, pos)
+            alias = getattr(properties, "TopicAlias", None)
+            if alias is not None:
+                if not 0 < alias <= self.topic_alias_maximum:
+                    raise _ProtocolError(f"invalid topic alias {alias}")
+                if topic:
+                    topic_aliases[alias] = topic
+                elif alias in topic_aliases:
+                    topic = topic_aliases[alias]
+                else:
+                    raise _ProtocolError(f"unknown topic alias {alias}")
+            elif not topic:
+                raise _ProtocolError("empty topic without alias")
+
+        message = BrokerMessage(topic=topic, payload=body[pos:], qos=qos, retain=retain, properties=properties)
+        self.messages.append(message)
+        self._route(message)
+
+        if qos:
+            ack = self._packet(0x40 if qos == 1 else 0x50, packet_id)  # PUBACK / PUBREC
+            if self.hold_acks:
+                self._held_acks.append((connection.writer, ack))
+            else:
+                connection.writer.write(ack)
+
+    def _route(self, message: BrokerMessage):
+        """stores retained messages and queues the message for all matching subscriptions"""
+        if message.retain:
+            if message.payload:
+                self.retained[message.topic] = message
+            else:
+                self.retained.pop(message.topic, None)  # empty retained message deletes
+
+        if self._router is None:
+            self._router = TopicRouter()
+            for connection in self._connections.values():
+                for topic_filter in connection.subscriptions:
+                    self._router.add(topic_filter, (connection, topic_filter))
+
+        granted_qos: Dict[_Connection, int] = {}  # overlapping subscriptions: one delivery with the highest qos
+        for connection, topic_filter in self._router.match(message.topic):
+            granted_qos[connection] = max(granted_qos.get(connection, 0), connection.subscriptions[topic_filter])
+        for connection, qos in granted_qos.items():
+            # the retain flag is only set for messages sent because of a new subscription
+            self._enqueue(connection, attr.evolve(message, qos=min(message.qos, qos), retain=False, properties=None))
+
+    def _enqueue(self, connection: _Connection, message: BrokerMessage):
+        if connection.outgoing.qsize() >= self.max_queued:
+            self.dropped_count += 1
+        else:
+            connection.outgoing.put_nowait(message)
+
+    async def _send_messages(self, connection: _Connection):
+        """delivers the queued messages of a connection (slow consumers are delayed)"""
+        writer = connection.writer
+        try:
+            while True:
+                message = await connection.outgoing.get()
+                if connection.consumer_delay:
+                    await asyncio.sleep(connection.consumer_delay)
+
+                encoded_topic = message.topic.encode()
+                body = len(encoded_topic).to_bytes(2, "big") + encoded_topic
+                if message.qos:
+                    connection.next_packet_id = connection.next_packet_id % 65535 + 1
+                    connection.unacked.add(connection.next_packet_id)
+                    body += connection.next_packet_id.to_bytes(2, "big")
+                if connection.protocol == 5:
+                    body += b"\x00"  # no properties
+                writer.write(self._packet(0x30 | message.qos << 1 | message.retain, body + message.payload))
+                self.delivered_count += 1
+                await writer.drain()
+        except ConnectionError:
+            pass
@@ -0,0 +1,53 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional
+from unittest import IsolatedAsyncioTestCase
+
+from src.mqtt.mqtt_asyncio_client import MqttAsyncioClient
+from src.mqtt.mqtt_client import MqttClient, MqttClientFactory
+from src.mqtt.mqtt_config import MqttConfKey
+from test.mqtt.mqtt_broker_simu import MqttBrokerSimu
+
+
+class MqttBrokerTestCase(IsolatedAsyncioTestCase):
+    """real paho clients against the broker stand-in; the clients get closed after each test"""
+
+    TOPIC_ALIAS_MAXIMUM = 0  # announced by the broker (MQTT v5)
+    CLIENT_CONFIG: Dict[str, Any] = {}  # defaults of all clients
+
+    async def asyncSetUp(self):
+        self.broker = MqttBrokerSimu(topic_alias_maximum=self.TOPIC_ALIAS_MAXIMUM)
+        await self.broker.start()
+        self.clients: List[MqttClient] = []
+
+    async def asyncTearDown(self):
+        for client in self.clients:
+            if isinstance(client, MqttAsyncioClient):
+                client.close()  # runs within the event loop
+            else:
+                await asyncio.get_running_loop().run_in_executor(None, client.close)
+        await self.broker.stop()
+
+    async def wait_for(self, condition: Callable[[], bool], timeout: float = 5.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("timeout")
+            await asyncio.sleep(0.005)
+
+    def create_unconnected_client(self, **config) -> MqttClient:
+        client = MqttClientFactory.create({
+            MqttConfKey.HOST: "127.0.0.1", MqttConfKey.PORT: self.broker.port, **self.CLIENT_CONFIG, **config
+        })
+        self.clients.append(client)
+        return client
+
+    async def create_client(self, subscriptions: Optional[List[str]] = None, **config) -> MqttClient:
+        client = self.create_unconnected_client(**config)
+        client.connect()
+        await self.wait_for(client.is_connected)
+        if subscriptions:
+            subscribe_count = self.broker.subscribe_count
+            client.subscribe(subscriptions)
+            await self.wait_for(lambda: self.broker.subscribe_count > subscribe_count)
+        return client
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+from unittest import IsolatedAsyncioTestCase
+
+from src.mqtt.mqtt_asyncio_client import MqttAsyncioClient
+from src.mqtt.mqtt_client import MqttClientFactory
+from src.mqtt.mqtt_config import MqttConfKey
+
+
+class TestMqttAsyncioClient(IsolatedAsyncioTestCase):
+    """Minimal MQTT 3.1.1 server: CONNACK, SUBACK and one PUBLISH per subscription"""
+
+    async def asyncSetUp(self):
+        self.writers = []
+        self.server = await asyncio.start_server(self._handle_client, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+
+        config = {MqttConfKey.HOST: "127.0.0.1", MqttConfKey.PORT: port, MqttConfKey.ASYNCIO_LOOP: True}
+        self.client = MqttClientFactory.create(config)
+
+    async def asyncTearDown(self):
+        self.client.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.writers.append(writer)
+        try:
+            while True:
+                header = await reader.readexactly(2)
+                body = await reader.readexactly(header[1])  # short packets only
+                packet_type = header[0] >> 4
+                if packet_type == 1:  # CONNECT
+                    writer.write(b"\x20\x02\x00\x00")
+                elif packet_type == 8:  # SUBSCRIBE
+                    writer.write(b"\x90\x03" + body[:2] + b"\x01")
+                    topic = body[4:4 + int.from_bytes(body[2:4], "big")]
+                    payload = b"on"
+                    variable = len(topic).to_bytes(2, "big") + topic + payload
+                    writer.write(bytes([0x30, len(variable)]) + variable)
+                elif packet_type == 14:  # DISCONNECT
+                    break
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            pass
+        writer.close()
+
+    async def test_roundtrip(self):
+        self.assertIsInstance(self.client, MqttAsyncioClient)
+
+        wakeups = []
+        self.client.set_wakeup(lambda: wakeups.append(threading.current_thread()))
+
+        self.client.connect()
+        for _ in range(100):
+            if self.client.is_connected():
+                break
+            await asyncio.sleep(0.01)
+        self.assertTrue(self.client.is_connected())
+        self.assertFalse([t for t in threading.enumerate() if t.name.startswith("paho")])  # no background thread
+
+        self.client.subscribe(["thing/cmd"])
+        for _ in range(100):
+            messages = self.client.get_messages()
+            if messages:
+                break
+            await asyncio.sleep(0.01)
+
+        self.assertEqual([(m.topic, m.payload) for m in messages], [("thing/cmd", b"on")])
+        self.assertTrue(all(t is threading.current_thread() for t in wakeups))
+
+    async def test_socket_close_stops_misc_loop(self):
+        self.client.connect()
+        for _ in range(100):
+            if self.client.is_connected():
+                break
+            await asyncio.sleep(0.01)
+        misc_task = self.client._misc_task
+        self.assertIsNotNone(misc_task)
+
+        self.server.close()
+        for writer in list(self.writers):
+            writer.close()
+        for _ in range(100):
+            if misc_task.done():
+                break
+            await asyncio.sleep(0.01)
+        self.assertTrue(misc_task.cancelled())
+        self.assertFalse(self.client.is_connected())
@@ -0,0 +1,88 @@
+import asyncio
+
+from src.mqtt.mqtt_config import MqttConfKey
+from src.utils.latency_tracer import LatencyTracer
+from test.mqtt.mqtt_broker_test_case import MqttBrokerTestCase
+
+
+class TestMqttClient(MqttBrokerTestCase):
+    """Outbound flow control against a slow broker (acknowledgements held back)"""
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.client = await self.create_client(**{MqttConfKey.QOS: 1, MqttConfKey.MAX_IN_FLIGHT: 2, MqttConfKey.MAX_QUEUED: 3})
+
+    async def test_bounded_queue(self):
+        self.broker.hold_acks = True
+
+        for topic in ["a", "b", "c", "d", "e"]:
+            self.client.publish(topic, f"{topic}1")
+        await self.wait_for(lambda: len(self.broker.messages) == 2)
+
+        metrics = self.client.get_metrics()
+        self.assertEqual((metrics["in_flight"], metrics["queue_depth"]), (2, 3))
+
+        self.client.publish("d", "d2")  # queue full => replaces the queued message of the topic
+        self.client.publish("f", "f1")  # queue full, no message of the topic => oldest ("c") gets dropped
+        metrics = self.client.get_metrics()
+        self.assertEqual((metrics["queue_depth"], metrics["coalesced"], metrics["dropped"]), (3, 1, 1))
+
+        self.broker.release_acks()
+        await self.wait_for(lambda: len(self.broker.messages) == 5)
+
+        self.assertEqual([m.payload for m in self.broker.messages], [b"a1", b"b1", b"d2", b"e1", b"f1"])
+        await self.wait_for(lambda: self.client.get_metrics()["in_flight"] == 0)
+
+        metrics = self.client.get_metrics(reset=True)
+        self.assertEqual((metrics["queue_depth"], metrics["acked"]), (0, 5))
+        self.assertGreater(metrics["ack_latency_max"], 0)
+        self.assertEqual(self.client.get_metrics()["acked"], 0)
+
+    async def close_client(self, release_acks_after: float = None):
+        close_task = asyncio.get_running_loop().run_in_executor(None, self.client.close)
+        if release_acks_after is not None:
+            await asyncio.sleep(release_acks_after)
+            self.broker.release_acks()
+        await asyncio.wait_for(close_task, 5)
+
+    async def test_close_sends_queued(self):
+        self.broker.hold_acks = True
+        for topic in ["a", "b", "c", "d"]:
+            self.client.publish(topic, "offline")
+        await self.wait_for(lambda: len(self.broker.messages) == 2)
+
+        await self.close_client(release_acks_after=0.05)
+        await self.wait_for(lambda: len(self.broker.messages) == 4)
+
+    async def test_close_bounded(self):
+        self.client.CLOSE_TIMEOUT = 0.1
+        self.broker.hold_acks = True  # never acknowledged
+        for topic in ["a", "b", "c", "d"]:
+            self.client.publish(topic, "offline")
+        await self.wait_for(lambda: len(self.broker.messages) == 2)
+
+        with self.assertLogs("src.mqtt.mqtt_client", "WARNING"):
+            await self.close_client()
+        self.assertEqual(len(self.broker.messages), 2)  # the in-flight limit holds, the rest is dropped
+
+    async def test_receive_time(self):
+        self.client.subscribe(["thing/cmd"])
+        await self.wait_for(lambda: self.broker.subscribe_count == 1)
+        publisher = await self.create_client()
+
+        for tracing in [False, True]:
+            LatencyTracer.set_trace_log(LatencyTracer.DEFAULT_LOG_SAMPLE if tracing else 0)
+            publisher.publish("thing/cmd", "on")
+            received = []
+
+            def collect() -> bool:
+                received.extend(self.client.get_messages())
+                return bool(received)
+
+            await self.wait_for(collect)
+            receive_time = self.client.get_receive_time(received[0])
+            if tracing:
+                self.assertLess(received[0].timestamp, receive_time)  # paho's timestamp is kept
+            else:
+                self.assertIsNone(receive_time)
+        LatencyTracer.reset()
@@ -0,0 +1,133 @@
+import asyncio
+from unittest import mock
+
+from src.mqtt.mqtt_client import MqttClient
+from src.mqtt.mqtt_config import MqttConfKey
+from src.mqtt.mqtt_proxy import MqttProxy
+from src.thing.thing import Thing
+from test.mqtt.mqtt_broker_test_case import MqttBrokerTestCase
+
+
+@mock.patch.object(MqttClient, "RECONNECT_DELAY_MIN", 0.1)
+class TestMqttLoad(MqttBrokerTestCase):
+    """real paho publish/subscribe paths under load, against the broker stand-in (publisher => broker => subscriber)"""
+
+    MESSAGE_COUNT = 2000  # rates: see test/benchmark/hue_benchmark.py
+    CLIENT_CONFIG = {MqttConfKey.MAX_QUEUED: MESSAGE_COUNT}
+
+    @classmethod
+    def collect(cls, client: MqttClient, received: list) -> int:
+        received.extend(client.get_messages())
+        return len(received)
+
+    async def check_throughput(self, qos: int):
+        subscriber = await self.create_client(["load/+/state"], **{MqttConfKey.CMD_QOS: qos})
+        publisher = await self.create_client()
+
+        received = []
+        for i in range(self.MESSAGE_COUNT):
+            publisher.publish(f"load/{i % 100}/state", f'{{"status":"on","brightness":{i % 100}}}', qos=qos)
+        await self.wait_for(lambda: self.collect(subscriber, received) >= self.MESSAGE_COUNT)
+
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.collect(subscriber, received), self.MESSAGE_COUNT)  # nothing lost, nothing duplicated
+        self.assertEqual({m.qos for m in received}, {qos})
+        self.assertEqual(received[-1].payload, b'{"status":"on","brightness":99}')  # order kept
+
+    async def test_throughput_qos0(self):
+        await self.check_throughput(0)
+
+    async def test_throughput_qos1(self):
+        await self.check_throughput(1)
+
+    async def test_throughput_qos2(self):
+        await self.check_throughput(2)
+
+    async def test_retained(self):
+        publisher = await self.create_client()
+        for i in range(100):
+            publisher.publish(f"load/{i}/state", f"state{i}", retain=True, qos=1)
+        publisher.publish("load/0/state", "", retain=True, qos=1)  # deletes the retained message
+        await self.wait_for(lambda: len(self.broker.retained) == 99 and publisher.get_metrics()["in_flight"] == 0)
+
+        subscriber = await self.create_client(["load/#"])
+        received = []
+        await self.wait_for(lambda: self.collect(subscriber, received) >= 99)
+
+        self.assertTrue(all(m.retain for m in received))
+        self.assertEqual({m.topic for m in received}, {f"load/{i}/state" for i in range(1, 100)})
+
+        publisher.publish("load/1/state", "live")  # subscribed already => not flagged as retained
+        await self.wait_for(lambda: self.collect(subscriber, received) >= 100)
+        self.assertFalse(received[-1].retain)
+
+    async def test_slow_consumer(self):
+        self.broker.max_queued = 100
+        self.broker.set_consumer_delay("slow", 0.01)
+        slow_subscriber = await self.create_client(["load/#"], **{MqttConfKey.CLIENT_ID: "slow"})
+        fast_subscriber = await self.create_client(["load/#"])
+        publisher = await self.create_client()
+
+        for i in range(500):
+            publisher.publish(f"load/{i}/state", "on", qos=1)
+        fast_received = []
+        await self.wait_for(lambda: self.collect(fast_subscriber, fast_received) >= 500)
+        await self.wait_for(lambda: publisher.get_metrics()["in_flight"] == 0)
+
+        # the slow consumer neither blocks the publisher nor the other subscribers: all done, while its queue is pending
+        self.assertEqual([m.topic for m in fast_received], [f"load/{i}/state" for i in range(500)])
+        self.assertGreater(self.broker.dropped_count, 300)  # broker queue limit
+        self.assertGreater(self.broker.get_queue_depth("slow"), 0)
+
+        slow_received = []
+        await self.wait_for(lambda: self.broker.get_queue_depth("slow") == 0, timeout=3.0)
+        await self.wait_for(lambda: self.collect(slow_subscriber, slow_received) >= 500 - self.broker.dropped_count)
+        self.assertEqual(slow_received[0].topic, "load/0/state")  # the oldest ones got through, the latest got dropped
+
+    async def test_disconnect_under_load(self):
+        subscriber = await self.create_client(["load/#"], **{MqttConfKey.CMD_QOS: 1})
+        publisher = await self.create_client(**{MqttConfKey.QOS: 1})
+
+        for i in range(self.MESSAGE_COUNT):
+            publisher.publish(f"load/{i % 100}/state", f"state{i}")
+            if i == self.MESSAGE_COUNT // 2:
+                self.broker.disconnect_clients()
+            if i % 100 == 0:
+                await asyncio.sleep(0)  # let the broker work
+
+        # at least once: the latest state of each topic arrives (replaced and retransmitted messages are expected)
+        expected = {f"load/{i}/state": f"state{self.MESSAGE_COUNT - 100 + i}".encode() for i in range(100)}
+        latest = {}
+
+        def collect_latest() -> bool:
+            for message in subscriber.get_messages():
+                latest[message.topic] = message.payload
+            return latest == expected
+
+        await self.wait_for(collect_latest)
+        self.assertEqual(publisher.get_metrics()["reconnects"], 1)
+        self.assertEqual(self.broker.protocol_errors, [])
+
+    async def test_proxy_commands(self):
+        things = [
+            Thing(hue_id=f"light{i}", name=f"light{i}", cmd_topic=f"load/light{i}/cmd", state_topic=f"load/light{i}/state",
+                  last_will=None, retain=False, min_brightness=10.0)
+            for i in range(500)
+        ]
+        command_things = set()
+        for thing in things:
+            thing.set_command_listener(command_things.add)
+        proxy = MqttProxy(self.create_unconnected_client(), things)
+        await proxy.connect()
+        await self.wait_for(lambda: len(self.broker.subscriptions) == len(things))
+
+        commander = await self.create_client()
+        for thing in things:
+            commander.publish(thing.cmd_topic, "on", qos=1)
+
+        def process() -> bool:
+            proxy.process_thing_commands()
+            return len(command_things) == len(things)
+
+        await self.wait_for(process)
+        self.assertTrue(all(t.get_hue_command() is not None for t in things))
@@ -4,7 +4,7 @@ from unittest.mock import MagicMock, call
 
 from paho.mqtt.client import MQTTMessage
 
-from src.hue.hue_command import HueCommandType
+from src.hue.hue_command import HueCommandType, SwitchType
 from src.mqtt.mqtt_client import MqttClient
 from src.mqtt.mqtt_proxy import MqttProxy
 from src.thing.thing import Thing, StateMessage
@@ -19,10 +19,12 @@ class TestMqttProxy(IsolatedAsyncioTestCase):
             self.things.append(
                 Thing(
                     hue_id=key, name=key, cmd_topic=key + "/cmd", state_topic=key + "/state",
-                    last_will="last_will_" + key, retain=(i == 1), min_brightness=10 * i
+                    last_will="last_will_" + key, retain=(i == 1), min_brightness=10 * i, qos=(0 if i == 1 else None)
                 )
             )
         self.client = MagicMock(MqttClient, autospec=True)
+        self.client.state_qos = 2
+        self.client.last_will_qos = 1
         self.proxy = MqttProxy(self.client, self.things)
 
     async def asyncTearDown(self):
@@ -38,7 +40,7 @@ class TestMqttProxy(IsolatedAsyncioTestCase):
         expected_messages = []
         for t in self.things:
             for i in range(2):
-                message = StateMessage(topic=t.state_topic, payload=f"payload-{t.hue_id}-{i}", retain=t.retain)
+                message = StateMessage(topic=t.state_topic, payload=f"payload-{t.hue_id}-{i}", retain=t.retain, qos=t.qos)
 
                 # TODO process_state_change
                 t._add_state_message(message)
@@ -49,7 +51,7 @@ class TestMqttProxy(IsolatedAsyncioTestCase):
 
         calls = []
         for m in expected_messages:
-            calls.append(call(topic=m.topic, payload=m.payload, retain=m.retain))
+            calls.append(call(topic=m.topic, payload=m.payload, retain=m.retain, qos=2 if m.qos is None else m.qos, user_properties=None))
         self.client.publish.assert_has_calls(calls)
 
         # check commands
@@ -73,9 +75,66 @@ class TestMqttProxy(IsolatedAsyncioTestCase):
         self.client.publish = MagicMock("publish")  # reset mock
         calls = []
         for t in self.things:
-            calls.append(call(topic=t.state_topic, payload=t.last_will, retain=t.retain))
+            calls.append(call(
+                topic=t.state_topic, payload=t.last_will, retain=t.retain, qos=1, user_properties={"source": StateMessage.SOURCE_LAST_WILL}
+            ))
             t.close()
 
         await self.proxy.close()
 
         self.client.publish.assert_has_calls(calls)
+
+    async def test_wildcard_subscription(self):
+        things = [
+            Thing(
+                hue_id=key, name=key, cmd_topic=f"home/{key}/cmd", state_topic=f"home/{key}/state", last_will=None, retain=False,
+                min_brightness=None, cmd_subscription="home/+/cmd"
+            )
+            for key in ["a", "b"]
+        ]
+        things.append(Thing(
+            hue_id="c", name="c", cmd_topic="other/c/cmd", state_topic="other/c/state", last_will=None, retain=False, min_brightness=None
+        ))
+        proxy = MqttProxy(self.client, things)
+
+        await proxy.connect()
+        self.client.subscribe.assert_called_with(["home/+/cmd", "other/c/cmd"])
+
+        messages = []
+        for topic, payload in [("home/b/cmd", b"on"), ("home/unknown/cmd", b"on"), ("other/c/cmd", b"off")]:
+            message = MQTTMessage(topic=topic.encode())
+            message.payload = payload
+            messages.append(message)
+        self.client.get_messages.return_value = messages
+
+        proxy.process_thing_commands()
+        self.assertIsNone(things[0].get_hue_command())
+        self.assertEqual(things[1].get_hue_command().switch, SwitchType.ON)
+        self.assertEqual(things[2].get_hue_command().switch, SwitchType.OFF)
+
+        await proxy.close()
+
+    async def test_retained_states(self):
+        for t in self.things:
+            t.restore_state(f"state-{t.hue_id}", (t.name, None, None))  # thing 0 isn't retained => ignored
+        proxy = MqttProxy(self.client, self.things)
+
+        await proxy.connect()
+        self.client.subscribe.assert_called_with(["0/cmd", "1/cmd", "1/state"])
+
+        messages = []
+        for topic, payload, retain in [("1/state", b"live", False), ("1/state", b"state-1", True)]:
+            message = MQTTMessage(topic=topic.encode())
+            message.payload = payload
+            message.retain = retain
+            messages.append(message)
+        self.client.get_messages.return_value = messages
+
+        proxy.process_thing_commands()
+        self.assertEqual(self.things[1]._confirmed_state, ("state-1", ("1", None, None)))
+        self.client.unsubscribe.assert_called_once_with(["1/state"])  # all retained states received
+
+        await proxy.process_timer()
+        self.client.unsubscribe.assert_called_once()
+
+        await proxy.close()
@@ -0,0 +1,85 @@
+import asyncio
+import time
+from unittest import mock
+
+from src.mqtt.mqtt_client import MqttClient
+from src.mqtt.mqtt_config import MqttConfKey
+from test.mqtt.mqtt_broker_test_case import MqttBrokerTestCase
+
+
+@mock.patch.object(MqttClient, "RECONNECT_DELAY_MIN", 0.1)
+class TestMqttReconnect(MqttBrokerTestCase):
+    """In-process recovery from lost connections (broker stand-in drops all connections)"""
+
+    MAX_RECOVERY_TIME = 1.0  # seconds; reconnect delay 0.1s
+    TOPIC_ALIAS_MAXIMUM = 10
+    CLIENT_CONFIG = {MqttConfKey.QOS: 1}
+
+    async def connect(self, **config) -> MqttClient:
+        self.client = await self.create_client(["thing/cmd"], **config)
+        return self.client
+
+    async def interrupt(self, expected_payloads=(b"a3", b"b1")) -> float:
+        """
+        Drops the connection and publishes states while disconnected.
+        :return: recovery time: until reconnected and the latest states were delivered
+        """
+        start_time = time.monotonic()
+        self.broker.disconnect_clients()
+        await self.wait_for(lambda: not self.client.is_connected())
+
+        message_count = len(self.broker.messages)
+        for payload in ["a2", "a3"]:
+            self.client.publish("a/state", payload)
+        self.client.publish("b/state", "b1")
+
+        await self.wait_for(lambda: len(self.broker.messages) >= message_count + len(expected_payloads))
+        recovery_time = time.monotonic() - start_time
+
+        await asyncio.sleep(0.05)
+        self.assertEqual([m.payload for m in self.broker.messages[message_count:]], list(expected_payloads))  # latest states only
+        self.client.ensure_connection()  # no exception
+        self.assertEqual(self.client.get_metrics()["reconnects"], 1)
+        return recovery_time
+
+    async def check_reconnect(self, **config):
+        await self.connect(**config)
+        self.client.publish("a/state", "a1")
+        await self.wait_for(lambda: len(self.broker.messages) == 1)
+
+        recovery_time = await self.interrupt()
+
+        self.assertLess(recovery_time, self.MAX_RECOVERY_TIME)
+        self.assertEqual(self.broker.connect_count, 2)
+        self.assertEqual(self.broker.subscribe_count, 2)  # clean session => re-subscribed
+
+    async def test_reconnect(self):
+        await self.check_reconnect()
+
+    async def test_reconnect_asyncio(self):
+        await self.check_reconnect(**{MqttConfKey.ASYNCIO_LOOP: True})
+
+    async def test_persistent_session(self):
+        await self.connect(**{MqttConfKey.CLIENT_ID: "bridge", MqttConfKey.PERSISTENT_SESSION: True})
+        await self.interrupt()
+        self.assertEqual(self.broker.subscribe_count, 1)  # session present => no re-subscribe
+
+    async def test_topic_aliases_after_reconnect(self):
+        await self.connect(**{MqttConfKey.PROTOCOL: 5})
+        self.client.publish("a/state", "a0", qos=0)  # announces the alias
+        await self.wait_for(lambda: self.client.get_metrics()["in_flight"] == 0)
+
+        self.broker.hold_acks = True
+        self.client.publish("a/state", "a1")  # QoS 1: with topic, not acknowledged => retransmitted by paho after reconnect
+        await self.wait_for(lambda: len(self.broker.messages) == 2)
+        self.broker.hold_acks = False
+
+        await self.interrupt(expected_payloads=[b"a1", b"a3", b"b1"])
+        self.client.publish("a/state", "a4", qos=0)  # the alias of the previous connection is gone => announced again
+        self.client.publish("a/state", "a5", qos=0)
+        await self.wait_for(lambda: len(self.broker.messages) == 7)
+
+        self.assertEqual(self.broker.protocol_errors, [])
+        self.assertEqual([m.topic for m in self.broker.messages], ["a/state"] * 4 + ["b/state"] + ["a/state"] * 2)
+        self.assertEqual([m.payload for m in self.broker.messages], [b"a0", b"a1", b"a1", b"a3", b"b1", b"a4", b"a5"])
+        self.assertEqual([getattr(m.properties, "TopicAlias", None) for m in self.broker.messages[-2:]], [1, 1])
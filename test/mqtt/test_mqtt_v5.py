@@ -0,0 +1,83 @@
+from src.mqtt.mqtt_client import MqttClient
+from src.mqtt.mqtt_config import MqttConfKey
+from test.mqtt.mqtt_broker_test_case import MqttBrokerTestCase
+
+
+class TestMqttV5(MqttBrokerTestCase):
+    """MQTT v5 topic aliases, message expiry and user properties against the broker stand-in"""
+
+    TOPIC_COUNT = 50
+    ROUNDS = 5
+    TOPIC_ALIAS_MAXIMUM = 100
+    CLIENT_CONFIG = {MqttConfKey.QOS: 0}
+
+    @classmethod
+    def get_topic(cls, index: int) -> str:
+        return f"home/ground-floor/hue/thing-{index:02d}/state"
+
+    async def publish_rounds(self, client: MqttClient, topic_count: int, rounds: int) -> int:
+        """:return: bytes received by the broker"""
+        self.broker.messages.clear()
+        byte_count = self.broker.byte_count
+        for r in range(rounds):
+            for i in range(topic_count):
+                client.publish(self.get_topic(i), f'{{"status":"on","brightness":{r}}}')
+        await self.wait_for(lambda: len(self.broker.messages) == topic_count * rounds)
+        await self.wait_for(lambda: client.get_metrics()["in_flight"] == 0)
+        return self.broker.byte_count - byte_count
+
+    async def test_no_aliases_with_qos(self):
+        """paho retransmits QoS 1/2 messages after reconnects, when the aliases are gone => always with topic"""
+        client = await self.create_client(**{MqttConfKey.PROTOCOL: 5, MqttConfKey.QOS: 1})
+        await self.publish_rounds(client, 5, 2)
+        self.assertEqual(self.broker.protocol_errors, [])
+        self.assertFalse(any(hasattr(m.properties, "TopicAlias") for m in self.broker.messages))
+
+    async def test_topic_aliases(self):
+        client_v3 = await self.create_client()
+        bytes_v3 = await self.publish_rounds(client_v3, self.TOPIC_COUNT, self.ROUNDS)
+        topics_v3 = [m.topic for m in self.broker.messages]
+
+        client_v5 = await self.create_client(**{MqttConfKey.PROTOCOL: 5})
+        bytes_v5 = await self.publish_rounds(client_v5, self.TOPIC_COUNT, self.ROUNDS)
+        topics_v5 = [m.topic for m in self.broker.messages]
+
+        self.assertEqual(self.broker.protocol_errors, [])
+        self.assertEqual(topics_v5, topics_v3)  # aliases resolved by the broker
+
+        # v5 adds a property length byte to each message; the first message per topic announces the alias (+3 bytes)
+        # together with the topic, the following ones send the alias (3 bytes) instead of the topic
+        topic_size = len(self.get_topic(0))
+        expected_v5 = bytes_v3 + self.TOPIC_COUNT * 4 - self.TOPIC_COUNT * (self.ROUNDS - 1) * (topic_size - 4)
+        self.assertEqual(bytes_v5, expected_v5)
+        self.assertLess(bytes_v5, bytes_v3 * 0.75)
+
+    async def test_topic_alias_maximum(self):
+        self.broker.topic_alias_maximum = 10
+        client = await self.create_client(**{MqttConfKey.PROTOCOL: 5})
+        await self.publish_rounds(client, 20, 2)
+
+        self.assertEqual(self.broker.protocol_errors, [])
+        self.assertEqual([m.topic for m in self.broker.messages], [self.get_topic(i) for i in range(20)] * 2)
+        aliases = {getattr(m.properties, "TopicAlias", None) for m in self.broker.messages}
+        self.assertEqual(aliases, {None, *range(1, 11)})
+
+        client = await self.create_client(**{MqttConfKey.PROTOCOL: 5, MqttConfKey.TOPIC_ALIAS_MAXIMUM: 0})
+        await self.publish_rounds(client, 5, 2)
+        self.assertFalse(any(hasattr(m.properties, "TopicAlias") for m in self.broker.messages))
+
+    async def test_expiry_and_user_properties(self):
+        client = await self.create_client(**{
+            MqttConfKey.PROTOCOL: 5, MqttConfKey.MESSAGE_EXPIRY: 60, MqttConfKey.SESSION_EXPIRY: 300,
+            MqttConfKey.USER_PROPERTIES: {"bridge": "hue1"},
+        })
+        self.assertEqual(self.broker.connect_properties.SessionExpiryInterval, 300)
+
+        client.publish("thing/state", "on", user_properties={"source": "event"})
+        client.publish("thing/state", "off")
+        await self.wait_for(lambda: len(self.broker.messages) == 2)
+
+        properties = [m.properties for m in self.broker.messages]
+        self.assertEqual([p.MessageExpiryInterval for p in properties], [60, 60])
+        self.assertEqual(properties[0].UserProperty, [("bridge", "hue1"), ("source", "event")])
+        self.assertEqual(properties[1].UserProperty, [("bridge", "hue1")])
@@ -0,0 +1,60 @@
+import time
+import unittest
+
+from src.mqtt.topic_router import TopicRouter
+
+
+class TestTopicRouter(unittest.TestCase):
+
+    def test_match(self):
+        router = TopicRouter()
+        router.add("home/hue/+/cmd", "default")
+        router.add("home/hue/kitchen/cmd", "kitchen")
+        router.add("home/#", "all")
+        router.add("other/cmd", "other")
+
+        self.assertEqual(router.match("home/hue/kitchen/cmd"), ["all", "default", "kitchen"])
+        self.assertEqual(router.match("home/hue/office/cmd"), ["all", "default"])
+        self.assertEqual(router.match("home/hue/office/state"), ["all"])
+        self.assertEqual(router.match("home"), ["all"])  # "#" includes the parent level
+        self.assertEqual(router.match("other/cmd"), ["other"])
+        self.assertEqual(router.match("other/cmd/x"), [])
+        self.assertEqual(router.match("unknown"), [])
+
+    def test_no_duplicates(self):
+        router = TopicRouter()
+        router.add("a/+", "thing")
+        router.add("a/b", "thing")
+        self.assertEqual(router.match("a/b"), ["thing"])
+
+    def test_dollar_topics(self):
+        router = TopicRouter()
+        router.add("#", "all")
+        router.add("+/info", "info")
+        self.assertEqual(router.match("$SYS/info"), [])
+        self.assertEqual(router.match("x/info"), ["all", "info"])
+
+    def test_validate_filter(self):
+        for topic_filter in ["a/#", "#", "+/b/+", "a/b"]:
+            TopicRouter.validate_filter(topic_filter)
+        for topic_filter in ["", "a/#/b", "a/b#", "a/b+/c"]:
+            with self.assertRaises(ValueError):
+                TopicRouter.validate_filter(topic_filter)
+
+    def test_reduce_filters(self):
+        filters = ["home/hue/+/cmd", "home/hue/kitchen/cmd", "other/cmd", "home/hue/+/cmd", "home/hue/x/y/cmd"]
+        self.assertEqual(TopicRouter.reduce_filters(filters), ["home/hue/+/cmd", "other/cmd", "home/hue/x/y/cmd"])
+        self.assertEqual(TopicRouter.reduce_filters(["a/+", "a/#", "b"]), ["a/#", "b"])
+
+    def test_lookup_independent_of_thing_count(self):
+        def measure(thing_count):
+            router = TopicRouter()
+            for i in range(thing_count):
+                router.add(f"home/hue/thing{i}/cmd", i)
+            start = time.perf_counter()
+            for i in range(2000):
+                router.match(f"home/hue/thing{i % thing_count}/cmd")
+            return time.perf_counter() - start
+
+        measure(10)  # warm up
+        self.assertLess(measure(5000), measure(10) * 5)
@@ -1,6 +1,21 @@
+import os
+import tempfile
 import unittest
+from unittest import mock
+
+from jsonschema import ValidationError
 
 from src.app_config import AppConfig, RunMode, ConfigException
+from src.thing.thing_factory import ThingFactory
+
+CONFIG = """
+hue_bridge: { host: "bridge", app_key: "key" }
+mqtt: { host: "broker" }
+thing_defaults: { state_topic: "hue/{THING_KEY}/state", cmd_topic: "hue/{THING_KEY}/cmd" }
+things:
+  light1: { hue_id: "1" }
+  light2: { hue_id: "2", heartbeat_interval: 60 }
+"""
 
 
 class TestAppConfig(unittest.TestCase):
@@ -33,3 +48,80 @@ class TestAppConfig(unittest.TestCase):
 
         with self.assertRaises(ConfigException):
             AppConfig.determine_run_mode(False, True, True, False),
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config_file = os.path.join(self.temp_dir.name, "config.yaml")
+        self.cache_file = os.path.join(self.temp_dir.name, "config.cache")
+        self.write_config(CONFIG)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_config(self, content: str):
+        with open(self.config_file, "w") as stream:
+            stream.write(content)
+        os.chmod(self.config_file, 0o600)
+
+    def test_validator_per_schema_variant(self):
+        AppConfig(self.config_file, RunMode.RUN_SERVICE)
+        validator = AppConfig._validators["default"]
+        AppConfig(self.config_file, RunMode.RUN_SERVICE)
+        self.assertIs(AppConfig._validators["default"], validator)  # compiled once
+
+        self.write_config(CONFIG.replace('mqtt: { host: "broker" }', ""))
+        with self.assertRaises(ValidationError):
+            AppConfig(self.config_file, RunMode.RUN_SERVICE)
+        AppConfig(self.config_file, RunMode.EXPLORE)  # MQTT is optional
+        self.assertIsNot(AppConfig._validators["explore"], validator)
+
+    def test_parsing_error(self):
+        self.write_config("things: [")
+        with self.assertRaises(ConfigException):
+            AppConfig(self.config_file, RunMode.RUN_SERVICE)
+
+    def create_things(self, run_mode=RunMode.RUN_SERVICE):
+        app_config = AppConfig(self.config_file, run_mode, self.cache_file)
+        things = ThingFactory.create_things(app_config.get_things_config(), app_config.get_thing_defaults_config(), app_config.cache)
+        app_config.save_cache()
+        return app_config, things
+
+    def test_config_cache(self):
+        app_config, things = self.create_things()
+        self.assertEqual(oct(os.stat(self.cache_file).st_mode & 0o777), "0o600")
+
+        with mock.patch.object(AppConfig, "load_yaml") as mocked_load_yaml:
+            cached_config, cached_things = self.create_things()
+            mocked_load_yaml.assert_not_called()  # neither parsed nor validated
+        self.assertEqual(cached_config.get_mqtt_config(), app_config.get_mqtt_config())
+        self.assertEqual([(t.name, t.cmd_topic, t.publish_policy) for t in cached_things],
+                         [(t.name, t.cmd_topic, t.publish_policy) for t in things])
+
+        # changed content => reloaded
+        self.write_config(CONFIG.replace("light2", "light3"))
+        _, things = self.create_things()
+        self.assertEqual([t.name for t in things], ["light1", "light3"])
+
+        # other schema variant => reloaded
+        with mock.patch.object(AppConfig, "load_yaml", wraps=AppConfig.load_yaml) as mocked_load_yaml:
+            self.create_things(RunMode.EXPLORE)
+            mocked_load_yaml.assert_called_once()
+
+    def test_hue_bridges(self):
+        bridges = """
+hue_bridges:
+  - { name: "ground", host: "bridge1", app_key: "key1" }
+  - { name: "upstairs", host: "bridge2", app_key: "key2" }
+"""
+        self.write_config(CONFIG.replace('hue_bridge: { host: "bridge", app_key: "key" }', bridges))
+        app_config = AppConfig(self.config_file, RunMode.RUN_SERVICE)
+        self.assertEqual([c["name"] for c in app_config.get_hue_bridge_configs()], ["ground", "upstairs"])
+        self.assertEqual(app_config.get_hue_bridge_config()["host"], "bridge1")
+
+        self.write_config(CONFIG + bridges)  # only one of both sections
+        with self.assertRaises(ValidationError):
+            AppConfig(self.config_file, RunMode.RUN_SERVICE)
+
+        self.write_config(CONFIG.replace('hue_bridge: { host: "bridge", app_key: "key" }', bridges.replace("upstairs", "ground")))
+        with self.assertRaises(ConfigException):
+            AppConfig(self.config_file, RunMode.RUN_SERVICE).get_hue_bridge_configs()
@@ -0,0 +1,284 @@
+import asyncio
+import itertools
+import os
+import statistics
+import tempfile
+import threading
+import time
+from unittest import IsolatedAsyncioTestCase
+from unittest import mock
+from unittest.mock import MagicMock
+
+import aiohttp
+from paho.mqtt.client import MQTTMessage
+
+from src.mqtt.mqtt_client import MqttClient
+from src.mqtt.mqtt_proxy import MqttProxy
+from src.runner import Runner
+from src.utils.latency_tracer import LatencyTracer
+from test.hue.hue_bridge_simu import HueBridgeSimu
+from test.hue.hue_connector_simu import HueConnectorSimu
+
+
+class TestRunner(IsolatedAsyncioTestCase):
+    """Runner benchmark: idle loop iterations and MQTT command => Hue bridge latency"""
+
+    async def asyncSetUp(self):
+        self.connector = HueConnectorSimu()
+        self.client = MagicMock(MqttClient, autospec=True)
+        self.client.get_messages.return_value = []
+        self.proxy = MqttProxy(self.client, list(self.connector._things.values()))
+
+        self.runner = Runner([self.connector], self.proxy)
+        self.runner_task = asyncio.create_task(self.runner.run())
+        await asyncio.sleep(0.2)  # connect + initial states
+
+    async def asyncTearDown(self):
+        self.runner.shutdown()
+        await self.runner_task
+        await self.proxy.close()
+        await self.connector.close()
+
+    async def test_idle_iterations(self):
+        self.client.get_messages.reset_mock()
+
+        await asyncio.sleep(1.5)
+
+        # a 50ms polling loop would have iterated ~30 times
+        self.assertLessEqual(self.client.get_messages.call_count, 3)
+
+    async def test_command_latency(self):
+        latencies = []
+        for _ in range(10):
+            message = MQTTMessage(topic=f"{HueBridgeSimu.ID_SWITCH}/cmd".encode())
+            message.payload = b"toggle"
+            self.client.get_messages.side_effect = [[message], [], [], []]
+            self.connector.reset_actions()
+
+            # messages arrive via the MQTT thread
+            time_start = time.perf_counter()
+            threading.Thread(target=self.runner.wakeup).start()
+            while not self.connector.set_light.called:
+                await asyncio.sleep(0.0005)
+            latencies.append(time.perf_counter() - time_start)
+
+            self.client.get_messages.side_effect = None
+            self.client.get_messages.return_value = []
+
+        # a 50ms polling loop would average ~25ms (median: robust against single scheduling hiccups)
+        self.assertLess(statistics.median(latencies), 0.01)
+
+    async def test_latency_trace(self):
+        LatencyTracer.reset()
+        LatencyTracer.set_trace_log(LatencyTracer.DEFAULT_LOG_SAMPLE)  # switched on by SIGUSR1
+        message = MQTTMessage(topic=f"{HueBridgeSimu.ID_SWITCH}/cmd".encode())
+        message.payload = b"on"
+        self.client.get_receive_time.return_value = LatencyTracer.now()
+        self.client.get_messages.side_effect = [[message], [], [], []]
+        self.connector.reset_actions()
+
+        self.runner.wakeup()
+        while not self.connector.set_light.called:
+            await asyncio.sleep(0.001)
+        self.client.get_messages.side_effect = None
+        self.client.get_messages.return_value = []
+        await asyncio.sleep(0.01)
+        await self.connector.simu_on_state_changed(HueBridgeSimu.ID_SWITCH, True)  # the resulting Hue event
+
+        stages = LatencyTracer.get_summary()[LatencyTracer.COMMAND]
+        self.assertEqual(list(stages), [
+            LatencyTracer.PROCESS_COMMAND, LatencyTracer.FETCH_COMMANDS, LatencyTracer.SET_LIGHT_START, LatencyTracer.SET_LIGHT_END,
+            LatencyTracer.HUE_EVENT, LatencyTracer.DEBOUNCE_RELEASE, LatencyTracer.TO_DATA, LatencyTracer.PUBLISH,
+            LatencyTracer.TOTAL
+        ])
+        self.assertTrue(all(s["count"] == 1 for s in stages.values()))
+        self.assertGreaterEqual(stages[LatencyTracer.DEBOUNCE_RELEASE]["max"], 0.02)  # state debounce time of the simu
+        LatencyTracer.reset()
+
+    async def test_status(self):
+        self.client.queue_depth = 3
+
+        status = self.runner.get_status()
+
+        self.assertEqual(status["mqtt_queue_depth"], 3)
+        self.assertEqual(status["hue_queue_depth"], 0)
+        self.assertEqual(list(status["bridges"].keys()), [self.connector.name])
+
+
+class TestRunnerBridges(IsolatedAsyncioTestCase):
+    """several Hue bridges: a slow bridge doesn't stall the commands of the other ones"""
+
+    SLOW_BRIDGE_DELAY = 0.5  # seconds per command
+
+    async def asyncSetUp(self):
+        self.slow_connector = HueConnectorSimu()
+        self.fast_connector = HueConnectorSimu()
+        for thing in self.fast_connector._things.values():
+            thing._cmd_topic = "fast/" + thing.cmd_topic
+            thing._state_topic = "fast/" + thing.state_topic
+
+        async def slow_set_light(hue_item, on, brightness):
+            await asyncio.sleep(self.SLOW_BRIDGE_DELAY)
+            self.slow_connector.set_light(id=hue_item.id, on=on, brightness=brightness)
+
+        self.slow_connector._set_light = slow_set_light
+
+        self.client = MagicMock(MqttClient, autospec=True)
+        self.client.get_messages.return_value = []
+        things = [*self.slow_connector._things.values(), *self.fast_connector._things.values()]
+        self.proxy = MqttProxy(self.client, things)
+
+        self.runner = Runner([self.slow_connector, self.fast_connector], self.proxy)
+        self.runner_task = asyncio.create_task(self.runner.run())
+        await asyncio.sleep(0.2)  # connect + initial states
+
+    async def asyncTearDown(self):
+        self.runner.shutdown()
+        await self.runner_task
+        await self.proxy.close()
+        await self.slow_connector.close()
+        await self.fast_connector.close()
+
+    @classmethod
+    def create_message(cls, topic: str) -> MQTTMessage:
+        message = MQTTMessage(topic=topic.encode())
+        message.payload = b"toggle"
+        return message
+
+    async def test_commands_per_bridge(self):
+        self.slow_connector.reset_actions()
+        self.fast_connector.reset_actions()
+        messages = [self.create_message(f"{id}/cmd") for id in [HueBridgeSimu.ID_SWITCH, HueBridgeSimu.ID_DIMMER]]
+        messages.append(self.create_message(f"fast/{HueBridgeSimu.ID_SWITCH}/cmd"))
+        self.client.get_messages.side_effect = [messages, [], [], []]
+
+        time_start = time.perf_counter()
+        self.runner.wakeup()
+        while not self.fast_connector.set_light.called:
+            await asyncio.sleep(0.001)
+        fast_latency = time.perf_counter() - time_start
+        self.client.get_messages.side_effect = None
+
+        self.assertLess(fast_latency, self.SLOW_BRIDGE_DELAY / 2)
+        self.slow_connector.set_light.assert_not_called()  # still busy
+        self.fast_connector.set_light.assert_called_once_with(id=HueBridgeSimu.ID_SWITCH, on=True, brightness=None)
+
+        await asyncio.sleep(self.SLOW_BRIDGE_DELAY * 1.5)
+        self.assertEqual(self.slow_connector.set_light.call_count, 2)
+
+
+class TestRunnerUnreachableBridge(IsolatedAsyncioTestCase):
+    """an unreachable Hue bridge doesn't take the other bridges down"""
+
+    async def asyncSetUp(self):
+        self.connector = HueConnectorSimu()
+        self.failing_connector = HueConnectorSimu(things=[])
+        self.failing_connector._name = "failing"
+        self.connect_attempts = 0
+        self.reachable = False
+
+        async def initialize_hue_bridge():
+            self.connect_attempts += 1
+            if not self.reachable:
+                raise aiohttp.ClientConnectionError("unreachable")
+            self.failing_connector._bridge = HueBridgeSimu.create_hue_bridge()
+
+        self.failing_connector._initialize_hue_bridge = initialize_hue_bridge
+
+        self.client = MagicMock(MqttClient, autospec=True)
+        self.client.get_messages.return_value = []
+        self.client.queue_depth = 0
+        self.proxy = MqttProxy(self.client, list(self.connector._things.values()))
+
+        with mock.patch.object(Runner, "HUE_CONNECT_DELAY_MIN", 0.1):
+            self.runner = Runner([self.failing_connector, self.connector], self.proxy)
+        self.runner_task = asyncio.create_task(self.runner.run())
+
+    async def asyncTearDown(self):
+        self.runner.shutdown()
+        await self.runner_task
+        await self.proxy.close()
+        await self.connector.close()
+        await self.failing_connector.close()
+
+    async def test_unreachable_bridge(self):
+        with self.assertLogs("src.runner", "ERROR"):
+            await asyncio.sleep(0.5)
+
+        self.assertFalse(self.runner_task.done())
+        self.assertGreaterEqual(self.client.publish.call_count, len(self.connector._things))  # initial states
+        self.assertGreater(self.connect_attempts, 1)  # retried
+
+        status = self.runner.get_status()
+        self.assertFalse(status["healthy"])
+        self.assertFalse(status["bridges"]["failing"]["connected"])
+        self.assertTrue(status["bridges"][self.connector.name]["connected"])
+
+        self.reachable = True
+        await asyncio.sleep(0.5)
+        self.assertTrue(self.runner.get_status()["bridges"]["failing"]["connected"])
+
+
+class TestRunnerWarmStart(IsolatedAsyncioTestCase):
+    """retained states are published from the snapshot, before the Hue bridge answers"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.snapshot_file = os.path.join(self.temp_dir.name, "snapshot.json")
+
+        connector = HueConnectorSimu(snapshot_file=self.snapshot_file)
+        await connector.connect()
+        await asyncio.sleep(0.1)
+        self.published = {t.state_topic: t.published_state[0] for t in connector._things.values()}
+        await connector.close()
+
+        self.connector = HueConnectorSimu(snapshot_file=self.snapshot_file)
+        self.reachable = False
+        initialize_hue_bridge = self.connector._initialize_hue_bridge
+
+        async def unreachable_hue_bridge():
+            if not self.reachable:
+                raise aiohttp.ClientConnectionError("unreachable")
+            await initialize_hue_bridge()
+
+        self.connector._initialize_hue_bridge = unreachable_hue_bridge
+
+        self.client = MagicMock(MqttClient, autospec=True)
+        self.client.queue_depth = 0
+        self.proxy = MqttProxy(self.client, list(self.connector._things.values()))
+        self.proxy.RETAINED_STATE_TIMEOUT = 0.1
+
+        # the broker still retains one state
+        self.retained_topic = f"{HueBridgeSimu.ID_SWITCH}/state"
+        message = MQTTMessage(topic=self.retained_topic.encode())
+        message.payload = self.published[self.retained_topic].encode()
+        message.retain = True
+        self.client.get_messages.side_effect = itertools.chain([[message]], itertools.repeat([]))
+
+        with mock.patch.object(Runner, "HUE_CONNECT_DELAY_MIN", 0.2):
+            self.runner = Runner([self.connector], self.proxy)
+        self.runner_task = asyncio.create_task(self.runner.run())
+
+    async def asyncTearDown(self):
+        self.runner.shutdown()
+        await self.runner_task
+        await self.proxy.close()
+        await self.connector.close()
+        self.temp_dir.cleanup()
+
+    def get_published(self):
+        return {c.kwargs["topic"]: (c.kwargs["payload"], c.kwargs["user_properties"]) for c in self.client.publish.call_args_list}
+
+    async def test_snapshot_states_before_bridge(self):
+        with self.assertLogs("src.runner", "ERROR"):
+            await asyncio.sleep(0.3)
+
+        self.assertFalse(self.runner.get_status()["bridges"][self.connector.name]["connected"])
+        expected = {t: (p, {"source": "snapshot"}) for t, p in self.published.items() if t != self.retained_topic}
+        self.assertEqual(self.get_published(), expected)
+
+        self.client.publish.reset_mock()
+        self.reachable = True
+        await asyncio.sleep(0.5)
+        self.assertTrue(self.runner.get_status()["bridges"][self.connector.name]["connected"])
+        self.assertEqual(self.get_published(), {})  # the bridge confirms the published states
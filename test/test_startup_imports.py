@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+import unittest
+from typing import Dict, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestStartupImports(unittest.TestCase):
+    """Import time budget (`-X importtime`): each run mode imports only what it needs"""
+
+    SERVICE_PACKAGES = ["aiohttp", "aiohue", "jsonschema", "paho", "yaml"]
+    ENTRY_BUDGET = 0.5  # share of the import time of the service modules (relative, so independent of the host speed)
+
+    @classmethod
+    def profile_imports(cls, code: str) -> Dict[str, Tuple[int, bool]]:
+        """:return: module: cumulative import time (microseconds), imported at top level"""
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        )
+        imports = {}
+        for line in result.stderr.splitlines():
+            if line.startswith("import time:") and "|" in line:
+                _, cumulative, module = line.split("|")
+                if cumulative.strip().isdigit():
+                    top_level = module[1:2] != " "  # nested imports are indented
+                    imports[module.strip()] = (int(cumulative), top_level)
+        return imports
+
+    def assert_no_service_packages(self, imports: Dict[str, Tuple[int, bool]]):
+        loaded = sorted({m.split(".")[0] for m in imports} & set(self.SERVICE_PACKAGES))
+        self.assertEqual(loaded, [])
+
+    def test_entry_point(self):
+        self.assert_no_service_packages(self.profile_imports("import src.hue_mqtt_bridge"))
+
+    def test_json_schema_mode(self):
+        code = (
+            "import asyncio, contextlib, io\n"
+            "from src.hue_mqtt_bridge import testable_main\n"
+            "with contextlib.redirect_stdout(io.StringIO()):\n"
+            "    asyncio.run(testable_main(False, False, False, True, None, None, None, False, False))\n"
+        )
+        self.assert_no_service_packages(self.profile_imports(code))
+
+    def test_import_time_budget(self):
+        entry = "src.hue_mqtt_bridge"
+        code = f"import {entry}; import src.hue.hue_connector, src.mqtt.mqtt_proxy, src.runner, yaml, jsonschema"
+        self.profile_imports(code)  # warm up (byte code, file system caches)
+
+        entry_times, service_times = [], []
+        for _ in range(3):
+            imports = self.profile_imports(code)
+            entry_times.append(imports[entry][0])
+            service_times.append(sum(t for m, (t, top_level) in imports.items() if top_level and m != entry))
+
+        self.assertLess(min(entry_times), max(service_times) * self.ENTRY_BUDGET)
@@ -0,0 +1,94 @@
+import asyncio
+import sys
+import textwrap
+from typing import Dict, List
+from unittest import IsolatedAsyncioTestCase
+
+from src.supervisor import Supervisor
+
+
+class FastSupervisor(Supervisor):
+
+    RESTART_DELAY_MIN = 0.05
+    RESTART_DELAY_MAX = 0.2
+    HEALTH_INTERVAL = 0.1
+    STOP_TIMEOUT = 1
+
+
+class TestSupervisor(IsolatedAsyncioTestCase):
+    """workers are fake processes (python -c), which report a status, crash or run until terminated"""
+
+    WORKER_CODE = {
+        "steady": """
+            import sys, time
+            print('@status {"healthy": true, "mqtt_queue_depth": 2, "hue_queue_depth": 1}', flush=True)
+            print("some log output", flush=True)
+            time.sleep(30)
+        """,
+        "crashing": """
+            import sys, time
+            time.sleep(0.05)
+            sys.exit(1)
+        """,
+        "stubborn": """
+            import signal, time
+            signal.signal(signal.SIGTERM, signal.SIG_IGN)
+            print('@status {"healthy": false}', flush=True)
+            time.sleep(30)
+        """,
+    }
+
+    MISSING_WORKER = "missing"  # the worker command can't be started
+
+    @classmethod
+    def worker_command(cls, bridge_name: str) -> List[str]:
+        if bridge_name == cls.MISSING_WORKER:
+            return ["/nonexistent/hue-mqtt-bridge"]
+        return [sys.executable, "-c", textwrap.dedent(cls.WORKER_CODE[bridge_name])]
+
+    async def run_supervisor(self, bridge_names: List[str], duration: float) -> Dict[str, any]:
+        supervisor = FastSupervisor(bridge_names, self.worker_command)
+        task = asyncio.create_task(supervisor.run())
+        await asyncio.sleep(duration)
+        health = supervisor.get_health()
+        processes = [w.process for w in supervisor._workers.values()]
+
+        supervisor.shutdown()
+        await asyncio.wait_for(task, 5)
+        self.assertTrue(all(p.returncode is not None for p in processes if p))  # all workers stopped
+        return health
+
+    async def test_independent_restarts(self):
+        health = await self.run_supervisor(["steady", "crashing"], 1.0)
+
+        details = health["details"]
+        self.assertTrue(details["steady"]["running"])
+        self.assertEqual(details["steady"]["restarts"], 0)
+        self.assertGreaterEqual(details["crashing"]["restarts"], 2)
+        self.assertEqual(details["crashing"]["last_exit_code"], 1)
+
+        self.assertFalse(health["healthy"])
+        self.assertEqual(health["workers"], 2)
+
+    async def test_failing_worker_command(self):
+        with self.assertLogs("src.supervisor", "ERROR"):
+            health = await self.run_supervisor(["steady", self.MISSING_WORKER], 0.5)
+
+        details = health["details"]
+        self.assertTrue(details["steady"]["running"])
+        self.assertFalse(details[self.MISSING_WORKER]["running"])
+        self.assertGreaterEqual(details[self.MISSING_WORKER]["restarts"], 2)  # retried with backoff
+
+    async def test_health(self):
+        health = await self.run_supervisor(["steady"], 0.5)
+
+        self.assertTrue(health["healthy"])
+        self.assertEqual(health["running"], 1)
+        self.assertEqual(health["mqtt_queue_depth"], 2)
+        self.assertEqual(health["hue_queue_depth"], 1)
+
+    async def test_kill_on_shutdown(self):
+        health = await self.run_supervisor(["stubborn"], 0.5)
+
+        self.assertFalse(health["healthy"])
+        self.assertTrue(health["details"]["stubborn"]["running"])
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+from typing import Dict, List
+from unittest import IsolatedAsyncioTestCase
+
+from src.utils.debouncer import Debouncer
+
+
+class TestDebouncer(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.debouncer = Debouncer()
+        self.fired: Dict[str, List[any]] = {}
+
+    async def asyncTearDown(self):
+        self.debouncer.clear()
+
+    def callback(self, value):
+        key, _ = value
+        self.fired.setdefault(key, []).append(value)
+
+    async def test_trailing_edge(self):
+        for i in range(5):
+            self.debouncer.trigger("a", 0.05, self.callback, ("a", i))
+            await asyncio.sleep(0.01)
+        self.assertEqual(self.fired, {})
+
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.fired, {"a": [("a", 4)]})
+        self.assertEqual(len(self.debouncer), 0)
+
+    async def test_cancel(self):
+        self.debouncer.trigger("a", 0.02, self.callback, ("a", 0))
+        self.debouncer.trigger("b", 0.02, self.callback, ("b", 0))
+        self.debouncer.cancel("a")
+
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.fired, {"b": [("b", 0)]})
+
+    async def test_sparse_wakeups(self):
+        timer_calls = []
+        on_timer = self.debouncer._on_timer
+        self.debouncer._on_timer = lambda: (timer_calls.append(1), on_timer())
+
+        self.debouncer.trigger("a", 0.3, self.callback, ("a", 0))
+        self.debouncer.trigger("b", 0.1, self.callback, ("b", 0))  # earlier => re-armed
+        await asyncio.sleep(0.35)
+
+        self.assertEqual(self.fired, {"a": [("a", 0)], "b": [("b", 0)]})
+        self.assertLessEqual(len(timer_calls), 4)  # a timer per tick would be ~60
+
+    async def test_long_delay_wraps_wheel(self):
+        delay = self.debouncer.DEFAULT_TICK * self.debouncer.DEFAULT_SLOTS * 0.3
+        self.debouncer = Debouncer(slot_count=16)  # delay spans several revolutions
+        self.debouncer.trigger("a", delay, self.callback, ("a", 0))
+
+        await asyncio.sleep(delay * 0.8)
+        self.assertEqual(self.fired, {})
+        await asyncio.sleep(delay * 0.4)
+        self.assertEqual(self.fired, {"a": [("a", 0)]})
+
+    async def test_stress(self):
+        """thousands of events per second for thousand keys; each key fires once, with its last value"""
+        key_count = 1000
+        event_count = 50000
+        threads_before = threading.active_count()
+
+        time_start = time.monotonic()
+        for i in range(event_count):
+            key = f"key{i % key_count}"
+            self.debouncer.trigger(key, 0.05, self.callback, (key, i))
+            if i % 1000 == 0:
+                await asyncio.sleep(0.001)  # spread events over time, let the wheel turn
+        duration = time.monotonic() - time_start
+
+        self.assertGreater(event_count / duration, 5000)  # events per second
+        self.assertEqual(threading.active_count(), threads_before)
+
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(len(self.fired), key_count)
+        for i in range(key_count):
+            key = f"key{i}"
+            self.assertEqual(self.fired[key], [(key, event_count - key_count + i)])
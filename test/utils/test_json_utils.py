@@ -0,0 +1,38 @@
+import datetime
+import json
+import unittest
+from unittest import mock
+
+from src.utils.json_utils import JsonUtils
+
+
+class TestJsonUtils(unittest.TestCase):
+
+    DATA = {
+        "status": "on",
+        "name": 'quoted "name" ä',
+        "brightness": 33,
+        "level": 0.1,
+        "timestamp": datetime.datetime(2022, 1, 30, 10, 0, 0),
+        "nested": {"b": [1, None, True], "a": {}},
+    }
+
+    def test_dumps_baseline_format(self):
+        text = JsonUtils.dumps(self.DATA)
+        self.assertEqual(text, json.dumps(self.DATA, sort_keys=True, default=datetime.datetime.isoformat))
+        self.assertTrue(text.startswith('{"brightness": 33, "level": 0.1, "name": "quoted \\"name\\" \\u00e4"'))
+
+    def test_backends_identical(self):
+        text = JsonUtils.dumps(self.DATA)
+        loaded = JsonUtils.loads(text)
+        with mock.patch("src.utils.json_utils.orjson", None):
+            self.assertEqual(JsonUtils.dumps(self.DATA), text)
+            self.assertEqual(JsonUtils.loads(text), loaded)
+        self.assertEqual(JsonUtils.dumps(loaded).encode(), text.encode())
+
+    def test_loads_invalid(self):
+        with self.assertRaises(ValueError):
+            JsonUtils.loads("{invalid")
+        with mock.patch("src.utils.json_utils.orjson", None):
+            with self.assertRaises(ValueError):
+                JsonUtils.loads("{invalid")
@@ -0,0 +1,83 @@
+import unittest
+from unittest import mock
+
+from src.utils.latency_tracer import LatencyHistogram, LatencyTracer
+
+
+class TestLatencyTracer(unittest.TestCase):
+
+    def setUp(self):
+        LatencyTracer.reset()
+
+    def tearDown(self):
+        LatencyTracer.reset()
+
+    def test_histogram(self):
+        histogram = LatencyHistogram()
+        for _ in range(90):
+            histogram.record(0.001)
+        for _ in range(10):
+            histogram.record(0.5)
+
+        summary = histogram.summary()
+        self.assertEqual(summary["count"], 100)
+        self.assertAlmostEqual(summary["mean"], 0.0509)
+        self.assertTrue(0.001 <= summary["p50"] < 0.002)  # bucket bound
+        self.assertEqual(summary["p99"], 0.5)  # not above the max
+        self.assertEqual(summary["max"], 0.5)
+
+        histogram.record(100.0)  # open bucket
+        self.assertEqual(histogram.percentile(1.0), 100.0)
+
+    @mock.patch("src.utils.latency_tracer.time.monotonic")
+    def test_trace(self, monotonic):
+        LatencyTracer.set_trace_log(LatencyTracer.DEFAULT_LOG_SAMPLE)
+        monotonic.return_value = 10.0
+        trace = LatencyTracer.start(LatencyTracer.EVENT, "light", LatencyTracer.HUE_EVENT)
+        monotonic.return_value = 10.3
+        LatencyTracer.stamp(trace, LatencyTracer.DEBOUNCE_RELEASE)
+        monotonic.return_value = 10.301
+        LatencyTracer.stamp(trace, LatencyTracer.TO_DATA)
+        abandoned = LatencyTracer.start(LatencyTracer.EVENT, "other", LatencyTracer.HUE_EVENT)
+        monotonic.return_value = 10.302
+        LatencyTracer.finish(trace, LatencyTracer.PUBLISH)
+        LatencyTracer.stamp(abandoned, LatencyTracer.DEBOUNCE_RELEASE)  # never published
+
+        summary = LatencyTracer.get_summary()[LatencyTracer.EVENT]
+        self.assertEqual(list(summary), [LatencyTracer.DEBOUNCE_RELEASE, LatencyTracer.TO_DATA, LatencyTracer.PUBLISH, LatencyTracer.TOTAL])
+        self.assertEqual(summary[LatencyTracer.DEBOUNCE_RELEASE]["count"], 2)  # stages are recorded, when stamped
+        self.assertAlmostEqual(summary[LatencyTracer.DEBOUNCE_RELEASE]["max"], 0.3)
+        self.assertAlmostEqual(summary[LatencyTracer.PUBLISH]["max"], 0.001)
+        self.assertEqual(summary[LatencyTracer.TOTAL]["count"], 1)
+        self.assertAlmostEqual(summary[LatencyTracer.TOTAL]["max"], 0.302)
+        self.assertEqual(
+            str(trace),
+            "event 'light': hue_event, debounce_release +300.00ms, to_data +1.00ms, publish +1.00ms (total 302.00ms)"
+        )
+
+    def test_sampled_trace_log(self):
+        def run_traces():
+            for i in range(6):
+                trace = LatencyTracer.start(LatencyTracer.COMMAND, f"light{i}", LatencyTracer.MQTT_RECEIVED)
+                LatencyTracer.finish(trace, LatencyTracer.PUBLISH)
+
+        LatencyTracer.set_trace_log(3)
+        with self.assertLogs("src.utils.latency_tracer") as logs:
+            run_traces()
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn("command 'light2'", logs.output[0])
+
+        self.assertFalse(LatencyTracer.toggle_trace_log())
+        self.assertTrue(LatencyTracer.toggle_trace_log())
+
+    def test_tracing_off(self):
+        self.assertIsNone(LatencyTracer.start(LatencyTracer.COMMAND, "light", LatencyTracer.MQTT_RECEIVED))
+        self.assertEqual(LatencyTracer.get_summary(), {})
+
+        LatencyTracer.set_trace_log(LatencyTracer.DEFAULT_LOG_SAMPLE)
+        trace = LatencyTracer.start(LatencyTracer.COMMAND, "light", LatencyTracer.MQTT_RECEIVED, 0.0)
+        self.assertEqual(trace.start_time, 0.0)  # a valid monotonic time
+
+        LatencyTracer.set_trace_log(0)
+        LatencyTracer.finish(trace, LatencyTracer.PUBLISH)  # started while on => recorded
+        self.assertEqual(LatencyTracer.get_summary()[LatencyTracer.COMMAND][LatencyTracer.TOTAL]["count"], 1)
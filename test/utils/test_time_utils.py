@@ -0,0 +1,41 @@
+import datetime
+import timeit
+import unittest
+from unittest import mock
+
+from src.utils.time_utils import TimeUtils
+
+
+class TestTimeUtils(unittest.TestCase):
+
+    def test_timestamp_text(self):
+        for _ in range(3):  # retry, if a second boundary was crossed
+            before = TimeUtils.now(no_ms=True).isoformat()
+            text = TimeUtils.timestamp_text()
+            after = TimeUtils.now(no_ms=True).isoformat()
+            if before == after:
+                break
+        self.assertEqual(text, before)
+
+        parsed = datetime.datetime.fromisoformat(text)
+        self.assertEqual(parsed.microsecond, 0)
+        self.assertIsNotNone(parsed.tzinfo)
+
+    @mock.patch("src.utils.time_utils.time.time")
+    def test_timestamp_text_per_second(self, mocked_time):
+        mocked_time.return_value = 1643533200.2  # 2022-01-30 09:00:00 UTC
+        text1 = TimeUtils.timestamp_text()
+        mocked_time.return_value = 1643533200.9
+        self.assertIs(TimeUtils.timestamp_text(), text1)  # cached
+
+        mocked_time.return_value = 1643533201.0
+        text2 = TimeUtils.timestamp_text()
+        self.assertNotEqual(text2, text1)
+        expected = datetime.datetime.fromtimestamp(1643533201, tz=datetime.timezone.utc)
+        self.assertEqual(datetime.datetime.fromisoformat(text2), expected)
+
+    def test_timestamp_text_faster(self):
+        number = 20000
+        uncached = min(timeit.repeat(lambda: TimeUtils.now(no_ms=True).isoformat(), number=number, repeat=3))
+        cached = min(timeit.repeat(TimeUtils.timestamp_text, number=number, repeat=3))
+        self.assertLess(cached, uncached)